@@ -0,0 +1,75 @@
+# admission.py
+# Deadline-aware admission control in front of the LLM.
+# Every /chat request gets a deadline (--deadline-s, or a shorter "deadline_ms" from the
+# client). Before a request joins the Ollama queue the controller predicts when its answer
+# would be ready from the client's queue depth and recent generation latency:
+#   wait      = max(0, ahead - slots + 1) / slots * generation_ms     (ahead = waiting + active)
+#   predicted = wait + generation_ms        (time to first token instead, for streaming)
+# If that misses the deadline the request is not queued at all: it gets the extractive answer
+# right away (policy "degrade") or a 503 with Retry-After (policy "shed"). /chat checks once
+# before retrieval (a request already hopeless is shed without doing it) and again right
+# before the LLM call, since retrieval under load can take a good part of the deadline. Admitted requests
+# pass the time left to the LLM call, so a stalled Ollama costs the deadline, not the 120 s
+# HTTP timeout.
+
+import math
+import threading
+import time
+
+ADMIT, DEGRADE, SHED = "admit", "degrade", "shed"
+OVERLOAD_POLICIES = (DEGRADE, SHED)
+
+
+def remaining(deadline):
+    # seconds left before a deadline from AdmissionController.deadline(); None = no deadline
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+class AdmissionController:
+    def __init__(self, llm, deadline_s=30.0, policy=DEGRADE):
+        if policy not in OVERLOAD_POLICIES:
+            raise ValueError(f"unknown overload policy {policy!r}")
+        self.llm = llm
+        self.deadline_s = float(deadline_s or 0.0)
+        self.policy = policy
+        self._lock = threading.Lock()
+        self.last_predicted_ms = 0.0
+
+    def deadline(self, requested_ms=None):
+        # clients may shorten the server deadline, never extend it
+        seconds = self.deadline_s
+        if requested_ms:
+            asked = float(requested_ms) / 1000.0
+            seconds = min(seconds, asked) if seconds else asked
+        return time.monotonic() + seconds if seconds else None
+
+    def predict_ms(self, stream=False) -> float:
+        load = self.llm.load()
+        gen = load["generation_ms"]
+        if gen is None:
+            return 0.0  # nothing measured yet: admit and learn (the deadline still bounds the call)
+        ahead = load["waiting"] + load["active"]
+        slots = load["max_concurrency"]
+        wait = max(0, ahead - slots + 1) / float(slots) * gen
+        first = load["ttft_ms"] if stream and load["ttft_ms"] is not None else gen
+        return wait + first
+
+    def decide(self, deadline, stream=False):
+        # -> (ADMIT | DEGRADE | SHED, predicted seconds)
+        predicted = self.predict_ms(stream) / 1000.0
+        left = remaining(deadline)
+        decision = ADMIT if left is None or predicted <= left else self.policy
+        with self._lock:
+            self.last_predicted_ms = predicted * 1000.0
+        return decision, predicted
+
+    def retry_after(self, predicted_s: float) -> int:
+        # by then the requests ahead of this one have had a generation's time to drain
+        return max(1, int(math.ceil(predicted_s)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"deadline_s": self.deadline_s, "policy": self.policy,
+                    "predicted_ms": round(self.last_predicted_ms, 1)}
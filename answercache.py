@@ -0,0 +1,184 @@
+# answercache.py
+# Semantic answer cache in front of the Ollama call.
+# Keyed on the normalized query embedding that hybrid_search already needs: a new query
+# whose cosine similarity to a cached one is >= threshold gets the stored answer back.
+# Bounded (LRU), entries expire after ttl seconds, and everything is dropped when the
+# corpus version changes. Optionally persisted to an `answer_cache` table in a side DB.
+# Persistence is best effort and off the request path: writes go through one writer thread,
+# so a side DB locked by a sibling serve.py worker delays the copy on disk, not the answer.
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from metrics import log
+
+
+def corpus_version(db_path: str) -> str:
+    # cheap fingerprint of the index files; changes whenever the DB (or its WAL) is rewritten
+    # (readers create/touch the -wal file, so only its size counts, not its mtime)
+    try:
+        st = os.stat(db_path)
+        main = f"{st.st_size}:{st.st_mtime_ns}"
+    except OSError:
+        main = "-"
+    try:
+        wal = str(os.stat(db_path + "-wal").st_size)
+    except OSError:
+        wal = "0"
+    return f"{main}/{wal}"
+
+
+class SemanticAnswerCache:
+    def __init__(self, max_entries=1024, threshold=0.95, ttl=86400.0, db_path=None, version=None):
+        self.max_entries = int(max_entries)
+        self.threshold = float(threshold)
+        self.ttl = float(ttl) if ttl else None
+        self.version = version
+        self._lock = threading.Lock()
+        self._vecs = None            # (max_entries, dim) float32, rows of free slots are zero
+        self._answers = [None] * self.max_entries
+        self._created = np.zeros(self.max_entries, dtype=np.float64)
+        self._used = np.zeros(self.max_entries, dtype=np.float64)
+        self._live = np.zeros(self.max_entries, dtype=bool)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.write_errors = 0
+        self._db = None
+        self._writes = queue.Queue(maxsize=4096)
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS answer_cache (
+                    id INTEGER PRIMARY KEY, version TEXT, embedding BLOB NOT NULL,
+                    answer TEXT NOT NULL, created REAL NOT NULL);""")
+            self._db.commit()
+            self._load()
+            threading.Thread(target=self._write_loop, name="answer-cache-db", daemon=True).start()
+
+    # ---------- lookups ----------
+    def lookup(self, q: np.ndarray):
+        now = time.time()
+        with self._lock:
+            if self._vecs is None or not self._live.any():
+                self.misses += 1
+                return None
+            if self.ttl:
+                expired = self._live & (self._created < now - self.ttl)
+                if expired.any():
+                    self._drop(np.flatnonzero(expired))
+            sims = self._vecs @ np.asarray(q, dtype=np.float32)
+            sims[~self._live] = -np.inf
+            slot = int(np.argmax(sims))
+            if sims[slot] < self.threshold:
+                self.misses += 1
+                return None
+            self._used[slot] = now
+            self.hits += 1
+            return self._answers[slot]
+
+    def store(self, q: np.ndarray, answer: str, created=None, persist=True, version=None):
+        # version: the corpus the answer was computed from; dropped if the cache moved on since
+        if self.max_entries <= 0 or not answer:
+            return
+        q = np.asarray(q, dtype=np.float32)
+        now = time.time()
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            if self._vecs is None:
+                self._vecs = np.zeros((self.max_entries, q.shape[0]), dtype=np.float32)
+            free = np.flatnonzero(~self._live)
+            if free.size:
+                slot = int(free[0])
+            else:
+                slot = int(np.argmin(self._used))  # least recently used
+                self.evictions += 1
+            self._vecs[slot] = q
+            self._answers[slot] = answer
+            self._created[slot] = created or now
+            self._used[slot] = now
+            self._live[slot] = True
+            version = self.version
+        if persist:
+            self._persist(("INSERT INTO answer_cache (version, embedding, answer, created) VALUES (?, ?, ?, ?);",
+                           (version, q.tobytes(), answer, created or now)),
+                          ("DELETE FROM answer_cache WHERE id <= (SELECT MAX(id) FROM answer_cache) - ?;",
+                           (self.max_entries,)))
+
+    # ---------- invalidation ----------
+    def ensure_version(self, version: str):
+        if version == self.version:
+            return
+        with self._lock:
+            self.version = version
+            self._clear()
+        self._persist(("DELETE FROM answer_cache WHERE version IS NOT ?;", (version,)))
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+        self._persist(("DELETE FROM answer_cache;", ()))
+
+    def _clear(self):
+        self._live[:] = False
+        self._answers = [None] * self.max_entries
+
+    def _drop(self, slots):
+        self._live[slots] = False
+        for s in slots:
+            self._answers[s] = None
+
+    # ---------- persistence ----------
+    def _persist(self, *statements):
+        # queued in order for the writer thread; dropped (and counted) if it has fallen far behind
+        if self._db is None:
+            return
+        try:
+            self._writes.put_nowait(statements)
+        except queue.Full:
+            self.write_errors += 1
+
+    def _write_loop(self):
+        while True:
+            batch = [self._writes.get()]
+            while True:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                for statements in batch:
+                    for sql, params in statements:
+                        self._db.execute(sql, params)
+                self._db.commit()
+            except sqlite3.Error as e:
+                self.write_errors += len(batch)
+                log.warning("answer cache: %d write(s) not persisted: %s", len(batch), e)
+                try:
+                    self._db.rollback()
+                except sqlite3.Error:
+                    pass
+
+    def _load(self):
+        rows = self._db.execute("""
+            SELECT embedding, answer, created FROM answer_cache
+            WHERE version IS ? ORDER BY created DESC LIMIT ?;""", (self.version, self.max_entries)).fetchall()
+        for blob, answer, created in reversed(rows):
+            if self.ttl and created < time.time() - self.ttl:
+                continue
+            self.store(np.frombuffer(blob, dtype=np.float32), answer, created=created, persist=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entries": int(self._live.sum()), "max_entries": self.max_entries,
+                    "threshold": self.threshold, "ttl": self.ttl, "version": self.version,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "write_errors": self.write_errors, "pending_writes": self._writes.qsize(),
+                    "hit_rate": (self.hits / total) if total else 0.0}
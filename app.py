@@ -1,103 +1,336 @@
 import argparse
+import hmac
+import json
+import logging
 import os
+import queue
 import re
+import signal
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from flask import Flask, render_template_string, request, jsonify
-import requests
+from functools import wraps
+from pathlib import Path
+from flask import Flask, Response, g, has_request_context, render_template_string, request, jsonify, stream_with_context
+from werkzeug.serving import make_server
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import xcommand
+from embedder import BatchEmbedder
+from embedserver import EmbedClient
+from dbpool import ConnectionPool, enable_wal
+from shards import Shard, ShardSet, parse_shards
+from hotreload import IndexWatcher
+from chunkstore import ChunkTextCache, fetch_texts
+from contextpack import DEFAULT_CHARS_PER_TOKEN, ContextPacker, TokenCounter
+from llmclient import LLMDeadlineExceeded, LLMQueueFull, OllamaClient
+from admission import ADMIT, DEGRADE, OVERLOAD_POLICIES, SHED, AdmissionController, remaining
+from batch import BatchPipeline, JSONLWriter, done_ids, parse_questions, read_questions
+import metrics
+from metrics import STAGE_SECONDS, Trace, log
+from answercache import SemanticAnswerCache
+from fusion import FUSION_METHODS, Fusion, keyword_bits, load_term_bits, popcount64, term_index_ok
+from urdutext import DEFAULT_LEXICON, Lexicon, fts_normalized
+from vecstore import INDEX_BACKENDS, Vec0Index, default_store_path, open_index
 DEFAULT_MODEL = r"C:\Users\umair\Desktop\Langraph\AraGemma-Embedding-300m"
 DEFAULT_DB    = r"C:\Users\umair\Desktop\Langraph\embeddings.db"
 DEFAULT_DLL   = r"C:\Users\umair\Desktop\Langraph\sqlite-vec\vec0.dll"
 DEFAULT_OLLAMA_URL = "http://127.0.0.1:11434"
 DEFAULT_OLLAMA_MODEL = "gemma3:4b"   
-def expand_urdu_query(q: str):
-    synonyms = [
-        "حبسِ جسم", "ہیبیس کارپس",
-        "غیر قانونی گرفتاری", "غیر قانونی حراست",
-        "گرفتاری", "حراست", "وارنٹ",
-        "آئینی درخواست", "ہائی کورٹ", "عدالت", "ضمانت"
-    ]
-    terms = set([q.strip()] + synonyms)
-    return list(terms)
+DEFAULT_EMBED_WINDOW_MS = 5.0
+DEFAULT_EMBED_MAX_BATCH = 32
+DEFAULT_CHUNK_CACHE_MB = 64
+
+
+def expand_urdu_query(q: str, lexicon=None):
+    # normalized query terms + synonyms of the lexicon phrases the query actually contains
+    return (lexicon or LEXICON).expand(q)
 
 # ---------- DB / vec0 ----------
-def connect_db(db_path: str, dll_path: str) -> sqlite3.Connection:
-    con = sqlite3.connect(db_path, check_same_thread=False)
-    con.enable_load_extension(True)
-    con.load_extension(dll_path)
+VEC0 = Vec0Index()
+DEFAULT_FUSION = Fusion()
+LEXICON = Lexicon.load()
+
+# ---------- startup ----------
+# boot() binds the port first; the encoder, DB and warm-up load on a background thread and
+# /chat answers 503 until READY is set. /healthz = process alive, /readyz = safe to route traffic.
+WARMUP_QUERIES = (
+    "غیر قانونی گرفتاری کو کیسے چیلنج کروں؟",
+    "ہائی کورٹ میں حبسِ جسم کی درخواست کا طریقہ کیا ہے؟",
+    "وارنٹ کے بغیر گرفتاری ہو تو کیا حق حاصل ہیں؟",
+    "ضمانت کے لیے کون سے کاغذات درکار ہوتے ہیں؟",
+)
+READY = threading.Event()
+STARTUP = {"state": "starting", "stage": None, "error": None, "seconds": None, "llm_warm": None}
+EMBED_MODEL = LLM = ADMISSION = DB_POOL = SHARDS = ANSWER_CACHE = CHUNK_CACHE = VECTOR_INDEX = DB_PATH = PACKER = None
+BATCH = WATCHER = ADMIN_TOKEN = None
+BATCH_MAX_QUESTIONS = 1000
+BATCH_SLOT = threading.Semaphore(1)  # one /chat/batch upload at a time per process
+
+# ---------- index snapshot / hot reload ----------
+# SHARDS is swapped whole by reload_index. A request leases the set current when it first
+# needs it (current_shards) and keeps it until teardown, so in-flight requests finish on the
+# old set while new ones get the new one; the old set closes after its last lease.
+# SIGHUP reloads too. Under serve.py every worker holds its own set: POST /admin/reload then
+# signals serve.py, which sends SIGHUP to all workers (GET reports the worker that answers).
+SHARD_LOCK = threading.Lock()     # the SHARDS swap vs a lease of it
+RELOAD_LOCK = threading.Lock()    # one reload at a time
+RELOAD = {"state": "idle", "reason": None, "error": None, "seconds": None, "finished_at": None}
+SHARD_OPTIONS = {}                # configure()'s open_shard arguments, reused by reloads
+RELOAD_VIA_PARENT = False         # serve.py worker: reloads are fanned out by the parent
+
+def startup_stage(stage: str):
+    STARTUP["stage"] = stage
+    log.info("startup: %s", stage)
+
+def load_encoder(model_path: str, backend="torch"):
+    # sentence_transformers pulls in torch; importing it here keeps the port bind fast
+    from sentence_transformers import SentenceTransformer
+    if backend == "torch":
+        return SentenceTransformer(model_path)
+    exported = os.path.join(model_path, "onnx", "model.onnx")
+    fresh = os.path.isdir(model_path) and not os.path.exists(exported)
+    try:
+        model = SentenceTransformer(model_path, backend=backend)
+    except TypeError:
+        # sentence-transformers before 3.2 has no backend argument
+        import sentence_transformers
+        raise RuntimeError(f"--embed-backend {backend} needs sentence-transformers>=3.2 with its onnx extra "
+                           f"(pip install \"sentence-transformers[onnx]>=3.2\"), "
+                           f"found {sentence_transformers.__version__}")
+    if fresh:
+        # the first ONNX load exports the model; keep the export so later starts skip it
+        try:
+            model.save_pretrained(model_path)
+        except OSError as e:
+            log.warning("could not cache the ONNX export in %s: %s", model_path, e)
+    return model
+
+def connect_db(db_path: str, dll_path: str = None, readonly=False) -> sqlite3.Connection:
+    # dll_path=None skips vec0; only the numpy vector backend can run without it
+    if readonly:
+        con = sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True, check_same_thread=False)
+    else:
+        con = sqlite3.connect(db_path, check_same_thread=False)
+    if dll_path:
+        con.enable_load_extension(True)
+        con.load_extension(dll_path)
     con.execute("PRAGMA foreign_keys = ON;")
     return con
 
-def hybrid_search(con, model, query: str, top_k=4, fts_k=100):
-    # FTS prefilter (BM25)
+def encode_query(model, query: str) -> np.ndarray:
+    # BatchEmbedder coalesces concurrent queries (EmbedClient: across worker processes);
+    # a bare SentenceTransformer still works
+    if isinstance(model, (BatchEmbedder, EmbedClient)):
+        return model.embed(query)
+    return model.encode([query], normalize_embeddings=True, convert_to_numpy=True).astype("float32")[0]
+
+def encode_queries(model, queries) -> np.ndarray:
+    # many queries in as few encode calls as the model allows (the /chat/batch encode stage)
+    if isinstance(model, (BatchEmbedder, EmbedClient)):
+        return model.embed_many(list(queries))
+    return model.encode(list(queries), batch_size=len(queries), normalize_embeddings=True,
+                        convert_to_numpy=True).astype("float32")
+
+def search_candidates(con, model, query: str, k: int, fts_k=100, vector_index=None, q=None, trace=None,
+                      lexicon=None):
+    # one database's FTS prefilter (BM25) + KNN -> ([(rowid, distance), ...], {rowid: bm25})
+    trace = trace or Trace("search", query)
+    # FTS prefilter (BM25); scores are kept for fusion
+    with trace.span("fts"):
+        # all content terms (each OR-ed with its synonyms) first; any term only if that finds nothing
+        fts_rows = []
+        for fts_expr in (lexicon or LEXICON).fts_queries(query):
+            try:
+                fts_rows = con.execute("""
+                    SELECT rowid, bm25(chunks_fts)
+                    FROM chunks_fts
+                    WHERE chunks_fts MATCH ?
+                    ORDER BY bm25(chunks_fts) ASC
+                    LIMIT ?;""", (fts_expr, fts_k)).fetchall()
+            except sqlite3.OperationalError:
+                fts_rows = []
+            if fts_rows:
+                break
+        bm25_by_id = dict(fts_rows)
+        candidate_ids = [r[0] for r in fts_rows]
+    trace.size("fts", len(candidate_ids))
+
+    if q is None:
+        with trace.span("encode"):
+            q = encode_query(model, query)
+
+    index = vector_index or VEC0
+    with trace.span("knn"):
+        if candidate_ids:
+            rows = index.search(con, q, min(k, fts_k), candidate_ids)
+        else:
+            rows = index.search(con, q, k)
+    trace.size("knn", len(rows))
+    return rows, bm25_by_id
+
+def keyword_hits(con, ids, term_bits: bool, text_cache=None):
+    # -> (keyword hits per id, texts fetched on the way: empty when the bitmaps were used)
+    if term_bits:
+        return popcount64(load_term_bits(con, ids)), {}
+    # no precomputed bitmaps in this DB: fall back to scanning the candidate texts
+    texts = fetch_texts(con, ids, cache=text_cache)
+    return popcount64(np.array([keyword_bits(texts.get(i, "")) for i in ids], dtype=np.uint64)), texts
+
+def hybrid_search(con, model, query: str, top_k=4, fts_k=100, text_cache=None, vector_index=None, q=None,
+                  trace=None, fusion=None, lexicon=None):
+    trace = trace or Trace("search", query)
+    fusion = fusion or DEFAULT_FUSION
+    rows, bm25_by_id = search_candidates(con, model, query, top_k * 5, fts_k, vector_index=vector_index, q=q,
+                                         trace=trace, lexicon=lexicon)
+    if not rows:
+        return []
+
+    with trace.span("rescore"):
+        ids = [r[0] for r in rows]
+        dist = np.array([r[1] for r in rows], dtype=np.float32)
+        bm25 = np.array([bm25_by_id.get(i, np.nan) for i in ids], dtype=np.float32)
+        kw_hits, texts = keyword_hits(con, ids, fusion.term_bits, text_cache)
+        order = np.argsort(-fusion.score(dist, bm25, kw_hits), kind="stable")
+        best = [ids[j] for j in order[:top_k]]
+
+    with trace.span("fetch"):
+        if not texts:
+            texts = fetch_texts(con, best, cache=text_cache)
+    return [texts[i] for i in best if i in texts]
+
+def sharded_search(shard_set, model, query: str, top_k=4, fts_k=100, q=None, trace=None, fusion=None, shards=None):
+    # hybrid_search over several databases. Each shard runs FTS + KNN + keyword hits on the
+    # shard pool; the union is then fused once, so BM25 min-max normalization and RRF ranks
+    # span every shard and the scores are comparable across them. (BM25 itself still uses
+    # each shard's own term statistics.)
+    trace = trace or Trace("search", query)
+    fusion = fusion or DEFAULT_FUSION
+    if q is None:
+        with trace.span("encode"):
+            q = encode_query(model, query)
+
+    def one(shard):
+        # per-shard stages (fts, knn, keywords) go to the stage histograms; the request trace
+        # records the fan-out as a whole
+        strace = Trace(trace.route, query)
+        with shard.pool.connection() as con:
+            rows, bm25_by_id = search_candidates(con, model, query, top_k * 5, fts_k, vector_index=shard.vector_index,
+                                                 q=q, trace=strace, lexicon=shard.lexicon)
+            ids = [r[0] for r in rows]
+            with strace.span("keywords"):
+                kw_hits, texts = keyword_hits(con, ids, shard.term_bits, shard.text_cache) if ids else ([], {})
+        return shard, ids, [r[1] for r in rows], [bm25_by_id.get(i, np.nan) for i in ids], kw_hits, texts, \
+            len(bm25_by_id)
+
+    with trace.span("fanout"):
+        parts = shard_set.map(one, shard_set.select(shards))
+    trace.size("fts", sum(p[6] for p in parts))
+    trace.size("knn", sum(len(p[1]) for p in parts))
+    keys = [(p[0], i) for p in parts for i in p[1]]
+    if not keys:
+        return []
+
+    with trace.span("rescore"):
+        dist = np.concatenate([np.asarray(p[2], dtype=np.float32) for p in parts])
+        bm25 = np.concatenate([np.asarray(p[3], dtype=np.float32) for p in parts])
+        kw_hits = np.concatenate([np.asarray(p[4], dtype=np.float32) for p in parts])
+        order = np.argsort(-fusion.score(dist, bm25, kw_hits), kind="stable")
+        best = [keys[j] for j in order[:top_k]]
+
+    with trace.span("fetch"):
+        texts = {(p[0].name, i): t for p in parts for i, t in p[5].items()}
+        missing = {}
+        for shard, i in best:
+            if (shard.name, i) not in texts:
+                missing.setdefault(shard, []).append(i)
+        for shard, ids in missing.items():
+            with shard.pool.connection() as con:
+                texts.update(((shard.name, i), t) for i, t in fetch_texts(con, ids, cache=shard.text_cache).items())
+    return [texts[(shard.name, i)] for shard, i in best if (shard.name, i) in texts]
+
+def retrieve(user_query: str, q=None, trace=None, shards=None, shard_set=None):
+    # the /chat context chunks from the request's index snapshot, or the routed subset of its shards
+    shard_set = shard_set or current_shards()
+    if len(shard_set) == 1:
+        shard = shard_set.primary
+        with shard.pool.connection() as con:
+            return hybrid_search(con, EMBED_MODEL, user_query, top_k=4, fts_k=120, text_cache=shard.text_cache,
+                                 vector_index=shard.vector_index, q=q, trace=trace, fusion=shard_set.fusion,
+                                 lexicon=shard.lexicon)
+    return sharded_search(shard_set, EMBED_MODEL, user_query, top_k=4, fts_k=120, q=q, trace=trace,
+                          fusion=shard_set.fusion, shards=shards)
+
+def acquire_shards() -> ShardSet:
+    with SHARD_LOCK:
+        return SHARDS.acquire()
+
+@contextmanager
+def shard_lease():
+    # the current index snapshot for work outside a request (batch pipeline threads)
+    shard_set = acquire_shards()
     try:
-        terms = expand_urdu_query(query)
-        fts_expr = " OR ".join([f'"{t}"' for t in terms])
-        rows = con.execute("""
-            SELECT rowid
-            FROM chunks_fts
-            WHERE chunks_fts MATCH ?
-            ORDER BY bm25(chunks_fts) ASC
-            LIMIT ?;""", (fts_expr, fts_k)).fetchall()
-        candidate_ids = [r[0] for r in rows]
-    except sqlite3.OperationalError:
-        candidate_ids = []
-
-    q = model.encode([query], normalize_embeddings=True, convert_to_numpy=True).astype("float32")[0]
-
-    if candidate_ids:
-        placeholders = ",".join("?" * len(candidate_ids))
-        rows = con.execute(f"""
-            SELECT v.rowid, v.distance
-            FROM vectors v
-            WHERE v.rowid IN ({placeholders})
-              AND v.embedding MATCH ?
-            ORDER BY v.distance
-            LIMIT ?;""", (*candidate_ids, q.tobytes(), min(top_k * 5, fts_k))).fetchall()
-    else:
-        rows = con.execute("""
-            SELECT rowid, distance FROM vectors
-            WHERE embedding MATCH ? ORDER BY distance LIMIT ?;""",
-            (q.tobytes(), top_k * 5)).fetchall()
-
-    # tiny keyword bonus to break ties
-    keywords = ["حبسِ جسم", "ہیبیس کارپس", "گرفتاری", "حراست", "وارنٹ"]
-    scored = []
-    for rowid, dist in rows:
-        txt = con.execute("SELECT text FROM chunks WHERE id=?", (rowid,)).fetchone()[0]
-        cosine = 1 - (dist * dist) / 2.0
-        bonus = sum(1 for k in keywords if k in txt) * 0.1
-        scored.append((cosine + bonus, txt))
-
-    scored.sort(key=lambda x: x[0], reverse=True)
-    top = [t for _, t in scored[:top_k]]
-    return top
+        yield shard_set
+    finally:
+        shard_set.release()
 
-def build_prompt(context_chunks, user_query):
-    ctx = "\n\n---\n\n".join(context_chunks)
-    prompt = f"""آپ ایک مختصر قانونی مددگار ہیں۔
+def current_shards() -> ShardSet:
+    # in a request: leased on first use, released in teardown; outside one (warm-up): the live set
+    if not has_request_context():
+        return SHARDS
+    shard_set = g.get("shards")
+    if shard_set is None:
+        shard_set = g.shards = acquire_shards()
+    return shard_set
+
+# Constant instruction prefix, sent as the /api/chat system message. Everything that varies
+# per request goes after it, so Ollama can reuse the prefix's KV cache across requests.
+SYSTEM_PROMPT = """آپ ایک مختصر قانونی مددگار ہیں۔
 سوال اردو میں ہوگا۔ آپ کا جواب سادہ، مختصر (۲–۳ جملے) اور واضح ہونا چاہیے۔
 اگر مواد کافی نہ ہو تو مختصراً بتائیں کہ معلومات دستیاب نہیں۔
+حوالہ متن صرف سمجھنے کیلئے ہے، اس کا حوالہ نہ دیں۔
+جواب اردو میں ۲–۳ جملوں میں، سادہ زبان میں دیں۔"""
 
-سوال:
-{user_query}
-
-حوالہ متن (صرف سمجھنے کیلئے، حوالہ نہ دیں):
+def build_prompt(context_chunks, user_query):
+    # the user message: context first, question last
+    ctx = "\n\n---\n\n".join(context_chunks)
+    prompt = f"""حوالہ متن:
 {ctx}
 
-جواب اردو میں ۲–۳ جملوں میں، سادہ زبان میں دیں:"""
+سوال:
+{user_query}"""
     return prompt
 
-def call_ollama(ollama_url, model_name, prompt):
-    url = f"{ollama_url}/api/generate"
-    payload = {"model": model_name, "prompt": prompt, "stream": False}
-    r = requests.post(url, json=payload, timeout=120)
-    r.raise_for_status()
-    data = r.json()
-    return data.get("response", "").strip()
+def make_prompt(contexts, user_query, trace):
+    # packs the retrieved chunks into the prompt token budget (PACKER None: paste them all)
+    with trace.span("prompt"):
+        if PACKER is not None and contexts:
+            overhead = PACKER.counter.count(SYSTEM_PROMPT) + PACKER.counter.count(build_prompt([], user_query))
+            contexts, packed = PACKER.pack(contexts, user_query, overhead, lexicon=LEXICON)
+            trace.tokens(overhead + packed["tokens_out"], packed["tokens_saved"])
+            if packed["over_budget"]:
+                log.warning("prompt template + question take %d of %d budget tokens; kept only the top chunk's "
+                            "best sentence (raise --prompt-token-budget)", overhead, PACKER.budget)
+        return build_prompt(contexts if contexts else ["(کوئی متعلقہ متن نہیں ملا)"], user_query)
+
+def extractive_answer(contexts):
+    best = contexts[0] if contexts else "معاف کیجئے، ابھی جواب دستیاب نہیں۔"
+    return best[:450] + ("..." if len(best) > 450 else "")
+
+def degraded(contexts, reason: str):
+    metrics.DEGRADED.inc(reason)
+    return extractive_answer(contexts)
+
+def degrade_reason(exc, deadline) -> str:
+    if isinstance(exc, LLMQueueFull):
+        return "queue_full"
+    if isinstance(exc, LLMDeadlineExceeded) or remaining(deadline) == 0:
+        return "deadline"
+    return "error"
+
+def sse(payload: dict) -> str:
+    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
 
 # ---------- Flask ----------
 app = Flask(__name__)
@@ -107,46 +340,783 @@ app = Flask(__name__)
 def index():
     return render_template_string(xcommand.UI_HTML)
 
+def requires_ready(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not READY.is_set():
+            resp = jsonify({"answer": "سروس شروع ہو رہی ہے، براہِ کرم چند لمحے بعد دوبارہ کوشش کریں۔",
+                            "ready": False, "stage": STARTUP["stage"]})
+            resp.status_code = 503
+            resp.headers["Retry-After"] = "5"
+            return resp
+        return view(*args, **kwargs)
+    return wrapper
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    if STARTUP["state"] == "failed":
+        return jsonify({"status": "failed", "error": STARTUP["error"]}), 500
+    return jsonify({"status": "ok"})
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    index = SHARDS.info() if READY.is_set() else None
+    return jsonify({"ready": READY.is_set(), **STARTUP, "index": index}), (200 if READY.is_set() else 503)
+
+@app.after_request
+def index_version_header(resp):
+    # which index generation answered (see reload_index)
+    shard_set = g.get("shards")
+    if shard_set is not None:
+        resp.headers["X-Index-Version"] = f"{shard_set.generation}:{shard_set.opened_version}"
+    return resp
+
+@app.teardown_request
+def release_shards(exc=None):
+    shard_set = g.pop("shards", None)
+    if shard_set is not None:
+        shard_set.release()
+
+def request_shards(data):
+    # -> (shard names or None, None) or (None, 400 response) for unknown names
+    shard_set = current_shards()
+    try:
+        names = data.get("shards") or None
+        shard_set.select(names)
+        return names, None
+    except ValueError as e:
+        return None, (jsonify({"error": str(e), "shards": [s.name for s in shard_set]}), 400)
+
+def request_deadline(data):
+    # -> (deadline, None) or (None, 400 response) for a malformed "deadline_ms"
+    try:
+        return ADMISSION.deadline(data.get("deadline_ms")), None
+    except (TypeError, ValueError):
+        return None, (jsonify({"error": "deadline_ms must be a number of milliseconds"}), 400)
+
+def overloaded(predicted_s: float, reason="predicted"):
+    metrics.SHED.inc(reason)
+    resp = jsonify({"answer": "سروس اس وقت مصروف ہے، براہِ کرم تھوڑی دیر بعد دوبارہ کوشش کریں۔", "overloaded": True})
+    resp.status_code = 503
+    resp.headers["Retry-After"] = str(ADMISSION.retry_after(predicted_s))
+    return resp
+
+def cached_answer(q, shards=None, shard_set=None):
+    # answers to routed requests (a subset of shards) are neither looked up nor stored, and
+    # requests still running on a set a reload replaced keep out of the new corpus' cache
+    # The version is the fingerprint the set was opened at, not the files' current one: a
+    # rebuild renamed over the DB must not relabel the old snapshot's answers as the new corpus'.
+    shard_set = shard_set or current_shards()
+    if ANSWER_CACHE is None or shards or shard_set.retired:
+        return None
+    ANSWER_CACHE.ensure_version(shard_set.opened_version)
+    return ANSWER_CACHE.lookup(q)
+
+def cache_answer(q, answer: str, shards=None, shard_set=None):
+    # best effort: a cache failure must not cost the answer it was asked to keep
+    shard_set = shard_set or current_shards()
+    if ANSWER_CACHE is None or shards or shard_set.retired:
+        return
+    try:
+        ANSWER_CACHE.store(q, answer, version=shard_set.opened_version)
+    except Exception:
+        log.exception("could not cache the answer")
+
+def with_timing(payload: dict, trace: Trace) -> dict:
+    if request.args.get("debug") == "timing":
+        payload["timing"] = trace.timing()
+    return payload
+
 @app.route("/chat", methods=["POST"])
+@requires_ready
 def chat():
     data = request.get_json(force=True)
     user_query = (data.get("message") or "").strip()
     if not user_query:
         return jsonify({"answer": "براہِ کرم سوال لکھیں۔"})
 
+    deadline, bad = request_deadline(data)
+    if bad:
+        return bad
+    shards, bad = request_shards(data)
+    if bad:
+        return bad
+
+    trace = Trace("chat", user_query)
     try:
-        contexts = hybrid_search(DB_CON, EMBED_MODEL, user_query, top_k=4, fts_k=120)
-        prompt = build_prompt(contexts if contexts else ["(کوئی متعلقہ متن نہیں ملا)"], user_query)
+        with trace.span("encode"):
+            q = encode_query(EMBED_MODEL, user_query)
+        with trace.span("answer_cache"):
+            cached = cached_answer(q, shards)
+        if cached is not None:
+            trace.finish()
+            return jsonify(with_timing({"answer": cached, "cached": True}, trace))
+
+        decision, predicted = ADMISSION.decide(deadline)
+        if decision == SHED:
+            trace.finish()
+            return overloaded(predicted)
+        contexts = retrieve(user_query, q=q, trace=trace, shards=shards)
+        if decision == ADMIT:
+            decision, predicted = ADMISSION.decide(deadline)
+            if decision == SHED:
+                trace.finish()
+                return overloaded(predicted)
+        if decision == DEGRADE:
+            trace.finish()
+            return jsonify(with_timing({"answer": degraded(contexts, "predicted"), "degraded": True}, trace))
+        prompt = make_prompt(contexts, user_query, trace)
 
         try:
-            answer = call_ollama(OLLAMA_URL, OLLAMA_MODEL, prompt)
+            with trace.span("llm"):
+                answer = LLM.generate(prompt, timeout=remaining(deadline))
             answer = "\n".join(answer.splitlines()).strip()
-        except Exception:
-            best = contexts[0] if contexts else "معاف کیجئے، ابھی جواب دستیاب نہیں۔"
-            answer = best[:450] + ("..." if len(best) > 450 else "")
+        except Exception as e:
+            reason = degrade_reason(e, deadline)
+            if reason == "error":
+                log.exception("ollama call failed; serving extractive answer")
+                trace.error("llm")
+            else:
+                log.warning("ollama call gave up (%s); serving extractive answer", reason)
+            if reason == "queue_full" and ADMISSION.policy == SHED:
+                trace.finish()
+                return overloaded(ADMISSION.predict_ms() / 1000.0, reason)
+            trace.finish()
+            return jsonify(with_timing({"answer": degraded(contexts, reason), "degraded": True}, trace))
 
-        return jsonify({"answer": answer})
+        cache_answer(q, answer, shards)
+        trace.finish()
+        return jsonify(with_timing({"answer": answer}, trace))
     except Exception:
+        log.exception("chat failed for query %r", user_query[:80])
+        trace.error()
+        trace.finish()
         return jsonify({"answer": "ایک خرابی پیش آگئی۔"}), 500
 
-def boot(model_path, db_path, dll_path, ollama_url, ollama_model, host, port, debug):
-    global DB_CON, EMBED_MODEL, OLLAMA_URL, OLLAMA_MODEL
-    EMBED_MODEL = SentenceTransformer(model_path)
-    DB_CON = connect_db(db_path, dll_path)
+@app.route("/chat/stream", methods=["POST"])
+@requires_ready
+def chat_stream():
+    # Server-sent events: {"token": ...} per generated piece, then {"done": true}.
+    # If Ollama fails or misses the deadline before the first token, the extractive answer is
+    # sent instead ({"answer": ..., "fallback": true, "degraded": true}).
+    data = request.get_json(force=True)
+    user_query = (data.get("message") or "").strip()
+    if not user_query:
+        return jsonify({"answer": "براہِ کرم سوال لکھیں۔"})
+    deadline, bad = request_deadline(data)
+    if bad:
+        return bad
+    shards, bad = request_shards(data)
+    if bad:
+        return bad
+
+    trace = Trace("chat_stream", user_query)
+    debug = request.args.get("debug") == "timing"
+    shard_set = current_shards()
+    try:
+        with trace.span("encode"):
+            q = encode_query(EMBED_MODEL, user_query)
+        with trace.span("answer_cache"):
+            cached = cached_answer(q, shards)
+        if cached is None:
+            decision, predicted = ADMISSION.decide(deadline, stream=True)
+            if decision == SHED:
+                trace.finish()
+                return overloaded(predicted)
+            contexts = retrieve(user_query, q=q, trace=trace, shards=shards)
+            if decision == ADMIT:
+                decision, predicted = ADMISSION.decide(deadline, stream=True)
+                if decision == SHED:
+                    trace.finish()
+                    return overloaded(predicted)
+            if decision == ADMIT:
+                prompt = make_prompt(contexts, user_query, trace)
+    except Exception:
+        log.exception("chat stream failed for query %r", user_query[:80])
+        trace.error()
+        trace.finish()
+        return jsonify({"answer": "ایک خرابی پیش آگئی۔"}), 500
+
+    def events():
+        if cached is not None:
+            yield sse({"answer": cached, "cached": True})
+        elif decision == DEGRADE:
+            yield sse({"answer": degraded(contexts, "predicted"), "fallback": True, "degraded": True})
+        else:
+            tokens = []
+            t0 = time.perf_counter()
+            try:
+                for token in LLM.stream(prompt, timeout=remaining(deadline)):
+                    if not tokens:
+                        trace.stages["llm_first_token"] = time.perf_counter() - t0
+                    tokens.append(token)
+                    yield sse({"token": token})
+            except Exception as e:
+                reason = degrade_reason(e, deadline)
+                if reason == "error":
+                    log.exception("ollama stream failed after %d tokens", len(tokens))
+                    trace.error("llm")
+                else:
+                    log.warning("ollama stream gave up (%s) after %d tokens", reason, len(tokens))
+                if not tokens:
+                    yield sse({"answer": degraded(contexts, reason), "fallback": True, "degraded": True})
+                else:
+                    yield sse({"error": True})
+            else:
+                if not tokens:
+                    yield sse({"answer": degraded(contexts, "empty"), "fallback": True, "degraded": True})
+                else:
+                    cache_answer(q, "".join(tokens).strip(), shards, shard_set)
+            trace.stages["llm"] = time.perf_counter() - t0
+            STAGE_SECONDS.observe("llm", trace.stages["llm"])
+            if "llm_first_token" in trace.stages:
+                STAGE_SECONDS.observe("llm_first_token", trace.stages["llm_first_token"])
+        trace.finish()
+        yield sse({"done": True, "timing": trace.timing()} if debug else {"done": True})
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# ---------- batch ----------
+# The pipeline stages (batch.py) for /chat/batch and --batch-in. No deadline and no admission
+# control: offline questions wait for their LLM slot, but take at most --batch-llm-workers of
+# them (default: one fewer than --llm-concurrency, so interactive /chat always has a slot).
+def batch_retrieve(item, q):
+    if not item["message"].strip():
+        raise ValueError("empty message")
+    shards = item.get("shards") or None
+    with shard_lease() as shard_set:
+        shard_set.select(shards)  # unknown names fail this item only
+        trace = Trace("chat_batch", item["message"])
+        with trace.span("answer_cache"):
+            cached = cached_answer(q, shards, shard_set)
+        if cached is not None:
+            return {"answer": cached, "cached": True}
+        return retrieve(item["message"], q=q, trace=trace, shards=shards, shard_set=shard_set), trace, shard_set
+
+def batch_answer(item, q, state):
+    if isinstance(state, dict):
+        return state
+    contexts, trace, shard_set = state
+    prompt = make_prompt(contexts, item["message"], trace)
+    try:
+        with trace.span("llm"):
+            answer = "\n".join(LLM.generate(prompt).splitlines()).strip()
+    except Exception as e:
+        reason = degrade_reason(e, None)
+        log.warning("batch item %r: ollama call failed (%s: %s); extractive answer", item["id"], reason, e)
+        trace.error("llm")
+        return {"answer": degraded(contexts, reason), "degraded": True, "reason": reason}
+    cache_answer(q, answer, item.get("shards"), shard_set)
+    return {"answer": answer}
+
+def run_batch(in_path: str, out_path: str) -> dict:
+    # CLI mode: answers in_path into out_path, skipping the ids out_path already answers
+    skip = done_ids(out_path)
+    items = read_questions(in_path, skip)
+    log.info("batch: %d questions to answer (%d already in %s)", len(items), len(skip), out_path)
+    writer = JSONLWriter(out_path)
+    try:
+        stats = BATCH.run(items, writer, progress_every=100, log=log)
+    finally:
+        writer.close()
+    stats["skipped"] = len(skip)
+    return stats
+
+@app.route("/chat/batch", methods=["POST"])
+@requires_ready
+def chat_batch():
+    # JSONL questions in, one JSON result line per question out as each is answered (completion
+    # order, matched by "id"), then {"done": true, "stats": {...}}. A client resumes a broken
+    # run by sending only the ids it has no answer for.
+    try:
+        items = parse_questions(request.get_data().splitlines())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if len(items) > BATCH_MAX_QUESTIONS:
+        return jsonify({"error": f"{len(items)} questions; at most {BATCH_MAX_QUESTIONS} per upload "
+                                 "(--batch-max-questions), or use --batch-in"}), 413
+    if not BATCH_SLOT.acquire(blocking=False):
+        return jsonify({"error": "another batch is running; retry when it finishes"}), 429
+    # bounded, so a slow reader holds the pipeline back instead of piling up answers; a reader
+    # that goes away sets cancel, which stops the pipeline and frees its Ollama slots for /chat
+    results = queue.Queue(BATCH.queue_size)
+    cancel = threading.Event()
+
+    def put(record):
+        while not cancel.is_set():
+            try:
+                return results.put(record, timeout=0.5)
+            except queue.Full:
+                pass
+
+    def run():
+        try:
+            stats = BATCH.run(items, put, cancel=cancel)
+            if cancel.is_set():
+                log.info("batch cancelled by the client: %d of %d questions answered",
+                         stats["answered"], stats["questions"])
+            put({"done": True, "stats": stats})
+        except Exception as e:
+            log.exception("batch of %d questions failed", len(items))
+            put({"done": True, "error": f"{type(e).__name__}: {e}"})
+        finally:
+            BATCH_SLOT.release()
+        put(None)
+
+    threading.Thread(target=run, name="chat-batch", daemon=True).start()
+
+    def lines():
+        # records carry the input fields, so the end is marked by None rather than by "done"
+        try:
+            for record in iter(results.get, None):
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+        finally:
+            cancel.set()  # also runs when the client disconnects and the server closes the response
+
+    response = Response(lines(), mimetype="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+    response.call_on_close(cancel.set)  # a client gone before the first line never starts lines()
+    return response
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/stats/embed", methods=["GET"])
+def embed_stats():
+    if isinstance(EMBED_MODEL, (BatchEmbedder, EmbedClient)):
+        return jsonify(EMBED_MODEL.stats())
+    return jsonify({"batching": False})
+
+@app.route("/stats/llm", methods=["GET"])
+@requires_ready
+def llm_stats():
+    admission = {**ADMISSION.stats(), "degraded": metrics.DEGRADED.values(), "shed": metrics.SHED.values()}
+    return jsonify({**LLM.stats(), "admission": admission})
+
+@app.route("/stats/shards", methods=["GET"])
+@requires_ready
+def shard_stats():
+    shard_set = current_shards()
+    return jsonify({"index": shard_set.info(), "shards": shard_set.stats()})
+
+def admin_allowed() -> bool:
+    # the X-Admin-Token header must match --admin-token; without one the admin API is off
+    # (behind a same-host reverse proxy every client is loopback, so the address proves nothing)
+    if not ADMIN_TOKEN:
+        return False
+    return hmac.compare_digest(request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN)
+
+@app.route("/admin/reload", methods=["GET", "POST"])
+def admin_reload():
+    # POST: reopen the served databases (or {"db": [...]} to switch to others) in the background;
+    # GET: progress of the last reload and the index being served
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "admin API disabled; start the server with --admin-token"}), 403
+    if not admin_allowed():
+        return jsonify({"error": "forbidden"}), 403
+    if not READY.is_set():
+        return jsonify({"error": "not ready", "stage": STARTUP["stage"]}), 503
+    if request.method == "GET":
+        return jsonify(reload_status())
+    db = (request.get_json(silent=True) or {}).get("db")
+    if RELOAD_VIA_PARENT:
+        # a reload here would only reach this worker; serve.py forwards SIGHUP to every worker
+        if db is not None:
+            return jsonify({"error": "cannot switch databases under serve.py; restart it with the new --db"}), 400
+        os.kill(os.getppid(), signal.SIGHUP)
+        return jsonify({**reload_status(), "state": "reloading", "workers": "all"}), 202
+    if db is not None:
+        try:
+            check_reload_specs(parse_shards([db] if isinstance(db, str) else db))
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+    if RELOAD_LOCK.locked():
+        return jsonify({**reload_status(), "error": "a reload is already running"}), 409
+    threading.Thread(target=reload_index, args=(db, "admin"), kwargs={"block": False}, name="index-reload",
+                     daemon=True).start()
+    return jsonify({**reload_status(), "state": "reloading"}), 202
+
+@app.route("/stats/cache", methods=["GET"])
+def cache_stats():
+    return jsonify({
+        "answers": ANSWER_CACHE.stats() if ANSWER_CACHE is not None else None,
+        "chunk_texts": CHUNK_CACHE.stats() if CHUNK_CACHE is not None else None,
+    })
+
+def reload_on_signal(signum, frame):
+    if not READY.is_set():
+        log.warning("SIGHUP before startup finished; the index being opened is already current")
+        return
+    threading.Thread(target=reload_index, kwargs={"reason": "signal", "block": False}, name="index-reload",
+                     daemon=True).start()
+
+def boot(model_path, db_path, dll_path, ollama_url, ollama_model, host, port, debug, listen_fd=None, **options):
+    global RELOAD_VIA_PARENT
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, reload_on_signal)
+        RELOAD_VIA_PARENT = listen_fd is not None
+    threading.Thread(target=start, args=(model_path, db_path, dll_path, ollama_url, ollama_model),
+                     kwargs=options, name="startup", daemon=True).start()
+    if listen_fd is not None:
+        # serve.py worker: accept on the socket the parent bound and shares with its siblings
+        make_server(host, port, app, threaded=True, fd=listen_fd).serve_forever()
+        return
+    # no reloader: its parent process would load the model a second time
+    app.run(host=host, port=port, debug=debug, use_reloader=False, threaded=True)
+
+def start(model_path, db_path, dll_path, ollama_url, ollama_model, warmup=True, **options):
+    t0 = time.perf_counter()
+    try:
+        configure(model_path, db_path, dll_path, ollama_url, ollama_model, **options)
+        if warmup:
+            warm_up()
+    except BaseException as e:
+        STARTUP.update(state="failed", error=f"{type(e).__name__}: {e}")
+        raise
+    STARTUP.update(state="ready", stage=None, seconds=round(time.perf_counter() - t0, 2))
+    READY.set()
+    log.info("ready in %.1fs", STARTUP["seconds"])
+
+def warm_up(queries=WARMUP_QUERIES):
+    # first-call costs (kernel selection, allocator growth, FTS/vector pages, Ollama model load)
+    # are paid here instead of by the first users
+    startup_stage("warm-up: encoder")
+    for query in queries:
+        encode_query(EMBED_MODEL, query)
+    if isinstance(EMBED_MODEL, (BatchEmbedder, EmbedClient)):
+        EMBED_MODEL.embed_many(list(queries))
+    startup_stage("warm-up: retrieval")
+    for query in queries:
+        retrieve(query)
+    startup_stage("warm-up: ollama")
+    STARTUP["llm_warm"] = LLM.warm()
+    if not STARTUP["llm_warm"]:
+        log.warning("Ollama at %s did not load %s; /chat will use extractive answers until it does",
+                    OLLAMA_URL, OLLAMA_MODEL)
+
+def configure(model_path, db_path, dll_path, ollama_url, ollama_model,
+              embed_window_ms=DEFAULT_EMBED_WINDOW_MS, embed_max_batch=DEFAULT_EMBED_MAX_BATCH,
+              chunk_cache_mb=DEFAULT_CHUNK_CACHE_MB, vector_backend="vec0", vector_dir=None,
+              vector_rescore=200, ivf_nprobe=16, answer_cache_size=1024, answer_cache_threshold=0.95,
+              answer_cache_ttl=86400.0, answer_cache_db=None, llm_concurrency=2, llm_queue=32, ollama_keep_alive=-1, slow_ms=5000.0,
+              db_pool_size=8, wal=True, fusion_method="weighted", fusion_weights=(1.0, 0.3, 0.1), rrf_k=60,
+              lexicon_path=DEFAULT_LEXICON, encoder=None, embed_backend="torch", embed_server=None,
+              prompt_token_budget=1024, dedup_threshold=0.8, tokenizer=None,
+              chars_per_token=DEFAULT_CHARS_PER_TOKEN, ollama_options=None, deadline_s=30.0, overload=DEGRADE,
+              batch_encode_size=64, batch_retrieve_workers=4, batch_llm_workers=None, batch_max_questions=1000,
+              watch_index=0.0, admin_token=None):
+    # sets up the module globals the routes use; encoder replaces load_encoder(model_path),
+    # embed_server sends queries to a shared embedserver.py process instead.
+    # db_path is one database or a list of shards (NAME=PATH or PATH); DB_POOL, VECTOR_INDEX,
+    # CHUNK_CACHE and LEXICON belong to the first one.
+    global PACKER, EMBED_MODEL, OLLAMA_URL, OLLAMA_MODEL, ANSWER_CACHE, LLM, ADMISSION, BATCH, WATCHER, ADMIN_TOKEN
+    global BATCH_MAX_QUESTIONS
+    specs = parse_shards([db_path] if isinstance(db_path, str) else db_path)
+    if vector_dir and len(specs) > 1:
+        raise ValueError("--vector-dir names one store; with several shards each uses <db>.vec")
+    if embed_server:
+        startup_stage("connecting to embedding server")
+        EMBED_MODEL = EmbedClient(embed_server)
+    else:
+        startup_stage("loading encoder")
+        EMBED_MODEL = BatchEmbedder(encoder or load_encoder(model_path, embed_backend),
+                                    window_ms=embed_window_ms, max_batch=embed_max_batch)
+    SHARD_OPTIONS.update(dll_path=dll_path, vector_backend=vector_backend, vector_dir=vector_dir,
+                         vector_rescore=vector_rescore, ivf_nprobe=ivf_nprobe, db_pool_size=db_pool_size, wal=wal,
+                         lexicon_path=lexicon_path, chunk_cache_mb=chunk_cache_mb, fusion_method=fusion_method,
+                         fusion_weights=tuple(fusion_weights), rrf_k=rrf_k)
+    install_shards(open_shard_set(specs, startup_stage))
+    ANSWER_CACHE = None
+    if answer_cache_size > 0:
+        ANSWER_CACHE = SemanticAnswerCache(answer_cache_size, threshold=answer_cache_threshold, ttl=answer_cache_ttl,
+                                           db_path=answer_cache_db, version=SHARDS.opened_version)
+    PACKER = None
+    if prompt_token_budget > 0:
+        PACKER = ContextPacker(prompt_token_budget, TokenCounter(tokenizer, chars_per_token),
+                               dedup_threshold=dedup_threshold)
     OLLAMA_URL = ollama_url
     OLLAMA_MODEL = ollama_model
-    app.run(host=host, port=port, debug=debug)
+    LLM = OllamaClient(ollama_url, ollama_model, max_concurrency=llm_concurrency, max_queue=llm_queue,
+                       keep_alive=ollama_keep_alive, system=SYSTEM_PROMPT, options=ollama_options)
+    ADMISSION = AdmissionController(LLM, deadline_s=deadline_s, policy=overload)
+    BATCH = BatchPipeline(lambda texts: encode_queries(EMBED_MODEL, texts), batch_retrieve, batch_answer,
+                          encode_batch=batch_encode_size, retrieve_workers=batch_retrieve_workers,
+                          llm_workers=batch_llm_workers or max(1, llm_concurrency - 1))
+    BATCH_MAX_QUESTIONS = batch_max_questions
+    metrics.SLOW_MS = slow_ms
+    metrics.register_collector(runtime_gauges)
+    ADMIN_TOKEN = admin_token
+    if WATCHER is not None:
+        WATCHER.stop()
+    WATCHER = None
+    if watch_index > 0:
+        WATCHER = IndexWatcher(lambda: [path for _, path in SHARDS.specs()], lambda reason: reload_index(reason=reason),
+                               interval=watch_index,
+                               store_for=lambda path: vector_dir or default_store_path(path)).start()
+
+def open_shard_set(specs, stage=None, generation=1) -> ShardSet:
+    # opens every shard with configure()'s options; stage(msg) reports progress
+    o = SHARD_OPTIONS
+    cache_bytes = int(o["chunk_cache_mb"] * 1024 * 1024 / len(specs))
+    shards = []
+    try:
+        for name, path in specs:
+            if stage is not None:
+                stage("opening database" if len(specs) == 1 else f"opening shard {name}")
+            shards.append(open_shard(name, path, o["dll_path"], o["vector_backend"], o["vector_dir"],
+                                     o["vector_rescore"], o["ivf_nprobe"], o["db_pool_size"], o["wal"],
+                                     o["lexicon_path"], cache_bytes))
+    except BaseException:
+        for shard in shards:
+            shard.close()
+        raise
+    fusion = Fusion(o["fusion_method"], *o["fusion_weights"], rrf_k=o["rrf_k"], term_bits=shards[0].term_bits)
+    return ShardSet(shards, fusion=fusion, generation=generation)
+
+def install_shards(shard_set: ShardSet) -> ShardSet:
+    # the atomic swap: requests that lease after this see only the new set; returns the old one
+    global SHARDS, DB_PATH, DB_POOL, VECTOR_INDEX, CHUNK_CACHE, LEXICON, DEFAULT_FUSION
+    primary = shard_set.primary
+    with SHARD_LOCK:
+        old, SHARDS = SHARDS, shard_set
+        DB_PATH, DB_POOL, VECTOR_INDEX = primary.path, primary.pool, primary.vector_index
+        CHUNK_CACHE, LEXICON, DEFAULT_FUSION = primary.text_cache, primary.lexicon, shard_set.fusion
+    return old
+
+def check_reload_specs(specs):
+    # --vector-dir is the store of the one database given at startup: a reload may reopen that
+    # database, but not move to others, which would be searched through the old vectors
+    vector_dir = SHARD_OPTIONS["vector_dir"]
+    if not vector_dir:
+        return
+    if len(specs) > 1:
+        raise ValueError("--vector-dir names one store; with several shards each uses <db>.vec")
+    if [os.path.abspath(path) for _, path in specs] != [os.path.abspath(path) for _, path in SHARDS.specs()]:
+        raise ValueError(f"--vector-dir {vector_dir} belongs to the served database; "
+                         "restart without it to switch databases")
+
+def validate_shards(shard_set: ShardSet, query=WARMUP_QUERIES[1]):
+    # smoke query on every shard before the set serves: the schema, FTS and vector index must
+    # answer, with vectors of the encoder's dimension
+    q = encode_query(EMBED_MODEL, query)
+    for shard in shard_set:
+        hits = sharded_search(shard_set, EMBED_MODEL, query, top_k=4, fts_k=120, q=q, fusion=shard_set.fusion,
+                              shards=[shard.name])
+        if not hits:
+            raise ValueError(f"smoke query found nothing in {shard.path}")
+
+def reload_index(db_path=None, reason="admin", block=True):
+    # Opens the databases (default: the served paths, e.g. rebuilt and renamed over) and their
+    # vector indexes next to the live set, validates them, swaps them in and retires the old
+    # set once its in-flight requests are done. On failure the old set keeps serving.
+    # Cached answers are cleared when the corpus version changed; query embeddings do not
+    # depend on the corpus and chunk-text caches belong to the retired set.
+    if not RELOAD_LOCK.acquire(blocking=block):
+        return None
+    try:
+        t0 = time.perf_counter()
+        old = SHARDS
+        specs = parse_shards([db_path] if isinstance(db_path, str) else db_path) if db_path else old.specs()
+        RELOAD.update(state="reloading", reason=reason, error=None)
+        log.info("index reload (%s): opening %s", reason, ", ".join(path for _, path in specs))
+        try:
+            check_reload_specs(specs)
+            new = open_shard_set(specs, generation=old.generation + 1)
+            try:
+                validate_shards(new)
+            except BaseException:
+                new.close()
+                raise
+        except Exception as e:
+            metrics.RELOADS.inc("failed")
+            RELOAD.update(state="failed", error=f"{type(e).__name__}: {e}", seconds=round(time.perf_counter() - t0, 3),
+                          finished_at=datetime.now().isoformat(timespec="seconds"))
+            log.exception("index reload (%s) failed; still serving generation %d", reason, old.generation)
+            return dict(RELOAD)
+        install_shards(new)
+        if ANSWER_CACHE is not None:
+            # always: the fingerprint (size, mtime) can miss a rebuild, and answers stored by
+            # requests that started before the swap belong to the old set
+            ANSWER_CACHE.clear()
+            ANSWER_CACHE.ensure_version(new.opened_version)
+        old.retire()
+        if WATCHER is not None:
+            WATCHER.reset()
+        metrics.RELOADS.inc("ok")
+        RELOAD.update(state="ok", seconds=round(time.perf_counter() - t0, 3),
+                      finished_at=datetime.now().isoformat(timespec="seconds"))
+        log.info("index reload (%s): serving generation %d (%s) after %.2fs", reason, new.generation,
+                 new.opened_version, RELOAD["seconds"])
+        return dict(RELOAD)
+    finally:
+        RELOAD_LOCK.release()
+
+def reload_status() -> dict:
+    return {**RELOAD, "serving": SHARDS.info()}
+
+def open_shard(name, db_path, dll_path, vector_backend, vector_dir, vector_rescore, ivf_nprobe, db_pool_size, wal,
+               lexicon_path, cache_bytes) -> Shard:
+    if vector_backend != "vec0":
+        index = open_index(vector_dir or default_store_path(db_path), vector_backend, rescore=vector_rescore,
+                           nprobe=ivf_nprobe)
+        dll_path = None
+    else:
+        index = VEC0
+    if wal:
+        enable_wal(db_path)
+    pool = ConnectionPool(lambda: connect_db(db_path, dll_path, readonly=True), size=db_pool_size)
+    try:
+        with pool.connection() as con:
+            if index is not VEC0:
+                index.verify(con)
+            term_bits = term_index_ok(con)
+            normalized = fts_normalized(con)
+    except BaseException:
+        pool.close()
+        raise
+    if not normalized:
+        log.warning("chunks_fts in %s is not normalized; run `python urdutext.py reindex --db ...`", db_path)
+    if not term_bits:
+        log.warning("no keyword bitmaps in %s; run `python fusion.py build --db ...` to stop scanning texts per request",
+                    db_path)
+    return Shard(name, db_path, pool, index, ChunkTextCache(cache_bytes) if cache_bytes > 0 else None,
+                 Lexicon.load(lexicon_path, normalize=normalized), term_bits)
+
+def runtime_gauges():
+    llm = LLM.stats()
+    yield "urdu_agent_llm_queue_depth", "gauge", "Requests waiting for an Ollama generation slot.", llm["queue_depth"]
+    yield "urdu_agent_llm_active", "gauge", "Generations currently running in Ollama.", llm["active"]
+    yield "urdu_agent_llm_coalesced_total", "counter", "Requests served by an identical in-flight generation.", llm["coalesced"]
+    yield "urdu_agent_llm_rejected_total", "counter", "Requests rejected because the LLM queue was full.", llm["rejected"]
+    yield ("urdu_agent_llm_predicted_seconds", "gauge", "Predicted time until a newly admitted request gets its answer.",
+           round(ADMISSION.predict_ms() / 1000.0, 3))
+    if isinstance(EMBED_MODEL, (BatchEmbedder, EmbedClient)):
+        emb = EMBED_MODEL.stats()
+        yield "urdu_agent_embed_queue_depth", "gauge", "Queries waiting for the embedding batcher.", emb["queue_depth"]
+        yield "urdu_agent_embed_mean_batch_size", "gauge", "Mean queries per encode batch.", emb["mean_batch_size"]
+    idle = sum(shard.pool.stats()["idle"] for shard in SHARDS)
+    yield "urdu_agent_db_connections_idle", "gauge", "Idle pooled SQLite connections.", idle
+    yield "urdu_agent_index_generation", "gauge", "Index generation being served (1 at start, +1 per reload).", \
+        SHARDS.generation
+    if ANSWER_CACHE is not None:
+        cache = ANSWER_CACHE.stats()
+        yield "urdu_agent_answer_cache_hits_total", "counter", "Semantic answer cache hits.", cache["hits"]
+        yield "urdu_agent_answer_cache_misses_total", "counter", "Semantic answer cache misses.", cache["misses"]
+
+def parse_keep_alive(value: str):
+    # Ollama takes a duration string ("30m") or a number of seconds (-1 = forever)
+    try:
+        return int(value)
+    except ValueError:
+        return value
 
 if __name__ == "__main__":
     ap = argparse.ArgumentParser(description="Flask Urdu chatbot over SQLite+vec0 retrieval + Ollama.")
     ap.add_argument("--model", default=DEFAULT_MODEL)
-    ap.add_argument("--db", default=DEFAULT_DB)
+    ap.add_argument("--embed-window-ms", type=float, default=DEFAULT_EMBED_WINDOW_MS,
+                    help="How long to collect concurrent queries into one encode batch")
+    ap.add_argument("--embed-max-batch", type=int, default=DEFAULT_EMBED_MAX_BATCH,
+                    help="Maximum number of queries per encode batch")
+    ap.add_argument("--embed-backend", choices=["torch", "onnx"], default="torch",
+                    help="onnx: run the encoder with ONNX Runtime; the export is saved next to the model on first use")
+    ap.add_argument("--embed-server", default=None,
+                    help="Address of a running embedserver.py; the model is not loaded in this process")
+    ap.add_argument("--listen-fd", type=int, default=None, help=argparse.SUPPRESS)
+    ap.add_argument("--no-warmup", action="store_true", help="Report ready without warming the encoder, DB and Ollama")
+    ap.add_argument("--db", nargs="+", default=[DEFAULT_DB],
+                    help="Embeddings database, or several shards searched in parallel (NAME=PATH names a shard "
+                         "for request routing with \"shards\": [NAME, ...])")
     ap.add_argument("--dll", default=DEFAULT_DLL)
+    ap.add_argument("--db-pool-size", type=int, default=8,
+                    help="Read-only SQLite connections per database, shared by request threads")
+    ap.add_argument("--no-wal", action="store_true", help="Do not switch the database to WAL journal mode")
+    ap.add_argument("--vector-backend", choices=["vec0", *INDEX_BACKENDS], default="vec0",
+                    help="vec0: sqlite-vec KNN; numpy: exact search over the memory-mapped export (no DLL needed); "
+                         "int8/binary: quantized scan of that export with exact rescoring; "
+                         "ivf: approximate search of the export's IVF index (`python vecstore.py ivf`)")
+    ap.add_argument("--vector-rescore", type=int, default=200,
+                    help="Rows rescored at full precision after a quantized scan")
+    ap.add_argument("--ivf-nprobe", type=int, default=16,
+                    help="IVF lists scanned per query: higher is slower and closer to exact")
+    ap.add_argument("--vector-dir", default=None, help="NumPy vector store directory (default: <db>.vec)")
+    ap.add_argument("--fusion", choices=FUSION_METHODS, default="weighted",
+                    help="weighted: w_vec*cosine + w_bm25*normalized BM25 + w_kw*keyword hits; rrf: reciprocal rank fusion")
+    ap.add_argument("--fusion-weights", type=float, nargs=3, default=[1.0, 0.3, 0.1], metavar=("W_VEC", "W_BM25", "W_KW"))
+    ap.add_argument("--rrf-k", type=float, default=60)
+    ap.add_argument("--lexicon", default=DEFAULT_LEXICON, help="JSON list of Urdu synonym groups for FTS expansion")
+    ap.add_argument("--prompt-token-budget", type=int, default=1024,
+                    help="Pack retrieved chunks into this many prompt tokens (0 pastes them unpacked)")
+    ap.add_argument("--dedup-threshold", type=float, default=0.8,
+                    help="Word-shingle Jaccard similarity above which a chunk counts as a duplicate")
+    ap.add_argument("--tokenizer", default=None,
+                    help="HF tokenizer of the Ollama model for exact token counts (needs transformers)")
+    ap.add_argument("--chars-per-token", type=float, default=DEFAULT_CHARS_PER_TOKEN,
+                    help="Token estimate used without --tokenizer")
+    ap.add_argument("--chunk-cache-mb", type=float, default=DEFAULT_CHUNK_CACHE_MB,
+                    help="In-process LRU for hot chunk texts (0 disables)")
+    ap.add_argument("--answer-cache-size", type=int, default=1024, help="Cached answers kept in memory (0 disables)")
+    ap.add_argument("--answer-cache-threshold", type=float, default=0.95,
+                    help="Minimum cosine similarity between query embeddings for a cache hit")
+    ap.add_argument("--answer-cache-ttl", type=float, default=86400.0, help="Seconds before a cached answer expires")
+    ap.add_argument("--answer-cache-db", default=None, help="SQLite file to persist cached answers across restarts")
     ap.add_argument("--ollama-url", default=DEFAULT_OLLAMA_URL)
     ap.add_argument("--ollama-model", default=DEFAULT_OLLAMA_MODEL, help="Your local Ollama model tag (e.g., gemma2:2b, llama3.1, etc.)")
+    ap.add_argument("--ollama-keep-alive", default="-1",
+                    help="Ollama keep_alive sent with every request (-1 keeps the model loaded)")
+    ap.add_argument("--ollama-options", type=json.loads, default={},
+                    help='JSON model options sent unchanged with every request, e.g. \'{"num_ctx": 4096}\'')
+    ap.add_argument("--llm-concurrency", type=int, default=2, help="Generations allowed in Ollama at once")
+    ap.add_argument("--llm-queue", type=int, default=32, help="Requests allowed to wait for a generation slot")
+    ap.add_argument("--deadline-s", type=float, default=30.0,
+                    help="Per-request answer deadline (0 disables); clients may send a shorter deadline_ms")
+    ap.add_argument("--overload", choices=OVERLOAD_POLICIES, default=DEGRADE,
+                    help="When the LLM would miss the deadline: serve the extractive answer now, or 503 + Retry-After")
+    ap.add_argument("--batch-in", default=None,
+                    help="Answer the JSONL questions in this file and exit instead of serving (see batch.py)")
+    ap.add_argument("--batch-out", default=None,
+                    help="JSONL results for --batch-in, appended as they finish; a rerun skips ids already answered")
+    ap.add_argument("--batch-encode-size", type=int, default=64, help="Questions per encode call in batch mode")
+    ap.add_argument("--batch-retrieve-workers", type=int, default=4, help="Retrieval threads in batch mode")
+    ap.add_argument("--batch-llm-workers", type=int, default=None,
+                    help="Generations a batch keeps in flight (default: --llm-concurrency, minus one when serving "
+                         "so /chat keeps a slot)")
+    ap.add_argument("--batch-max-questions", type=int, default=1000,
+                    help="Largest /chat/batch upload; one upload runs at a time (--batch-in has no limit)")
+    ap.add_argument("--watch-index", type=float, default=0.0, metavar="SECONDS",
+                    help="Poll the databases (and vector stores) this often and hot-reload them when rebuilt (0: off)")
+    ap.add_argument("--admin-token", default=os.environ.get("URDU_AGENT_ADMIN_TOKEN"),
+                    help="Enables /admin/reload for requests sending it in X-Admin-Token (default: admin API off)")
+    ap.add_argument("--slow-ms", type=float, default=5000.0, help="Log requests slower than this with a stage breakdown")
     ap.add_argument("--host", default="127.0.0.1")
     ap.add_argument("--port", type=int, default=5000)
     ap.add_argument("--debug", action="store_true")
     args = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.batch_in and not args.batch_out:
+        ap.error("--batch-in needs --batch-out")
 
-    boot(args.model, args.db, args.dll, args.ollama_url, args.ollama_model, args.host, args.port, args.debug)
+    options = dict(
+        embed_window_ms=args.embed_window_ms, embed_max_batch=args.embed_max_batch,
+        chunk_cache_mb=args.chunk_cache_mb, vector_backend=args.vector_backend, vector_dir=args.vector_dir,
+        vector_rescore=args.vector_rescore, ivf_nprobe=args.ivf_nprobe, answer_cache_size=args.answer_cache_size,
+        answer_cache_threshold=args.answer_cache_threshold, answer_cache_ttl=args.answer_cache_ttl,
+        answer_cache_db=args.answer_cache_db, llm_concurrency=args.llm_concurrency, llm_queue=args.llm_queue,
+        ollama_keep_alive=parse_keep_alive(args.ollama_keep_alive), slow_ms=args.slow_ms,
+        db_pool_size=args.db_pool_size, wal=not args.no_wal, fusion_method=args.fusion,
+        fusion_weights=tuple(args.fusion_weights), rrf_k=args.rrf_k, lexicon_path=args.lexicon,
+        embed_backend=args.embed_backend, warmup=not args.no_warmup, embed_server=args.embed_server,
+        listen_fd=args.listen_fd, prompt_token_budget=args.prompt_token_budget,
+        dedup_threshold=args.dedup_threshold, tokenizer=args.tokenizer, chars_per_token=args.chars_per_token,
+        ollama_options=args.ollama_options, deadline_s=args.deadline_s, overload=args.overload,
+        batch_encode_size=args.batch_encode_size, batch_retrieve_workers=args.batch_retrieve_workers,
+        batch_llm_workers=args.batch_llm_workers or (args.llm_concurrency if args.batch_in else None),
+        batch_max_questions=args.batch_max_questions,
+        watch_index=0.0 if args.batch_in else args.watch_index, admin_token=args.admin_token)
+    if args.batch_in:
+        options.pop("listen_fd")
+        start(args.model, args.db, args.dll, args.ollama_url, args.ollama_model, **options)
+        print(json.dumps(run_batch(args.batch_in, args.batch_out), indent=2))
+    else:
+        boot(args.model, args.db, args.dll, args.ollama_url, args.ollama_model, args.host, args.port, args.debug,
+             **options)
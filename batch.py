@@ -0,0 +1,244 @@
+# batch.py
+# Offline / bulk question answering as a three-stage pipeline:
+#   encode    one thread, questions encoded in batches of `encode_batch`
+#   retrieve  `retrieve_workers` threads (FTS + KNN + fusion, answer-cache lookup)
+#   llm       `llm_workers` threads, i.e. at most that many generations in flight
+# Stages are joined by bounded queues, so encoding runs ahead of retrieval and retrieval
+# ahead of the LLM by at most `queue_size` questions, and the LLM stage never waits on the
+# other two once the pipeline is full. Results come out in completion order.
+#
+# Input is JSONL, one question per line: {"id": ..., "message": "...", ...} (a bare JSON
+# string also works; id defaults to the line number). Every input field is copied to the
+# output record next to "answer". write_results appends and flushes record by record, and
+# a rerun with the same --batch-out skips the ids already answered, so a crashed run
+# resumes where it stopped. Records with "error" or "degraded" are retried on resume.
+#
+#   python app.py --db embeddings.db --batch-in questions.jsonl --batch-out answers.jsonl
+#   curl --data-binary @questions.jsonl -H "Content-Type: application/x-ndjson" localhost:5000/chat/batch
+
+import json
+import os
+import queue
+import threading
+import time
+
+_END = object()
+
+
+def parse_questions(lines, skip=()) -> list:
+    # JSONL lines -> [{"id": ..., "message": ...}, ...]; blank lines are ignored, ids in skip dropped
+    items, seen = [], set()
+    for n, line in enumerate(lines, 1):
+        line = line.strip() if isinstance(line, str) else line.decode("utf-8").strip()
+        if not line:
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError:
+            raise ValueError(f"line {n}: not valid JSON")
+        if isinstance(item, str):
+            item = {"message": item}
+        if not isinstance(item, dict) or not isinstance(item.get("message"), str):
+            raise ValueError(f'line {n}: expected {{"message": "..."}} or a JSON string')
+        item.setdefault("id", n)
+        if item["id"] in seen:
+            raise ValueError(f"line {n}: duplicate id {item['id']!r}")
+        seen.add(item["id"])
+        if item["id"] not in skip:
+            items.append(item)
+    return items
+
+
+def read_questions(path: str, skip=()) -> list:
+    with open(path, encoding="utf-8") as f:
+        return parse_questions(f, skip)
+
+
+def done_ids(path: str) -> set:
+    # ids with a usable answer in an earlier (possibly crashed) run's output; a torn last line is ignored
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(rec, dict) and "answer" in rec and not rec.get("error") and not rec.get("degraded"):
+                done.add(rec.get("id"))
+    return done
+
+
+class JSONLWriter:
+    # thread-safe append-only output; each record is flushed (and fsynced) before the next
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        torn = os.path.exists(path) and os.path.getsize(path) > 0 and not _ends_with_newline(path)
+        self._f = open(path, "a", encoding="utf-8")
+        if torn:
+            self._f.write("\n")  # a crash mid-record left half a line; start on a fresh one
+        self.records = 0
+
+    def __call__(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._f.write(line)
+            self._f.flush()
+            os.fsync(self._f.fileno())
+            self.records += 1
+
+    def close(self):
+        self._f.close()
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class _Stage:
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.busy = 0.0
+        self.items = 0
+        self._lock = threading.Lock()
+
+    def add(self, seconds, items=1):
+        with self._lock:
+            self.busy += seconds
+            self.items += items
+
+    def stats(self, wall: float) -> dict:
+        # utilization: share of the stage's worker-seconds spent working rather than waiting
+        return {"workers": self.workers, "items": self.items, "busy_s": round(self.busy, 3),
+                "utilization": round(self.busy / (wall * self.workers), 3) if wall > 0 else 0.0}
+
+
+class BatchPipeline:
+    # encode(messages) -> one query vector per message
+    # retrieve(item, q) -> state passed on to answer (e.g. contexts, or a cached answer)
+    # answer(item, q, state) -> dict merged into the output record
+    def __init__(self, encode, retrieve, answer, encode_batch=32, retrieve_workers=4, llm_workers=2,
+                 queue_size=64):
+        self.encode = encode
+        self.retrieve = retrieve
+        self.answer = answer
+        self.encode_batch = max(1, int(encode_batch))
+        self.retrieve_workers = max(1, int(retrieve_workers))
+        self.llm_workers = max(1, int(llm_workers))
+        self.queue_size = max(1, int(queue_size))
+
+    def run(self, items, emit, progress_every=0, log=None, cancel=None) -> dict:
+        # emit(record) is called once per item from the LLM stage threads; returns run stats.
+        # Once cancel (a threading.Event) is set, no stage starts new work: queued items are
+        # drained without being encoded, retrieved or answered, and are counted as "cancelled".
+        cancel = cancel or threading.Event()
+        items = list(items)
+        stages = {"encode": _Stage("encode", 1), "retrieve": _Stage("retrieve", self.retrieve_workers),
+                  "llm": _Stage("llm", self.llm_workers)}
+        to_retrieve = queue.Queue(self.queue_size)
+        to_answer = queue.Queue(self.queue_size)
+        counts = {"done": 0, "errors": 0, "cancelled": 0}
+        lock = threading.Lock()
+        t0 = time.perf_counter()
+
+        def finish(item, result=None, error=None):
+            record = dict(item)
+            if error is not None:
+                record["error"] = f"{type(error).__name__}: {error}"
+            else:
+                record.update(result)
+            emit(record)
+            with lock:
+                counts["done"] += 1
+                counts["errors"] += error is not None
+                done = counts["done"]
+            if log is not None and progress_every and done % progress_every == 0:
+                wall = time.perf_counter() - t0
+                log.info("batch: %d/%d answered, %.2f questions/s", done, len(items), done / wall)
+
+        def skip(n=1):
+            with lock:
+                counts["cancelled"] += n
+
+        def encoder():
+            try:
+                for i in range(0, len(items), self.encode_batch):
+                    chunk = items[i:i + self.encode_batch]
+                    if cancel.is_set():
+                        skip(len(items) - i)
+                        break
+                    t = time.perf_counter()
+                    try:
+                        vecs = self.encode([it["message"] for it in chunk])
+                    except Exception as e:
+                        for it in chunk:
+                            finish(it, error=e)
+                        continue
+                    finally:
+                        stages["encode"].add(time.perf_counter() - t, len(chunk))
+                    for it, q in zip(chunk, vecs):
+                        to_retrieve.put((it, q))
+            finally:
+                for _ in range(self.retrieve_workers):
+                    to_retrieve.put(_END)
+
+        def retriever():
+            while True:
+                job = to_retrieve.get()
+                if job is _END:
+                    return
+                it, q = job
+                if cancel.is_set():
+                    skip()
+                    continue
+                t = time.perf_counter()
+                try:
+                    state = self.retrieve(it, q)
+                except Exception as e:
+                    finish(it, error=e)
+                    continue
+                finally:
+                    stages["retrieve"].add(time.perf_counter() - t)
+                to_answer.put((it, q, state))
+
+        def answerer():
+            while True:
+                job = to_answer.get()
+                if job is _END:
+                    return
+                it, q, state = job
+                if cancel.is_set():
+                    skip()
+                    continue
+                t = time.perf_counter()
+                try:
+                    result = self.answer(it, q, state)
+                except Exception as e:
+                    stages["llm"].add(time.perf_counter() - t)
+                    finish(it, error=e)
+                    continue
+                stages["llm"].add(time.perf_counter() - t)
+                finish(it, result)
+
+        retrievers = [threading.Thread(target=retriever, name=f"batch-retrieve-{i}", daemon=True)
+                      for i in range(self.retrieve_workers)]
+        answerers = [threading.Thread(target=answerer, name=f"batch-llm-{i}", daemon=True)
+                     for i in range(self.llm_workers)]
+        for th in [*retrievers, *answerers]:
+            th.start()
+        encoder()  # on the calling thread; blocks while retrieval is a full queue behind
+        for th in retrievers:
+            th.join()
+        for _ in answerers:
+            to_answer.put(_END)
+        for th in answerers:
+            th.join()
+
+        wall = time.perf_counter() - t0
+        return {"questions": len(items), "answered": counts["done"] - counts["errors"], "errors": counts["errors"],
+                "cancelled": counts["cancelled"], "seconds": round(wall, 3), "questions_per_s": round(counts["done"] / wall, 3) if wall > 0 else 0.0,
+                "stages": {name: s.stats(wall) for name, s in stages.items()}}
@@ -0,0 +1,1402 @@
+# bench.py
+# Offline micro-benchmarks for the retrieval path.
+# Builds a synthetic Urdu corpus in the same `chunks` schema that hybrid_search reads
+# and times individual stages against it.
+#
+#   python bench.py fetch --chunks 100000 --queries 2000
+#   python bench.py vectors --chunks 200000 [--dll vec0.dll]
+#   python bench.py quantized --chunks 200000 --rescore 200
+#   python bench.py pool --chunks 100000 --workers 1 2 4 8
+#   python bench.py fts --chunks 100000
+#   python bench.py suite --chunks 100000 --clients 1 4 16 --out run.json   # retrieval + /chat vs fake Ollama
+#   python bench.py compare base.json run.json
+#   python bench.py pack --top-k 8 --budget 768                           # context packing: tokens saved
+#   python bench.py prefix [--ollama-url http://127.0.0.1:11434]        # prefill: prompt layout vs KV-cache reuse
+#   python bench.py workers --workers 1 2 4 --clients 16                   # serve.py scaling: RSS + req/s
+#   python bench.py overload --clients 16 --deadline-s 3                  # admission control vs a slow LLM
+#   python bench.py ann --sizes 100000 1000000 --nprobe 4 16 64          # IVF: recall@k and latency vs exact
+#   python bench.py shards --chunks-per-shard 20000 --shards 1 2 4        # one DB vs the same corpus in shards
+#   python bench.py batch --questions 200 --llm-concurrency 1 2 4         # pipelined batch answers vs serial /chat
+#   python bench.py reload --clients 8 --every-s 1                        # /chat latency while the index hot-reloads
+
+import argparse
+import json
+import logging
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from chunkstore import ChunkTextCache, fetch_texts
+from urdutext import (DEFAULT_LEXICON, NORMALIZATION_VERSION, STOPWORDS, Lexicon, normalize_urdu, set_meta,
+                      tokens)
+from vecstore import (INDEX_BACKENDS, IVF_FILE, QUANT_MODES, IVFVectorIndex, NumpyVectorIndex, QuantizedVectorIndex,
+                      Vec0Index, build_ivf, default_store_path, export_vectors, open_index, quantize_store,
+                      recall_at_k, write_store)
+
+URDU_WORDS = [
+    "حبسِ", "جسم", "ہیبیس", "کارپس", "غیر", "قانونی", "گرفتاری", "حراست", "وارنٹ", "آئینی",
+    "درخواست", "ہائی", "کورٹ", "عدالت", "ضمانت", "ملزم", "پولیس", "مقدمہ", "دفعہ", "قانون",
+    "حکم", "فیصلہ", "اپیل", "شہری", "حقوق", "آئین", "پاکستان", "جج", "وکیل", "سماعت",
+    "ثبوت", "گواہ", "سزا", "جرمانہ", "رہائی", "تفتیش", "ریمانڈ", "مجسٹریٹ", "ایف", "آئی",
+    "آر", "کے", "کی", "میں", "سے", "اور", "کو", "پر", "ہے", "ہیں",
+]
+
+
+def synthetic_text(rng: random.Random, n_words: int) -> str:
+    words = rng.choices(URDU_WORDS, k=n_words)
+    return " ".join(words) + "۔"
+
+
+def make_chunks_db(path: str, n: int, seed=0, words=(60, 160), fts=False) -> str:
+    rng = random.Random(seed)
+    con = sqlite3.connect(path)
+    con.execute("PRAGMA journal_mode = OFF;")
+    con.execute("PRAGMA synchronous = OFF;")
+    con.execute("CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY, text TEXT NOT NULL);")
+    if fts:
+        con.execute("CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(text);")
+    batch = []
+
+    def flush():
+        con.executemany("INSERT INTO chunks (id, text) VALUES (?, ?);", batch)
+        if fts:
+            con.executemany("INSERT INTO chunks_fts (rowid, text) VALUES (?, ?);",
+                            [(i, normalize_urdu(t)) for i, t in batch])
+        batch.clear()
+
+    for i in range(1, n + 1):
+        batch.append((i, synthetic_text(rng, rng.randint(*words))))
+        if len(batch) >= 10000:
+            flush()
+    if batch:
+        flush()
+    if fts:
+        set_meta(con, "fts_normalization", NORMALIZATION_VERSION)
+    con.commit()
+    con.close()
+    return path
+
+
+def percentiles(samples_ms) -> dict:
+    s = sorted(samples_ms)
+    if not s:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0}
+    pick = lambda q: s[min(len(s) - 1, int(round(q * (len(s) - 1))))]
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99), "mean": statistics.fmean(s)}
+
+
+def _timed(fn, id_sets) -> list:
+    out = []
+    for ids in id_sets:
+        t0 = time.perf_counter()
+        fn(ids)
+        out.append((time.perf_counter() - t0) * 1000.0)
+    return out
+
+
+def bench_fetch(args):
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix="urdu-bench-"), "chunks.db")
+    if not os.path.exists(path):
+        t0 = time.perf_counter()
+        make_chunks_db(path, args.chunks)
+        print(f"built {args.chunks} chunks in {time.perf_counter() - t0:.1f}s -> {path}")
+    con = sqlite3.connect(path, check_same_thread=False)
+    n = con.execute("SELECT MAX(id) FROM chunks;").fetchone()[0]
+
+    # skewed ids: a hot set that repeats, like popular questions do
+    rng = random.Random(1)
+    hot = [rng.randint(1, n) for _ in range(args.hot)]
+    id_sets = []
+    for _ in range(args.queries):
+        pool = hot if rng.random() < args.hot_ratio else None
+        id_sets.append([rng.choice(pool) if pool else rng.randint(1, n) for _ in range(args.candidates)])
+
+    def per_row(ids):
+        return [con.execute("SELECT text FROM chunks WHERE id=?", (i,)).fetchone()[0] for i in ids]
+
+    cache = ChunkTextCache(int(args.cache_mb * 1024 * 1024))
+    results = {
+        "per_row": percentiles(_timed(per_row, id_sets)),
+        "bulk_in": percentiles(_timed(lambda ids: fetch_texts(con, ids), id_sets)),
+        "bulk_in_lru": percentiles(_timed(lambda ids: fetch_texts(con, ids, cache=cache), id_sets)),
+    }
+    print(f"chunks={n} queries={args.queries} candidates/query={args.candidates}")
+    for name, r in results.items():
+        print(f"  {name:12s} p50={r['p50']:.3f}ms p95={r['p95']:.3f}ms p99={r['p99']:.3f}ms mean={r['mean']:.3f}ms")
+    print(f"  lru: {cache.stats()}")
+
+
+def _retrieval_query(con, terms, fts_k=120, k=20):
+    # the SQLite part of hybrid_search: BM25 prefilter, then one bulk text fetch
+    expr = " OR ".join(f'"{t}"' for t in terms)
+    ids = [r[0] for r in con.execute(
+        "SELECT rowid FROM chunks_fts WHERE chunks_fts MATCH ? ORDER BY bm25(chunks_fts) LIMIT ?;",
+        (expr, fts_k)).fetchall()]
+    return fetch_texts(con, ids[:k])
+
+
+def _query_terms(n: int, seed=3):
+    rng = random.Random(seed)
+    return [rng.sample(URDU_WORDS[:40], 3) for _ in range(n)]
+
+
+def _process_worker(args):
+    path, terms = args
+    from app import connect_db
+    con = connect_db(path, readonly=True)
+    for t in terms:
+        _retrieval_query(con, t)
+    return len(terms)
+
+
+def bench_pool(args):
+    import concurrent.futures as cf
+    import multiprocessing as mp
+    from app import connect_db
+    from dbpool import ConnectionPool, enable_wal
+
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix="urdu-bench-"), "chunks_fts.db")
+    if not os.path.exists(path):
+        t0 = time.perf_counter()
+        make_chunks_db(path, args.chunks, fts=True)
+        print(f"built {args.chunks} chunks + FTS in {time.perf_counter() - t0:.1f}s -> {path}")
+    enable_wal(path)
+    terms = _query_terms(args.queries)
+    print(f"queries={args.queries} (FTS top-120 + bulk text fetch)")
+
+    for workers in args.workers:
+        shared = connect_db(path)
+        pool = ConnectionPool(lambda: connect_db(path, readonly=True), size=workers)
+
+        def run_shared(t):
+            return _retrieval_query(shared, t)
+
+        def run_pool(t):
+            with pool.connection() as con:
+                return _retrieval_query(con, t)
+
+        row = []
+        for name, fn in (("shared", run_shared), ("pool", run_pool)):
+            with cf.ThreadPoolExecutor(workers) as ex:
+                t0 = time.perf_counter()
+                list(ex.map(fn, terms))
+                row.append(f"{name}={len(terms) / (time.perf_counter() - t0):7.1f} req/s")
+        parts = [terms[i::workers] for i in range(workers)]
+        with mp.get_context("spawn").Pool(workers) as procs:
+            procs.map(_process_worker, [(path, terms[:workers])] * workers)  # warm imports
+            t0 = time.perf_counter()
+            procs.map(_process_worker, [(path, p) for p in parts])
+            row.append(f"processes={len(terms) / (time.perf_counter() - t0):7.1f} req/s")
+        print(f"  workers={workers:2d}  " + "  ".join(row))
+        pool.close()
+        shared.close()
+
+
+FIXED_SYNONYMS = [
+    "حبسِ جسم", "ہیبیس کارپس", "غیر قانونی گرفتاری", "غیر قانونی حراست",
+    "گرفتاری", "حراست", "وارنٹ", "آئینی درخواست", "ہائی کورٹ", "عدالت", "ضمانت",
+]
+UI_QUERIES = [
+    "غیر قانونی گرفتاری کو کیسے چیلنج کروں؟",
+    "ہائی کورٹ میں حبسِ جسم کی درخواست کا طریقہ کیا ہے؟",
+    "وارنٹ کے بغیر گرفتاری ہو تو کیا حق حاصل ہیں؟",
+    "ضمانت کے لیے کون سے کاغذات درکار ہوتے ہیں؟",
+]
+
+
+def _fixed_fts_query(query: str) -> str:
+    # the pre-lexicon expansion: the whole query as one phrase + the same 11 synonyms every time
+    terms = set([query.strip()] + FIXED_SYNONYMS)
+    return " OR ".join(f'"{t}"' for t in terms)
+
+
+def bench_fts(args):
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix="urdu-bench-"), "chunks_fts.db")
+    if not os.path.exists(path):
+        t0 = time.perf_counter()
+        make_chunks_db(path, args.chunks, fts=True)
+        print(f"built {args.chunks} chunks + FTS in {time.perf_counter() - t0:.1f}s -> {path}")
+    con = sqlite3.connect(path)
+    lexicon = Lexicon.load(args.lexicon)
+    rng = random.Random(5)
+    queries = UI_QUERIES + [" ".join(rng.sample(URDU_WORDS[:40], 3)) for _ in range(args.queries)]
+
+    print(f"queries={len(queries)} fts_k={args.fts_k}")
+    # lexicon-or: every expanded term OR-ed; lexicon: all content terms AND-ed, lexicon-or if that finds nothing
+    builds = (("fixed", lambda q: [_fixed_fts_query(q)]), ("lexicon-or", lambda q: [lexicon.fts_fallback(q)]),
+              ("lexicon", lexicon.fts_queries))
+    for name, build in builds:
+        times, sizes, matched, on_topic, all_terms, seen = [], [], [], [], [], set()
+        for q in queries:
+            t0 = time.perf_counter()
+            rows, expr = [], None
+            for expr in build(q):
+                if expr:
+                    rows = con.execute("""
+                        SELECT rowid, text FROM chunks_fts WHERE chunks_fts MATCH ?
+                        ORDER BY bm25(chunks_fts) LIMIT ?;""", (expr, args.fts_k)).fetchall()
+                if rows:
+                    break
+            times.append((time.perf_counter() - t0) * 1000.0)
+            sizes.append(len(rows))
+            # rows the expression matches before LIMIT: the candidate set fts_k is cut from
+            matched.append(con.execute("SELECT COUNT(*) FROM chunks_fts WHERE chunks_fts MATCH ?;",
+                                       (expr,)).fetchone()[0] if rows else 0)
+            # share of candidates that contain at least one / every content word of the query itself
+            words = [t for t in tokens(q) if len(t) > 1 and t not in STOPWORDS]
+            on_topic.append(sum(any(w in text for w in words) for _, text in rows) / max(1, len(rows)))
+            all_terms.append(sum(all(w in text for w in words) for _, text in rows) / max(1, len(rows)))
+            seen.update(r[0] for r in rows)
+        print(f"  {name:10s} {_fmt(percentiles(times))}  candidates/query={statistics.fmean(sizes):.1f}"
+              f"  matches/query={statistics.fmean(matched):.0f}  distinct candidates={len(seen)}"
+              f"  on-topic={statistics.fmean(on_topic):.2f}  all-terms={statistics.fmean(all_terms):.2f}")
+    for q in UI_QUERIES:
+        print(f"  {q}\n    -> {lexicon.fts_query(q)}")
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def synthetic_vectors(n: int, dim: int, seed=0, block=65536):
+    rng = np.random.default_rng(seed)
+    for start in range(0, n, block):
+        v = rng.standard_normal((min(block, n - start), dim), dtype=np.float32)
+        v /= np.linalg.norm(v, axis=1, keepdims=True)
+        yield start, v
+
+
+def make_vector_stores(root: str, n: int, dim: int, dtypes=("float32", "float16")):
+    # writes <root>/f32 (and <root>/f16) unless they already exist
+    f32 = os.path.join(root, "f32")
+    if not os.path.exists(os.path.join(f32, "vectors.npy")):
+        os.makedirs(root, exist_ok=True)
+        raw = np.lib.format.open_memmap(os.path.join(root, "raw.npy"), mode="w+", dtype=np.float32, shape=(n, dim))
+        for start, v in synthetic_vectors(n, dim):
+            raw[start:start + len(v)] = v
+        rowids = np.arange(1, n + 1)
+        write_store(f32, rowids, raw, dtype="float32")
+        if "float16" in dtypes:
+            write_store(os.path.join(root, "f16"), rowids, raw, dtype="float16")
+        del raw
+        os.remove(os.path.join(root, "raw.npy"))
+    return f32
+
+
+def synthetic_queries(n: int, dim: int, seed=7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    queries = rng.standard_normal((n, dim), dtype=np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def bench_vectors(args):
+    root = args.dir or tempfile.mkdtemp(prefix="urdu-vec-")
+    f32 = make_vector_stores(root, args.chunks, args.dim)
+
+    rng = np.random.default_rng(7)
+    queries = synthetic_queries(args.queries, args.dim)
+    cand_sets = [rng.choice(args.chunks, size=args.candidates, replace=False) + 1 for _ in range(args.queries)]
+
+    print(f"vectors={args.chunks} dim={args.dim} queries={args.queries} k={args.k}")
+    for name in ("f32", "f16"):
+        base = rss_mb()
+        t0 = time.perf_counter()
+        index = NumpyVectorIndex(os.path.join(root, name))
+        open_ms = (time.perf_counter() - t0) * 1000.0
+        full = _timed(lambda q: index.search(None, q, args.k), queries)
+        filt = [0.0] * len(queries)
+        for i, (q, ids) in enumerate(zip(queries, cand_sets)):
+            t0 = time.perf_counter()
+            index.search(None, q, args.k, ids.tolist())
+            filt[i] = (time.perf_counter() - t0) * 1000.0
+        size_mb = os.path.getsize(os.path.join(root, name, "vectors.npy")) / 2**20
+        print(f"  numpy-{name}: open={open_ms:.2f}ms file={size_mb:.0f}MB rss+={rss_mb() - base:.0f}MB")
+        print(f"    full     {_fmt(percentiles(full))}")
+        print(f"    filtered {_fmt(percentiles(filt))}")
+
+    # exactness against brute force on the float32 store
+    index = NumpyVectorIndex(f32)
+    mat = np.asarray(index.vectors)
+    for q in queries[:20]:
+        truth = np.argsort(-(mat @ q))[:args.k] + 1
+        got = [r for r, _ in index.search(None, q, args.k)]
+        assert list(truth) == got, "numpy backend is not exact"
+    print("  exact: ok (20 queries vs brute force)")
+
+    if args.dll:
+        path = os.path.join(root, "vec0.db")
+        con = sqlite3.connect(path)
+        con.enable_load_extension(True)
+        con.load_extension(args.dll)
+        if not con.execute("SELECT name FROM sqlite_master WHERE name='vectors';").fetchone():
+            con.execute(f"CREATE VIRTUAL TABLE vectors USING vec0(embedding float[{args.dim}]);")
+            for ids, block in _store_blocks(index):
+                con.executemany("INSERT INTO vectors(rowid, embedding) VALUES (?, ?);",
+                                [(int(r), v.tobytes()) for r, v in zip(ids, block)])
+            con.commit()
+        vec0 = Vec0Index()
+        base = rss_mb()
+        full = _timed(lambda q: vec0.search(con, q, args.k), queries)
+        filt = [0.0] * len(queries)
+        for i, (q, ids) in enumerate(zip(queries, cand_sets)):
+            t0 = time.perf_counter()
+            vec0.search(con, q, args.k, ids.tolist())
+            filt[i] = (time.perf_counter() - t0) * 1000.0
+        print(f"  vec0: file={os.path.getsize(path) / 2**20:.0f}MB rss+={rss_mb() - base:.0f}MB")
+        print(f"    full     {_fmt(percentiles(full))}")
+        print(f"    filtered {_fmt(percentiles(filt))}")
+
+
+def bench_quantized(args):
+    root = args.dir or tempfile.mkdtemp(prefix="urdu-vec-")
+    f32 = make_vector_stores(root, args.chunks, args.dim, dtypes=("float32",))
+    if not os.path.exists(os.path.join(f32, "bits.npy")):
+        t0 = time.perf_counter()
+        quantize_store(f32)
+        print(f"quantized in {time.perf_counter() - t0:.1f}s")
+    queries = synthetic_queries(args.queries, args.dim)
+    exact = NumpyVectorIndex(f32)
+
+    print(f"vectors={args.chunks} dim={args.dim} queries={args.queries} k={args.k} rescore={args.rescore}")
+    full = _timed(lambda q: exact.search(None, q, args.k), queries)
+    size = os.path.getsize(os.path.join(f32, "vectors.npy"))
+    print(f"  float32: scan={size / 2**20:.0f}MB  {_fmt(percentiles(full))}")
+    for mode, fname in (("int8", "sq8.npy"), ("binary", "bits.npy")):
+        index = QuantizedVectorIndex(f32, mode=mode, rescore=args.rescore)
+        lat = _timed(lambda q: index.search(None, q, args.k), queries)
+        qsize = os.path.getsize(os.path.join(f32, fname))
+        recall = recall_at_k(index, exact, queries[:args.recall_queries], args.k)
+        print(f"  {mode:7s}: scan={qsize / 2**20:.0f}MB ({size / qsize:.0f}x smaller) "
+              f"recall@{args.k}={recall:.3f}  {_fmt(percentiles(lat))}")
+
+
+def clustered_vectors(n: int, dim: int, seed=0, topics=1024, subtopics=16, block=65536):
+    # embedding-like rows: topic + subtopic direction + noise. I.i.d. Gaussian rows (synthetic_vectors)
+    # have no neighbourhood structure, so no ANN index can do better than a scan on them.
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((topics, dim), dtype=np.float32)
+    subs = rng.standard_normal((topics * subtopics, dim), dtype=np.float32)
+    for start in range(0, n, block):
+        m = min(block, n - start)
+        sub = rng.integers(0, topics * subtopics, m)
+        v = centres[sub // subtopics] + 0.7 * subs[sub] + 2.0 * rng.standard_normal((m, dim), dtype=np.float32)
+        v /= np.linalg.norm(v, axis=1, keepdims=True)
+        yield start, v
+
+
+def make_ann_store(root: str, n: int, dim: int, dtype="float32", seed=0) -> str:
+    path = os.path.join(root, f"ann-{n}-{dim}-{dtype}")
+    if not os.path.exists(os.path.join(path, "vectors.npy")):
+        os.makedirs(path, exist_ok=True)
+        raw = np.lib.format.open_memmap(os.path.join(path, "raw.npy"), mode="w+", dtype=np.float32, shape=(n, dim))
+        for start, v in clustered_vectors(n, dim, seed=seed):
+            raw[start:start + len(v)] = v
+        write_store(path, np.arange(1, n + 1), raw, dtype=dtype)
+        del raw
+        os.remove(os.path.join(path, "raw.npy"))
+    return path
+
+
+def bench_ann(args):
+    root = args.dir or tempfile.mkdtemp(prefix="urdu-ann-")
+    results = {}
+    for n in args.sizes:
+        path = make_ann_store(root, n, args.dim, args.dtype, seed=args.seed)
+        built = os.path.exists(os.path.join(path, IVF_FILE))
+        if built:
+            with open(os.path.join(path, IVF_FILE), encoding="utf-8") as f:
+                built = args.nlist in (None, json.load(f)["nlist"])
+        if not built:
+            t0 = time.perf_counter()
+            build_ivf(path, args.nlist, iters=args.iters)
+            print(f"  built IVF index for {n} rows in {time.perf_counter() - t0:.1f}s")
+        exact = NumpyVectorIndex(path)
+        ivf = IVFVectorIndex(path)
+        rng = np.random.default_rng(args.seed + 7)
+        # queries near stored rows, like a question phrased close to some chunk
+        base = np.asarray(exact.vectors[np.sort(rng.choice(n, args.queries, replace=False))], dtype=np.float32)
+        queries = base + 0.3 * rng.standard_normal(base.shape, dtype=np.float32) / np.sqrt(args.dim)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+        sample = queries[:args.recall_queries]
+        lat = _timed(lambda q: exact.search(None, q, args.k), sample)
+        truth = [{r for r, _ in exact.search(None, q, args.k)} for q in sample]
+        size = os.path.getsize(os.path.join(path, "vectors.npy"))
+        r = results[str(n)] = {"nlist": ivf.nlist, "exact": percentiles(lat), "ivf": {}}
+        print(f"rows={n} dim={args.dim} {args.dtype} ({size / 2**20:.0f}MB) nlist={ivf.nlist} k={args.k}")
+        print(f"  exact            {_fmt(r['exact'])}")
+        for nprobe in args.nprobe:
+            ivf.nprobe = nprobe
+            lat = _timed(lambda q: ivf.search(None, q, args.k), queries)
+            found = [{r for r, _ in ivf.search(None, q, args.k)} for q in sample]
+            recall = sum(len(t & f) for t, f in zip(truth, found)) / float(args.k * len(sample))
+            r["ivf"][str(nprobe)] = {"latency": percentiles(lat), f"recall@{args.k}": recall}
+            print(f"  ivf nprobe={nprobe:<4d} {_fmt(r['ivf'][str(nprobe)]['latency'])}  recall@{args.k}={recall:.3f}")
+        if args.filter_size:
+            # rowid filter (a metadata or FTS candidate set) larger than the exact-scoring limit
+            ivf.nprobe = args.nprobe[len(args.nprobe) // 2]
+            cands = [(rng.choice(n, min(n, args.filter_size), replace=False) + 1).tolist() for _ in sample]
+            t_exact, t_ivf, hits = [], [], 0
+            for q, ids in zip(sample, cands):
+                t0 = time.perf_counter()
+                want = {r for r, _ in exact.search(None, q, args.k, ids)}
+                t_exact.append((time.perf_counter() - t0) * 1000.0)
+                t0 = time.perf_counter()
+                got = {r for r, _ in ivf.search(None, q, args.k, ids)}
+                t_ivf.append((time.perf_counter() - t0) * 1000.0)
+                hits += len(want & got)
+            recall = hits / float(args.k * len(sample))
+            r["filtered"] = {"size": args.filter_size, "nprobe": ivf.nprobe, "exact": percentiles(t_exact),
+                             "ivf": percentiles(t_ivf), f"recall@{args.k}": recall}
+            print(f"  filtered to {args.filter_size} rowids: exact {_fmt(r['filtered']['exact'])}")
+            print(f"  {'':22s}ivf nprobe={ivf.nprobe} {_fmt(r['filtered']['ivf'])}  recall@{args.k}={recall:.3f}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+# ---------- end-to-end suite ----------
+class SyntheticEncoder:
+    # SentenceTransformer stand-in: a text embeds to the normalized sum of fixed random word
+    # vectors, so queries that share words with a chunk land near it and recall@k means something
+    def __init__(self, dim=384, seed=0):
+        self.dim = dim
+        self.seed = seed
+        self.table = np.random.default_rng(seed).standard_normal((len(URDU_WORDS), dim), dtype=np.float32)
+        self._words = {normalize_urdu(w): v for w, v in zip(URDU_WORDS, self.table)}
+
+    def _word(self, w: str) -> np.ndarray:
+        v = self._words.get(w)
+        if v is None:
+            v = np.random.default_rng(zlib.crc32(w.encode("utf-8")) + self.seed).standard_normal(self.dim, dtype=np.float32)
+            self._words[w] = v
+        return v
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=True, convert_to_numpy=True, **kwargs):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, t in enumerate(texts):
+            for w in tokens(t):
+                out[i] += self._word(w)
+        if normalize_embeddings:
+            out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        return out
+
+
+def make_corpus_db(path: str, n: int, encoder: SyntheticEncoder, dll=None, seed=0, words=(60, 160),
+                   quantize=QUANT_MODES, block=10000, part=None) -> str:
+    # same schema ingest.py writes (chunks, chunks_fts, chunk_terms, vectors) + the numpy export.
+    # part=(i, parts) keeps every parts-th chunk of the same corpus, renumbered from 1 like a
+    # separately ingested shard
+    from ingest import content_hash, open_db, write_batch
+    rng = np.random.default_rng(seed)
+    con = open_db(path, dll, encoder.dim)
+    for start in range(1, n + 1, block):
+        m = min(block, n + 1 - start)
+        lengths = rng.integers(words[0], words[1] + 1, size=m)
+        idx = rng.integers(0, len(URDU_WORDS), size=(m, words[1]))
+        mask = np.arange(words[1]) < lengths[:, None]
+        counts = np.zeros((m, len(URDU_WORDS)), dtype=np.float32)
+        np.add.at(counts, (np.repeat(np.arange(m), words[1])[mask.ravel()], idx[mask]), 1.0)
+        vecs = counts @ encoder.table
+        vecs /= np.linalg.norm(vecs, axis=1, keepdims=True)
+        rows = []
+        for j in range(m):
+            words_j = [URDU_WORDS[w] for w in idx[j, :lengths[j]]]
+            # sentence breaks every 8-24 words, so sentence-level trimming has something to work on
+            text = " ".join(w + "۔" if (k + 1) % (8 + (start + j + k // 24) % 17) == 0 else w
+                            for k, w in enumerate(words_j)).rstrip("۔") + "۔"
+            i = start + j
+            rows.append((i, f"synthetic/{i // 50:06d}.txt", i % 50, text, content_hash(text)))
+        if part is not None:
+            keep = [j for j, row in enumerate(rows) if (row[0] - 1) % part[1] == part[0]]
+            rows = [((rows[j][0] - 1) // part[1] + 1, *rows[j][1:]) for j in keep]
+            vecs = vecs[keep]
+        write_batch(con, rows, vecs)
+    con.execute("INSERT INTO chunks_fts(chunks_fts) VALUES ('optimize');")
+    con.commit()
+    out = export_vectors(con, default_store_path(path))
+    if quantize:
+        quantize_store(out, quantize)
+    con.close()
+    return path
+
+
+def suite_queries(n: int, seed=11):
+    # fixed set: the UI suggestions + seeded 3-5 word questions over the corpus vocabulary
+    rng = random.Random(seed)
+    tails = ("", " کیا ہے؟", " کیسے کریں؟", " کے بارے میں بتائیں")
+    out = list(UI_QUERIES)
+    while len(out) < n:
+        out.append(" ".join(rng.sample(URDU_WORDS[:40], rng.randint(3, 5))) + rng.choice(tails))
+    return out[:n]
+
+
+def _stage_percentiles(timings) -> dict:
+    # timings: list of {stage: ms}; one percentile block per stage
+    stages = {}
+    for t in timings:
+        for stage, ms in t.items():
+            if isinstance(ms, (int, float)):
+                stages.setdefault(stage, []).append(ms)
+    return {stage: percentiles(v) for stage, v in stages.items()}
+
+
+def bench_retrieval(path, store, encoder, queries, args) -> dict:
+    from app import VEC0, connect_db, hybrid_search
+    from fusion import Fusion, term_index_ok
+    from metrics import Trace
+
+    qvecs = encoder.encode(queries)
+    exact = NumpyVectorIndex(store)
+    fusion = None
+    out = {}
+    for backend in args.backends:
+        if backend == "vec0" and not args.dll:
+            print("  vec0: skipped (no --dll)")
+            continue
+        con = connect_db(path, args.dll if backend == "vec0" else None, readonly=True)
+        fusion = fusion or Fusion(term_bits=term_index_ok(con))
+        index = VEC0 if backend == "vec0" else open_index(store, backend, rescore=args.rescore)
+        timings, hits = [], 0
+        for query, q in zip(queries, qvecs):
+            trace = Trace("bench", query)
+            t0 = time.perf_counter()
+            got = hybrid_search(con, encoder, query, top_k=args.top_k, fts_k=args.fts_k,
+                                vector_index=index, q=q, trace=trace, fusion=fusion)
+            t = {k: v * 1000.0 for k, v in trace.stages.items()}
+            t["total"] = (time.perf_counter() - t0) * 1000.0
+            timings.append(t)
+            truth = fetch_texts(con, [r for r, _ in exact.search(None, q, args.top_k)])
+            hits += len(set(truth.values()).intersection(got))
+        # vector-index recall against the exact float32 scan, without the FTS prefilter
+        sample = qvecs[:args.recall_queries]
+        truth = [{r for r, _ in exact.search(None, q, args.k)} for q in sample]
+        found = [{r for r, _ in index.search(con, q, args.k)} for q in sample]
+        out[backend] = {
+            "stages": _stage_percentiles(timings),
+            f"recall@{args.k}": sum(len(t & f) for t, f in zip(truth, found)) / float(args.k * len(sample)),
+            f"hybrid_recall@{args.top_k}": hits / float(args.top_k * len(queries)),
+        }
+        con.close()
+        r = out[backend]
+        print(f"  {backend:7s} total {_fmt(r['stages']['total'])}  recall@{args.k}={r[f'recall@{args.k}']:.3f}"
+              f"  hybrid_recall@{args.top_k}={r[f'hybrid_recall@{args.top_k}']:.3f}")
+    return out
+
+
+def bench_e2e(path, encoder, queries, args) -> dict:
+    import requests
+    from werkzeug.serving import make_server
+
+    import app as server
+    from fakeollama import FakeOllama
+
+    fake = FakeOllama(ttft_ms=args.llm_ttft_ms, token_ms=args.llm_token_ms, tokens=args.llm_tokens).start()
+    server.start(None, path, args.dll if args.e2e_backend == "vec0" else None, fake.url, "fake",
+                     vector_backend=args.e2e_backend, vector_rescore=args.rescore,
+                     answer_cache_size=args.answer_cache, llm_concurrency=args.llm_concurrency,
+                     llm_queue=max(args.clients) * 2, db_pool_size=max(args.clients), encoder=encoder)
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    httpd = make_server("127.0.0.1", 0, server.app, threaded=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{httpd.server_port}/chat?debug=timing"
+    local = threading.local()
+
+    def one(query):
+        s = getattr(local, "session", None) or requests.Session()
+        local.session = s
+        t0 = time.perf_counter()
+        r = s.post(url, json={"message": query}, timeout=300)
+        ms = (time.perf_counter() - t0) * 1000.0
+        return ms, r.status_code, (r.json().get("timing") or {}) if r.ok else {}
+
+    import concurrent.futures as cf
+    out = {}
+    try:
+        one(queries[0])  # warm up
+        for clients in args.clients:
+            batch = (queries * (1 + args.e2e_requests // len(queries)))[:args.e2e_requests]
+            with cf.ThreadPoolExecutor(clients) as ex:
+                t0 = time.perf_counter()
+                results = list(ex.map(one, batch))
+                wall = time.perf_counter() - t0
+            out[str(clients)] = {
+                "requests": len(results),
+                "errors": sum(1 for _, code, _ in results if code != 200),
+                "req_per_s": len(results) / wall,
+                "latency": percentiles([ms for ms, _, _ in results]),
+                "stages": _stage_percentiles([t for _, _, t in results]),
+            }
+            r = out[str(clients)]
+            print(f"  clients={clients:3d} {r['req_per_s']:7.2f} req/s  {_fmt(r['latency'])}  errors={r['errors']}")
+    finally:
+        httpd.shutdown()
+        fake.stop()
+        server.EMBED_MODEL.close()
+        server.DB_POOL.close()
+    return out
+
+
+def bench_suite(args):
+    root = args.dir or tempfile.mkdtemp(prefix="urdu-suite-")
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, f"corpus-{args.chunks}-{args.dim}.db")
+    encoder = SyntheticEncoder(args.dim, seed=args.seed)
+    corpus = {"path": path, "chunks": args.chunks, "dim": args.dim}
+    if not os.path.exists(path):
+        t0 = time.perf_counter()
+        make_corpus_db(path, args.chunks, encoder, dll=args.dll, seed=args.seed)
+        corpus["build_s"] = round(time.perf_counter() - t0, 2)
+        print(f"built {args.chunks} chunks (dim {args.dim}) in {corpus['build_s']}s -> {path}")
+    corpus["db_mb"] = round(os.path.getsize(path) / 2**20, 1)
+    store = default_store_path(path)
+    if "ivf" in (*args.backends, args.e2e_backend) and not os.path.exists(os.path.join(store, IVF_FILE)):
+        build_ivf(store)
+    queries = suite_queries(args.queries, seed=args.seed + 11)
+
+    print(f"retrieval: queries={len(queries)} top_k={args.top_k} fts_k={args.fts_k}")
+    result = {
+        "meta": {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "queries": len(queries), "top_k": args.top_k,
+                 "fts_k": args.fts_k, "k": args.k, "rescore": args.rescore, "seed": args.seed,
+                 "cpus": os.cpu_count()},
+        "corpus": corpus,
+        "retrieval": bench_retrieval(path, store, encoder, queries, args),
+    }
+    if args.clients:
+        print(f"/chat: backend={args.e2e_backend} llm ttft={args.llm_ttft_ms}ms "
+              f"{args.llm_token_ms}ms/token x{args.llm_tokens}")
+        result["e2e"] = {"backend": args.e2e_backend, "llm": {"ttft_ms": args.llm_ttft_ms,
+                         "token_ms": args.llm_token_ms, "tokens": args.llm_tokens,
+                         "concurrency": args.llm_concurrency},
+                         "clients": bench_e2e(path, encoder, queries, args)}
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"wrote {args.out}")
+
+
+def bench_pack(args):
+    from app import build_prompt, connect_db, hybrid_search
+    from contextpack import ContextPacker, TokenCounter
+    from fusion import Fusion, term_index_ok
+    from metrics import Trace
+    from urdutext import Lexicon, normalize_urdu
+
+    root = args.dir or tempfile.mkdtemp(prefix="urdu-suite-")
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, f"corpus-{args.chunks}-{args.dim}.db")
+    encoder = SyntheticEncoder(args.dim, seed=args.seed)
+    if not os.path.exists(path):
+        make_corpus_db(path, args.chunks, encoder, seed=args.seed)
+    con = connect_db(path, readonly=True)
+    index = open_index(default_store_path(path), "numpy")
+    fusion = Fusion(term_bits=term_index_ok(con))
+    lexicon = Lexicon.load()
+    counter = TokenCounter(args.tokenizer, args.chars_per_token)
+    packer = ContextPacker(args.budget, counter, dedup_threshold=args.dedup_threshold)
+    queries = suite_queries(args.queries, seed=args.seed + 11)
+
+    def coverage(terms, chunks):
+        text = normalize_urdu(" ".join(chunks))
+        return sum(1 for t in terms if t in text) / max(1, len(terms))
+
+    before, after, saved, pack_ms, cov_raw, cov_packed, dups = [], [], [], [], [], [], 0
+    for query in queries:
+        chunks = hybrid_search(con, encoder, query, top_k=args.top_k, fts_k=120, vector_index=index,
+                               trace=Trace("bench", query), fusion=fusion)
+        overhead = counter.count(build_prompt([], query))
+        t0 = time.perf_counter()
+        packed, stats = packer.pack(chunks, query, overhead, lexicon=lexicon)
+        pack_ms.append((time.perf_counter() - t0) * 1000.0)
+        before.append(counter.count(build_prompt(chunks, query)))
+        after.append(counter.count(build_prompt(packed, query)))
+        saved.append(stats["tokens_saved"])
+        dups += stats["duplicates"]
+        terms = lexicon.expand(query)
+        cov_raw.append(coverage(terms, chunks))
+        cov_packed.append(coverage(terms, packed))
+    print(f"queries={len(queries)} top_k={args.top_k} budget={args.budget} "
+          f"counter={'tokenizer' if args.tokenizer else f'{args.chars_per_token} chars/token'}")
+    print(f"  prompt tokens  unpacked p50={percentiles(before)['p50']:.0f} p95={percentiles(before)['p95']:.0f}"
+          f"  packed p50={percentiles(after)['p50']:.0f} p95={percentiles(after)['p95']:.0f}"
+          f"  saved/request mean={statistics.fmean(saved):.0f} ({1 - sum(after) / sum(before):.0%})")
+    print(f"  duplicates dropped={dups}  query-term coverage unpacked={statistics.fmean(cov_raw):.2f}"
+          f" packed={statistics.fmean(cov_packed):.2f}")
+    print(f"  pack {_fmt(percentiles(pack_ms))}")
+
+
+def legacy_prompt(context_chunks, user_query):
+    # build_prompt before the system-message layout: question between the header and the context
+    ctx = "\n\n---\n\n".join(context_chunks)
+    return f"""آپ ایک مختصر قانونی مددگار ہیں۔
+سوال اردو میں ہوگا۔ آپ کا جواب سادہ، مختصر (۲–۳ جملے) اور واضح ہونا چاہیے۔
+اگر مواد کافی نہ ہو تو مختصراً بتائیں کہ معلومات دستیاب نہیں۔
+
+سوال:
+{user_query}
+
+حوالہ متن (صرف سمجھنے کیلئے، حوالہ نہ دیں):
+{ctx}
+
+جواب اردو میں ۲–۳ جملوں میں، سادہ زبان میں دیں:"""
+
+
+def bench_prefix(args):
+    import requests
+
+    from app import SYSTEM_PROMPT, build_prompt, connect_db, hybrid_search
+    from fakeollama import FakeOllama
+    from fusion import Fusion, term_index_ok
+    from metrics import Trace
+
+    root = args.dir or tempfile.mkdtemp(prefix="urdu-suite-")
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, f"corpus-{args.chunks}-{args.dim}.db")
+    encoder = SyntheticEncoder(args.dim, seed=args.seed)
+    if not os.path.exists(path):
+        make_corpus_db(path, args.chunks, encoder, seed=args.seed)
+    con = connect_db(path, readonly=True)
+    index = open_index(default_store_path(path), "numpy")
+    fusion = Fusion(term_bits=term_index_ok(con))
+    queries = suite_queries(args.queries, seed=args.seed + 11)
+    contexts = [hybrid_search(con, encoder, q, top_k=args.top_k, fts_k=120, vector_index=index,
+                              trace=Trace("bench", q), fusion=fusion) for q in queries]
+
+    fake = None
+    url, model = args.ollama_url, args.ollama_model
+    if not url:
+        fake = FakeOllama(ttft_ms=0.0, token_ms=args.llm_token_ms, tokens=args.llm_tokens,
+                          prefill_ms=args.prefill_ms).start()
+        url, model = fake.url, "fake"
+    options = json.loads(args.ollama_options)
+    session = requests.Session()
+
+    def legacy(q, ctx):
+        return "/api/generate", {"model": model, "prompt": legacy_prompt(ctx, q), "stream": False,
+                                 "keep_alive": -1, "options": options}
+
+    def chat(q, ctx):
+        return "/api/chat", {"model": model, "stream": False, "keep_alive": -1, "options": options,
+                             "messages": [{"role": "system", "content": SYSTEM_PROMPT},
+                                          {"role": "user", "content": build_prompt(ctx, q)}]}
+
+    where = f"fake Ollama ({args.prefill_ms}ms/prefill token)" if fake else f"{url} {model}"
+    print(f"queries={len(queries)} top_k={args.top_k} against {where}")
+    try:
+        for name, build in (("question-first /api/generate", legacy), ("system prefix /api/chat", chat)):
+            evals, eval_ms, lat = [], [], []
+            for i, (q, ctx) in enumerate(zip(queries, contexts)):
+                endpoint, payload = build(q, ctx)
+                t0 = time.perf_counter()
+                r = session.post(url + endpoint, json=payload, timeout=600)
+                r.raise_for_status()
+                if i == 0:
+                    continue  # the first request fills the cache for either layout
+                data = r.json()
+                lat.append((time.perf_counter() - t0) * 1000.0)
+                evals.append(data.get("prompt_eval_count", 0))
+                eval_ms.append(data.get("prompt_eval_duration", 0) / 1e6)
+            print(f"  {name:30s} prompt_eval tokens mean={statistics.fmean(evals):.0f}"
+                  f"  prefill p50={percentiles(eval_ms)['p50']:.1f}ms  latency {_fmt(percentiles(lat))}")
+    finally:
+        if fake:
+            fake.stop()
+
+
+def pid_memory_mb(pid: int, field="Pss") -> float:
+    # Pss splits shared pages (mmapped vectors, SQLite page cache, the file cache) across
+    # the processes that map them, so worker totals add up; Rss counts them in every worker
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return float("nan")
+
+
+def _synthetic_embed_server(address: str, authkey: str, dim: int, seed: int):
+    from embedserver import EmbedServer
+    EmbedServer(SyntheticEncoder(dim, seed=seed), address, authkey=authkey.encode("utf-8")).serve_forever()
+
+
+def bench_workers(args):
+    import concurrent.futures as cf
+    import multiprocessing as mp
+
+    import requests
+
+    from embedserver import new_authkey
+    from fakeollama import FakeOllama
+    from serve import bind, start_worker, stop
+
+    root = args.dir or tempfile.mkdtemp(prefix="urdu-suite-")
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, f"corpus-{args.chunks}-{args.dim}.db")
+    if not os.path.exists(path):
+        make_corpus_db(path, args.chunks, SyntheticEncoder(args.dim, seed=args.seed), seed=args.seed)
+    queries = suite_queries(args.queries, seed=args.seed + 11)
+    address = os.path.join(root, "embed.sock")
+    authkey = new_authkey()
+    embed = mp.get_context("spawn").Process(target=_synthetic_embed_server,
+                                            args=(address, authkey, args.dim, args.seed), daemon=True)
+    embed.start()
+    fake = FakeOllama(ttft_ms=args.llm_ttft_ms, token_ms=args.llm_token_ms, tokens=args.llm_tokens).start()
+    app_args = ["--db", path, "--vector-backend", "numpy", "--ollama-url", fake.url,
+                "--ollama-model", "fake", "--answer-cache-size", "0", "--llm-concurrency", str(args.llm_concurrency)]
+    print(f"chunks={args.chunks} clients={args.clients} requests={args.requests} "
+          f"llm ttft={args.llm_ttft_ms}ms {args.llm_token_ms}ms/token x{args.llm_tokens}")
+    results = {}
+    try:
+        for n in args.workers:
+            sock = bind("127.0.0.1", 0)
+            port = sock.getsockname()[1]
+            workers = [start_worker(address, authkey, "127.0.0.1", port, app_args, sock) for _ in range(n)]
+            url = f"http://127.0.0.1:{port}"
+            ready, deadline = 0, time.monotonic() + 300
+            while ready < 4 * n and time.monotonic() < deadline:
+                try:
+                    ok = requests.get(url + "/readyz", timeout=5).status_code == 200
+                except requests.RequestException:
+                    ok = False
+                ready = ready + 1 if ok else 0
+                time.sleep(0.05 if ok else 0.5)
+            local = threading.local()
+
+            def one(query):
+                s = getattr(local, "session", None) or requests.Session()
+                local.session = s
+                t0 = time.perf_counter()
+                r = s.post(url + "/chat", json={"message": query}, timeout=300)
+                return (time.perf_counter() - t0) * 1000.0, r.status_code
+
+            batch = (queries * (1 + args.requests // len(queries)))[:args.requests]
+            with cf.ThreadPoolExecutor(args.clients) as ex:
+                t0 = time.perf_counter()
+                out = list(ex.map(one, batch))
+                wall = time.perf_counter() - t0
+            rss = [pid_memory_mb(w.pid, "Rss") for w in workers]
+            pss = [pid_memory_mb(w.pid) for w in workers]
+            results[str(n)] = {"req_per_s": len(out) / wall, "latency": percentiles([ms for ms, _ in out]),
+                               "errors": sum(1 for _, code in out if code != 200),
+                               "worker_rss_mb": statistics.fmean(rss), "worker_pss_mb": statistics.fmean(pss),
+                               "total_pss_mb": sum(pss) + pid_memory_mb(embed.pid)}
+            r = results[str(n)]
+            print(f"  workers={n:2d} {r['req_per_s']:7.2f} req/s  {_fmt(r['latency'])}  errors={r['errors']}"
+                  f"  per worker rss={r['worker_rss_mb']:.0f}MB pss={r['worker_pss_mb']:.0f}MB"
+                  f"  total pss={r['total_pss_mb']:.0f}MB")
+            stop(workers)
+            sock.close()
+        print(f"  embedding process pss={pid_memory_mb(embed.pid):.0f}MB (the only process holding the model)")
+    finally:
+        fake.stop()
+        embed.terminate()
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"workers": results, "cpus": os.cpu_count()}, f, indent=2)
+
+
+def bench_overload(args):
+    import concurrent.futures as cf
+
+    import requests
+    from werkzeug.serving import make_server
+
+    import app as server
+    import metrics
+    from fakeollama import FakeOllama
+
+    root = args.dir or tempfile.mkdtemp(prefix="urdu-suite-")
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, f"corpus-{args.chunks}-{args.dim}.db")
+    encoder = SyntheticEncoder(args.dim, seed=args.seed)
+    if not os.path.exists(path):
+        make_corpus_db(path, args.chunks, encoder, seed=args.seed)
+    queries = suite_queries(args.queries, seed=args.seed + 11)
+    batch = (queries * (1 + args.requests // len(queries)))[:args.requests]
+    fake = FakeOllama(ttft_ms=args.llm_ttft_ms, token_ms=args.llm_token_ms, tokens=args.llm_tokens).start()
+    gen_s = (args.llm_ttft_ms + args.llm_token_ms * max(0, args.llm_tokens - 1)) / 1000.0
+    print(f"clients={args.clients} requests={len(batch)} llm concurrency={args.llm_concurrency} "
+          f"~{gen_s:.2f}s/answer deadline={args.deadline_s}s")
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    logging.getLogger("urdu_agent").setLevel(logging.ERROR)
+    results = {}
+    try:
+        for policy in args.policies:
+            server.start(None, path, None, fake.url, "fake", vector_backend="numpy", answer_cache_size=0,
+                         llm_concurrency=args.llm_concurrency, llm_queue=args.clients * 2,
+                         db_pool_size=args.clients, encoder=encoder, warmup=False,
+                         deadline_s=0 if policy == "none" else args.deadline_s,
+                         overload="degrade" if policy == "none" else policy)
+            httpd = make_server("127.0.0.1", 0, server.app, threaded=True)
+            threading.Thread(target=httpd.serve_forever, daemon=True).start()
+            url = f"http://127.0.0.1:{httpd.server_port}/chat"
+            local = threading.local()
+
+            def one(query):
+                s = getattr(local, "session", None) or requests.Session()
+                local.session = s
+                t0 = time.perf_counter()
+                r = s.post(url, json={"message": query}, timeout=600)
+                ms = (time.perf_counter() - t0) * 1000.0
+                return ms, r.status_code, r.ok and bool(r.json().get("degraded"))
+
+            degraded0 = metrics.DEGRADED.values()
+            try:
+                with cf.ThreadPoolExecutor(args.clients) as ex:
+                    t0 = time.perf_counter()
+                    out = list(ex.map(one, batch))
+                    wall = time.perf_counter() - t0
+            finally:
+                httpd.shutdown()
+                server.EMBED_MODEL.close()
+                server.DB_POOL.close()
+            llm = [ms for ms, code, deg in out if code == 200 and not deg]
+            results[policy] = {
+                "req_per_s": len(out) / wall,
+                "latency": percentiles([ms for ms, code, _ in out if code == 200]),
+                "llm_latency": percentiles(llm) if llm else None,
+                "llm_answers": len(llm),
+                "degraded": sum(1 for _, _, deg in out if deg),
+                "shed": sum(1 for _, code, _ in out if code == 503),
+                "over_deadline": sum(1 for ms, _, _ in out if args.deadline_s and ms > args.deadline_s * 1000.0),
+                "degraded_by_reason": {k: v - degraded0.get(k, 0) for k, v in metrics.DEGRADED.values().items()
+                                       if v > degraded0.get(k, 0)},
+            }
+            r = results[policy]
+            print(f"  {policy:8s} {r['req_per_s']:6.2f} req/s  answered {_fmt(r['latency'])}  llm={r['llm_answers']}"
+                  f"  degraded={r['degraded']} {r['degraded_by_reason']}  503={r['shed']}"
+                  f"  over deadline={r['over_deadline']}")
+    finally:
+        fake.stop()
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+def bench_batch(args):
+    import app as server
+    from fakeollama import FakeOllama
+
+    root = args.dir or tempfile.mkdtemp(prefix="urdu-suite-")
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, f"corpus-{args.chunks}-{args.dim}.db")
+    encoder = SyntheticEncoder(args.dim, seed=args.seed)
+    if not os.path.exists(path):
+        make_corpus_db(path, args.chunks, encoder, seed=args.seed)
+    queries = suite_queries(args.queries, seed=args.seed + 11)
+    questions = os.path.join(root, "batch-questions.jsonl")
+    with open(questions, "w", encoding="utf-8") as f:
+        for i in range(args.questions):
+            f.write(json.dumps({"id": i, "message": queries[i % len(queries)]}, ensure_ascii=False) + "\n")
+    fake = FakeOllama(ttft_ms=args.llm_ttft_ms, token_ms=args.llm_token_ms, tokens=args.llm_tokens).start()
+    gen_s = (args.llm_ttft_ms + args.llm_token_ms * max(0, args.llm_tokens - 1)) / 1000.0
+    print(f"questions={args.questions} chunks={args.chunks} ~{gen_s:.2f}s/answer")
+    logging.getLogger("urdu_agent").setLevel(logging.WARNING)
+    results = {}
+    try:
+        for n, concurrency in enumerate(args.llm_concurrency):
+            server.start(None, path, None, fake.url, "fake", vector_backend="numpy", answer_cache_size=0,
+                         llm_concurrency=concurrency, encoder=encoder, warmup=False, batch_llm_workers=concurrency,
+                         batch_encode_size=args.encode_batch, batch_retrieve_workers=args.retrieve_workers)
+            try:
+                if n == 0:
+                    # today's way: one /chat request after another
+                    client = server.app.test_client()
+                    serial = queries[:min(args.serial, args.questions)]
+                    t0 = time.perf_counter()
+                    for query in serial:
+                        client.post("/chat", json={"message": query})
+                    qps = len(serial) / (time.perf_counter() - t0)
+                    results["serial_chat"] = {"questions": len(serial), "questions_per_s": round(qps, 3)}
+                    print(f"  serial /chat         {qps:7.2f} questions/s  ({len(serial)} questions)")
+                out = os.path.join(root, f"batch-answers-{concurrency}.jsonl")
+                if os.path.exists(out):
+                    os.remove(out)
+                r = results[f"batch_llm{concurrency}"] = server.run_batch(questions, out)
+                util = "  ".join(f"{k}={v['utilization']:.2f}" for k, v in r["stages"].items())
+                print(f"  batch llm workers={concurrency:<2d} {r['questions_per_s']:7.2f} questions/s  "
+                      f"utilization {util}  errors={r['errors']}")
+            finally:
+                server.EMBED_MODEL.close()
+                server.DB_POOL.close()
+    finally:
+        fake.stop()
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+def bench_reload(args):
+    import concurrent.futures as cf
+
+    import app as server
+    from fakeollama import FakeOllama
+
+    root = args.dir or tempfile.mkdtemp(prefix="urdu-suite-")
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, f"corpus-{args.chunks}-{args.dim}.db")
+    encoder = SyntheticEncoder(args.dim, seed=args.seed)
+    if not os.path.exists(path):
+        make_corpus_db(path, args.chunks, encoder, seed=args.seed)
+    queries = suite_queries(args.queries, seed=args.seed + 11)
+    batch = (queries * (1 + args.requests // len(queries)))[:args.requests]
+    fake = FakeOllama(ttft_ms=args.llm_ttft_ms, token_ms=args.llm_token_ms, tokens=args.llm_tokens).start()
+    logging.getLogger("urdu_agent").setLevel(logging.WARNING)
+    server.start(None, path, None, fake.url, "fake", vector_backend="numpy", answer_cache_size=0,
+                 llm_concurrency=args.clients, db_pool_size=args.clients, encoder=encoder, warmup=False)
+
+    def one(query):
+        with server.app.test_client() as client:
+            t0 = time.perf_counter()
+            r = client.post("/chat", json={"message": query})
+            return (time.perf_counter() - t0) * 1000.0, r.status_code, r.headers.get("X-Index-Version")
+
+    results = {}
+    try:
+        for mode in ("steady", "reloading"):
+            stop = threading.Event()
+            reloads = []
+
+            def reloader():
+                while not stop.wait(args.every_s):
+                    reloads.append(server.reload_index(reason="bench")["seconds"])
+
+            if mode == "reloading":
+                threading.Thread(target=reloader, daemon=True).start()
+            with cf.ThreadPoolExecutor(args.clients) as ex:
+                out = list(ex.map(one, batch))
+            stop.set()
+            r = results[mode] = {
+                "latency": percentiles([ms for ms, _, _ in out]),
+                "errors": sum(1 for _, code, _ in out if code != 200),
+                "generations": len({v for _, _, v in out}),
+                "reloads": len(reloads),
+                "reload_s": percentiles([s * 1000.0 for s in reloads]) if reloads else None,
+            }
+            print(f"  {mode:9s} {_fmt(r['latency'])}  errors={r['errors']}  reloads={r['reloads']}"
+                  f"  generations served={r['generations']}")
+            if reloads:
+                print(f"  {'':9s} reload {_fmt(r['reload_s'])}")
+    finally:
+        fake.stop()
+        server.SHARDS.close()
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+def bench_shards(args):
+    from app import connect_db, hybrid_search, open_shard, sharded_search
+    from fusion import Fusion, term_index_ok
+    from metrics import Trace
+    from shards import ShardSet
+
+    root = args.dir or tempfile.mkdtemp(prefix="urdu-suite-")
+    os.makedirs(root, exist_ok=True)
+    encoder = SyntheticEncoder(args.dim, seed=args.seed)
+    queries = suite_queries(args.queries, seed=args.seed + 11)
+    qvecs = encoder.encode(queries)
+    print(f"chunks/shard={args.chunks_per_shard} queries={len(queries)} top_k={args.top_k} fts_k={args.fts_k} "
+          f"backend={args.backend} cpus={os.cpu_count()}")
+    results = {}
+    for n_shards in args.shards:
+        total = n_shards * args.chunks_per_shard
+        mono = os.path.join(root, f"corpus-{total}-{args.dim}.db")
+        if not os.path.exists(mono):
+            make_corpus_db(mono, total, encoder, seed=args.seed)
+        parts = []
+        for i in range(n_shards):
+            path = os.path.join(root, f"shard-{total}-{args.dim}-{i + 1}of{n_shards}.db")
+            if not os.path.exists(path):
+                make_corpus_db(path, total, encoder, seed=args.seed, part=(i, n_shards))
+            parts.append(path)
+        con = connect_db(mono, readonly=True)
+        index = open_index(default_store_path(mono), args.backend, nprobe=args.nprobe)
+        fusion = Fusion(term_bits=term_index_ok(con))
+        shard_set = ShardSet([open_shard(f"s{i + 1}", path, None, args.backend, None, 200, args.nprobe, 4, False,
+                                         DEFAULT_LEXICON, 0) for i, path in enumerate(parts)])
+        t_mono, t_shard, t_routed, overlap = [], [], [], 0
+        for query, q in zip(queries, qvecs):
+            t0 = time.perf_counter()
+            want = hybrid_search(con, encoder, query, top_k=args.top_k, fts_k=args.fts_k, vector_index=index, q=q,
+                                 trace=Trace("bench", query), fusion=fusion)
+            t_mono.append((time.perf_counter() - t0) * 1000.0)
+            t0 = time.perf_counter()
+            got = sharded_search(shard_set, encoder, query, top_k=args.top_k, fts_k=args.fts_k, q=q,
+                                 trace=Trace("bench", query), fusion=fusion)
+            t_shard.append((time.perf_counter() - t0) * 1000.0)
+            t0 = time.perf_counter()
+            sharded_search(shard_set, encoder, query, top_k=args.top_k, fts_k=args.fts_k, q=q,
+                           trace=Trace("bench", query), fusion=fusion, shards=["s1"])
+            t_routed.append((time.perf_counter() - t0) * 1000.0)
+            overlap += len(set(want) & set(got))
+        r = results[str(n_shards)] = {
+            "chunks": total, "monolithic": percentiles(t_mono), "sharded": percentiles(t_shard),
+            "routed_one_shard": percentiles(t_routed), f"overlap@{args.top_k}": overlap / float(args.top_k * len(queries)),
+        }
+        print(f"  {total:7d} chunks  one db     {_fmt(r['monolithic'])}")
+        print(f"  {'':7s}         {n_shards} shard(s) {_fmt(r['sharded'])}  "
+              f"overlap@{args.top_k} with one db={r[f'overlap@{args.top_k}']:.3f}")
+        print(f"  {'':7s}         routed s1  {_fmt(r['routed_one_shard'])}")
+        con.close()
+        shard_set.close()
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+def _flatten(d, prefix=""):
+    for k, v in d.items():
+        key = f"{prefix}.{k}" if prefix else str(k)
+        if isinstance(v, dict):
+            yield from _flatten(v, key)
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            yield key, v
+
+
+def bench_compare(args):
+    with open(args.base, encoding="utf-8") as f:
+        base = dict(_flatten(json.load(f)))
+    with open(args.new, encoding="utf-8") as f:
+        new = dict(_flatten(json.load(f)))
+    for k in new:
+        if k not in base or k.split(".")[0] not in ("retrieval", "e2e"):
+            continue
+        if k.rsplit(".", 1)[-1] not in ("p50", "p95", "p99", "req_per_s", "errors") and "recall" not in k:
+            continue
+        b, n = base[k], new[k]
+        delta = f"{(n - b) / b * 100.0:+6.1f}%" if b else "     -"
+        print(f"  {k:60s} {b:10.3f} -> {n:10.3f}  {delta}")
+
+
+def _store_blocks(index, block=10000):
+    for start in range(0, len(index), block):
+        yield index.rowids[start:start + block], np.asarray(index.vectors[start:start + block], dtype=np.float32)
+
+
+def _fmt(r: dict) -> str:
+    return f"p50={r['p50']:.3f}ms p95={r['p95']:.3f}ms p99={r['p99']:.3f}ms mean={r['mean']:.3f}ms"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Retrieval micro-benchmarks on a synthetic Urdu corpus.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("fetch", help="per-row vs bulk chunk-text fetch")
+    p.add_argument("--db", default=None, help="Existing chunks DB (built if missing)")
+    p.add_argument("--chunks", type=int, default=100000)
+    p.add_argument("--queries", type=int, default=2000)
+    p.add_argument("--candidates", type=int, default=20, help="top_k*5 in hybrid_search")
+    p.add_argument("--hot", type=int, default=500)
+    p.add_argument("--hot-ratio", type=float, default=0.5)
+    p.add_argument("--cache-mb", type=float, default=64)
+    p.set_defaults(fn=bench_fetch)
+
+    p = sub.add_parser("vectors", help="numpy memmap backend (float32/float16) vs vec0")
+    p.add_argument("--dir", default=None, help="Working directory for the synthetic stores (reused if present)")
+    p.add_argument("--chunks", type=int, default=100000)
+    p.add_argument("--dim", type=int, default=768)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--candidates", type=int, default=120, help="FTS candidate set size (fts_k)")
+    p.add_argument("--k", type=int, default=20)
+    p.add_argument("--dll", default=None, help="sqlite-vec extension; enables the vec0 comparison")
+    p.set_defaults(fn=bench_vectors)
+
+    p = sub.add_parser("quantized", help="int8 / binary coarse scan + exact rescoring: latency and recall@k")
+    p.add_argument("--dir", default=None, help="Working directory for the synthetic stores (reused if present)")
+    p.add_argument("--chunks", type=int, default=100000)
+    p.add_argument("--dim", type=int, default=768)
+    p.add_argument("--queries", type=int, default=100)
+    p.add_argument("--recall-queries", type=int, default=50)
+    p.add_argument("--k", type=int, default=20)
+    p.add_argument("--rescore", type=int, default=200)
+    p.set_defaults(fn=bench_quantized)
+
+    p = sub.add_parser("pool", help="retrieval req/s vs worker count: shared connection, pool, processes")
+    p.add_argument("--db", default=None, help="Existing chunks+FTS DB (built if missing)")
+    p.add_argument("--chunks", type=int, default=100000)
+    p.add_argument("--queries", type=int, default=2000)
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    p.set_defaults(fn=bench_pool)
+
+    p = sub.add_parser("fts", help="fixed synonym list vs lexicon expansion: FTS latency and candidate sets")
+    p.add_argument("--db", default=None, help="Existing chunks+FTS DB (built if missing)")
+    p.add_argument("--chunks", type=int, default=100000)
+    p.add_argument("--queries", type=int, default=500)
+    p.add_argument("--fts-k", type=int, default=100)
+    p.add_argument("--lexicon", default=DEFAULT_LEXICON, help="Synonym groups JSON")
+    p.set_defaults(fn=bench_fts)
+
+    p = sub.add_parser("suite", help="full-schema corpus: per-stage latency, recall@k, /chat throughput vs a fake Ollama")
+    p.add_argument("--dir", default=None, help="Working directory; the corpus DB is reused if present")
+    p.add_argument("--chunks", type=int, default=100000)
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--dll", default=None, help="sqlite-vec extension; builds a vec0 table and enables the vec0 backend")
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--top-k", type=int, default=4)
+    p.add_argument("--fts-k", type=int, default=120)
+    p.add_argument("--k", type=int, default=20, help="k for vector-index recall")
+    p.add_argument("--recall-queries", type=int, default=50)
+    p.add_argument("--rescore", type=int, default=200)
+    p.add_argument("--backends", nargs="+", default=["numpy", "int8", "binary"], choices=["vec0", *INDEX_BACKENDS])
+    p.add_argument("--clients", type=int, nargs="*", default=[1, 4, 16], help="Concurrent /chat clients (none skips)")
+    p.add_argument("--e2e-requests", type=int, default=200, help="/chat requests per client level")
+    p.add_argument("--e2e-backend", default="numpy", choices=["vec0", *INDEX_BACKENDS])
+    p.add_argument("--answer-cache", type=int, default=0, help="Answer cache size during /chat runs (0 disables)")
+    p.add_argument("--llm-concurrency", type=int, default=2)
+    p.add_argument("--llm-ttft-ms", type=float, default=100.0)
+    p.add_argument("--llm-token-ms", type=float, default=20.0)
+    p.add_argument("--llm-tokens", type=int, default=40)
+    p.add_argument("--out", default="bench.json")
+    p.set_defaults(fn=bench_suite)
+
+    p = sub.add_parser("pack", help="prompt tokens before/after context packing, query-term coverage, packing time")
+    p.add_argument("--dir", default=None, help="Working directory; the corpus DB is reused if present")
+    p.add_argument("--chunks", type=int, default=20000)
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--top-k", type=int, default=4)
+    p.add_argument("--budget", type=int, default=1024)
+    p.add_argument("--dedup-threshold", type=float, default=0.8)
+    p.add_argument("--tokenizer", default=None)
+    p.add_argument("--chars-per-token", type=float, default=3.0)
+    p.set_defaults(fn=bench_pack)
+
+    p = sub.add_parser("prefix", help="prefill cost: question-first prompt vs constant system prefix (/api/chat)")
+    p.add_argument("--dir", default=None, help="Working directory; the corpus DB is reused if present")
+    p.add_argument("--chunks", type=int, default=20000)
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--queries", type=int, default=50)
+    p.add_argument("--top-k", type=int, default=4)
+    p.add_argument("--ollama-url", default=None, help="Measure a real Ollama instead of the stand-in")
+    p.add_argument("--ollama-model", default="gemma3:4b")
+    p.add_argument("--ollama-options", default="{}")
+    p.add_argument("--prefill-ms", type=float, default=2.0, help="Stand-in prefill cost per uncached token")
+    p.add_argument("--llm-token-ms", type=float, default=0.0)
+    p.add_argument("--llm-tokens", type=int, default=5)
+    p.set_defaults(fn=bench_prefix)
+
+    p = sub.add_parser("workers", help="serve.py scaling: per-worker RSS and /chat req/s vs worker count")
+    p.add_argument("--dir", default=None, help="Working directory; the corpus DB is reused if present")
+    p.add_argument("--chunks", type=int, default=20000)
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--clients", type=int, default=16)
+    p.add_argument("--requests", type=int, default=400)
+    p.add_argument("--llm-concurrency", type=int, default=4, help="Per worker")
+    p.add_argument("--llm-ttft-ms", type=float, default=20.0)
+    p.add_argument("--llm-token-ms", type=float, default=1.0)
+    p.add_argument("--llm-tokens", type=int, default=20)
+    p.add_argument("--out", default=None)
+    p.set_defaults(fn=bench_workers)
+
+    p = sub.add_parser("overload", help="deadline admission control: degrade / shed vs queueing behind a slow LLM")
+    p.add_argument("--dir", default=None, help="Working directory; the corpus DB is reused if present")
+    p.add_argument("--chunks", type=int, default=20000)
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--policies", nargs="+", default=["none", "degrade", "shed"], choices=["none", "degrade", "shed"])
+    p.add_argument("--deadline-s", type=float, default=3.0)
+    p.add_argument("--clients", type=int, default=16)
+    p.add_argument("--requests", type=int, default=200)
+    p.add_argument("--llm-concurrency", type=int, default=2)
+    p.add_argument("--llm-ttft-ms", type=float, default=200.0)
+    p.add_argument("--llm-token-ms", type=float, default=20.0)
+    p.add_argument("--llm-tokens", type=int, default=40)
+    p.add_argument("--out", default=None)
+    p.set_defaults(fn=bench_overload)
+
+    p = sub.add_parser("ann", help="IVF approximate search vs exact scan: recall@k and latency by corpus size")
+    p.add_argument("--dir", default=None, help="Working directory; stores and IVF indexes are reused if present")
+    p.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--nlist", type=int, default=None, help="IVF lists (default: 4*sqrt(rows))")
+    p.add_argument("--iters", type=int, default=10)
+    p.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64])
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--recall-queries", type=int, default=50, help="Also the number of exact-scan timings")
+    p.add_argument("--k", type=int, default=20)
+    p.add_argument("--filter-size", type=int, default=20000, help="Rowid filter size for filtered search (0 skips)")
+    p.add_argument("--out", default=None)
+    p.set_defaults(fn=bench_ann)
+
+    p = sub.add_parser("batch", help="/chat/batch pipeline vs one /chat request at a time, against a fake Ollama")
+    p.add_argument("--dir", default=None, help="Working directory; the corpus DB is reused if present")
+    p.add_argument("--chunks", type=int, default=20000)
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--queries", type=int, default=200, help="Distinct questions (repeated up to --questions)")
+    p.add_argument("--questions", type=int, default=200)
+    p.add_argument("--serial", type=int, default=50, help="Questions timed through serial /chat")
+    p.add_argument("--encode-batch", type=int, default=64)
+    p.add_argument("--retrieve-workers", type=int, default=4)
+    p.add_argument("--llm-concurrency", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--llm-ttft-ms", type=float, default=200.0)
+    p.add_argument("--llm-token-ms", type=float, default=20.0)
+    p.add_argument("--llm-tokens", type=int, default=40)
+    p.add_argument("--out", default=None)
+    p.set_defaults(fn=bench_batch)
+
+    p = sub.add_parser("reload", help="/chat latency and errors while the index is hot-reloaded every few seconds")
+    p.add_argument("--dir", default=None, help="Working directory; the corpus DB is reused if present")
+    p.add_argument("--chunks", type=int, default=20000)
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--requests", type=int, default=600)
+    p.add_argument("--clients", type=int, default=8)
+    p.add_argument("--every-s", type=float, default=1.0, help="Seconds between reloads")
+    p.add_argument("--llm-ttft-ms", type=float, default=50.0)
+    p.add_argument("--llm-token-ms", type=float, default=2.0)
+    p.add_argument("--llm-tokens", type=int, default=20)
+    p.add_argument("--out", default=None)
+    p.set_defaults(fn=bench_reload)
+
+    p = sub.add_parser("shards", help="one database vs the same corpus split into shards: latency and result overlap")
+    p.add_argument("--dir", default=None, help="Working directory; corpus and shard DBs are reused if present")
+    p.add_argument("--chunks-per-shard", type=int, default=10000)
+    p.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    p.add_argument("--dim", type=int, default=384)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--queries", type=int, default=200)
+    p.add_argument("--top-k", type=int, default=4)
+    p.add_argument("--fts-k", type=int, default=120)
+    p.add_argument("--backend", default="numpy", choices=INDEX_BACKENDS)
+    p.add_argument("--nprobe", type=int, default=16)
+    p.add_argument("--out", default=None)
+    p.set_defaults(fn=bench_shards)
+
+    p = sub.add_parser("compare", help="latency / throughput / recall deltas between two suite JSON files")
+    p.add_argument("base")
+    p.add_argument("new")
+    p.set_defaults(fn=bench_compare)
+
+    args = ap.parse_args()
+    args.fn(args)
+
+
+if __name__ == "__main__":
+    main()
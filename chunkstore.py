@@ -0,0 +1,76 @@
+# chunkstore.py
+# Bulk chunk-text lookup for hybrid_search.
+# All candidate texts are read with a single `id IN (...)` query instead of one
+# SELECT per row; an optional byte-bounded LRU keeps hot chunks in process memory.
+
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+def fetch_texts(con: sqlite3.Connection, ids, cache=None) -> dict:
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return {}
+    if cache is not None:
+        return cache.get_many(con, ids)
+    return _select_texts(con, ids)
+
+
+def _select_texts(con, ids) -> dict:
+    placeholders = ",".join("?" * len(ids))
+    rows = con.execute(f"SELECT id, text FROM chunks WHERE id IN ({placeholders});", ids).fetchall()
+    return dict(rows)
+
+
+class ChunkTextCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = int(max_bytes)
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, con, ids) -> dict:
+        out, missing = {}, []
+        with self._lock:
+            for i in ids:
+                entry = self._data.get(i)
+                if entry is None:
+                    missing.append(i)
+                else:
+                    self._data.move_to_end(i)
+                    out[i] = entry[0]
+            self.hits += len(out)
+            self.misses += len(missing)
+        if missing:
+            fetched = _select_texts(con, missing)
+            out.update(fetched)
+            with self._lock:
+                for i, txt in fetched.items():
+                    self._put(i, txt)
+        return out
+
+    def _put(self, i, txt):
+        size = len(txt.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        old = self._data.pop(i, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._data[i] = (txt, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted) = self._data.popitem(last=False)
+            self._bytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._data), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,112 @@
+# contextpack.py
+# Token-budgeted context packing for build_prompt.
+# CPU prefill time grows with prompt length, so the retrieved chunks are packed instead
+# of pasted verbatim:
+#   - chunks that are near-duplicates of one already packed (word-shingle Jaccard) are dropped,
+#     and sentences repeated by overlapping neighbour chunks are kept only once
+#   - a chunk that would overflow the remaining budget is trimmed to its sentences that mention
+#     query terms (or their lexicon synonyms); one that fits is kept whole, since vector search
+#     also finds chunks on meaning without any shared words
+#   - packing stops when the prompt token budget is reached; if not even one sentence fits
+#     (template + question already at the budget), the top chunk's best sentence is kept anyway
+# Tokens are counted with the model's tokenizer when one is given (transformers), else by a
+# characters-per-token estimate.
+
+import math
+
+from urdutext import normalize_urdu, split_sentences, tokens
+
+DEFAULT_CHARS_PER_TOKEN = 3.0   # Gemma-family tokenizers on Urdu script, roughly
+
+
+class TokenCounter:
+    def __init__(self, tokenizer_path=None, chars_per_token=DEFAULT_CHARS_PER_TOKEN):
+        self.chars_per_token = float(chars_per_token)
+        self.tokenizer = None
+        if tokenizer_path:
+            from transformers import AutoTokenizer
+            self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_path)
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False))
+        return int(math.ceil(len(text) / self.chars_per_token))
+
+
+def shingles(text: str, n=3) -> set:
+    words = tokens(text)
+    if len(words) < n:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / float(len(a | b))
+
+
+class ContextPacker:
+    def __init__(self, budget=1024, counter=None, dedup_threshold=0.8, min_sentences=1):
+        self.budget = int(budget)
+        self.counter = counter or TokenCounter()
+        self.dedup_threshold = float(dedup_threshold)
+        self.min_sentences = int(min_sentences)
+
+    def _relevance(self, sentence: str, terms) -> int:
+        norm = normalize_urdu(sentence)
+        return sum(1 for t in terms if t in norm)
+
+    def pack(self, chunks, query: str, overhead=0, lexicon=None):
+        # overhead: tokens of the prompt without any context (template + question)
+        # returns (packed chunks, stats)
+        count = self.counter.count
+        terms = lexicon.expand(query) if lexicon is not None else [t for t in tokens(query) if len(t) > 1]
+        stats = {"chunks_in": len(chunks), "chunks_out": 0, "duplicates": 0, "sentences_trimmed": 0,
+                 "tokens_in": sum(count(c) for c in chunks), "tokens_out": 0, "over_budget": False}
+        remaining = self.budget - overhead
+        packed, kept_shingles, seen = [], [], set()
+        for chunk in chunks:
+            if remaining <= 0:
+                break
+            sh = shingles(chunk)
+            if any(jaccard(sh, k) >= self.dedup_threshold for k in kept_shingles):
+                stats["duplicates"] += 1
+                continue
+            sentences = [s for s in split_sentences(chunk) if normalize_urdu(s) not in seen]
+            if not sentences:
+                stats["duplicates"] += 1
+                continue
+            chosen, used = list(range(len(sentences))), count(" ".join(sentences)) + 1
+            if used > remaining:
+                scores = [self._relevance(s, terms) for s in sentences]
+                # best sentences first; keep at least min_sentences even without a term match
+                order = sorted(range(len(sentences)), key=lambda i: -scores[i])
+                chosen, used = [], 0
+                for rank, i in enumerate(order):
+                    if scores[i] == 0 and rank >= self.min_sentences:
+                        break
+                    n = count(sentences[i]) + 1
+                    if used + n > remaining:
+                        continue
+                    chosen.append(i)
+                    used += n
+            if not chosen:
+                continue
+            stats["sentences_trimmed"] += len(sentences) - len(chosen)
+            text = " ".join(sentences[i] for i in sorted(chosen))
+            packed.append(text)
+            kept_shingles.append(sh)
+            seen.update(normalize_urdu(sentences[i]) for i in chosen)
+            remaining -= used
+        if not packed and chunks:
+            # retrieval found something, so the prompt must not say it found nothing
+            sentences = split_sentences(chunks[0]) or [chunks[0]]
+            packed.append(max(sentences, key=lambda s: self._relevance(s, terms)))
+            stats["over_budget"] = True
+        stats["chunks_out"] = len(packed)
+        stats["tokens_out"] = sum(count(c) for c in packed)
+        stats["tokens_saved"] = stats["tokens_in"] - stats["tokens_out"]
+        return packed, stats
@@ -0,0 +1,97 @@
+# dbpool.py
+# Pool of read-only SQLite connections for the retrieval path.
+# Each request thread checks out its own connection (vec0 already loaded by the factory)
+# instead of sharing one `check_same_thread=False` handle, so FTS / KNN / text fetches
+# from different threads run in parallel. Connections are created lazily up to `size`.
+
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+READ_PRAGMAS = (
+    "PRAGMA query_only = ON;",
+    "PRAGMA mmap_size = 1073741824;",
+    "PRAGMA cache_size = -65536;",
+    "PRAGMA temp_store = MEMORY;",
+)
+
+
+class PoolTimeout(RuntimeError):
+    pass
+
+
+def enable_wal(db_path: str):
+    # journal_mode=WAL is persistent and needs a writable handle; readers then never block
+    # on (or behind) an ingest/reindex writer
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute("PRAGMA journal_mode = WAL;")
+    finally:
+        con.close()
+
+
+class ConnectionPool:
+    def __init__(self, connect, size=8, timeout=30.0):
+        self._connect = connect
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._all = []
+
+    def _new(self) -> sqlite3.Connection:
+        con = self._connect()
+        for pragma in READ_PRAGMAS:
+            con.execute(pragma)
+        with self._lock:
+            self._all.append(con)
+        return con
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            grow = self._created < self.size
+            if grow:
+                self._created += 1
+        if grow:
+            try:
+                return self._new()
+            except BaseException:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolTimeout(f"no DB connection free after {self.timeout}s")
+
+    def release(self, con: sqlite3.Connection):
+        if con.in_transaction:
+            con.rollback()
+        self._idle.put(con)
+
+    @contextmanager
+    def connection(self):
+        con = self.acquire()
+        try:
+            yield con
+        finally:
+            self.release(con)
+
+    def close(self):
+        with self._lock:
+            conns, self._all = self._all, []
+        for con in conns:
+            try:
+                con.close()
+            except sqlite3.Error:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": self.size, "created": self._created, "idle": self._idle.qsize()}
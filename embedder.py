@@ -0,0 +1,140 @@
+# embedder.py
+# Micro-batching dispatcher for query embeddings.
+# Concurrent /chat requests that arrive within a short window are encoded together in
+# one SentenceTransformer.encode call; every caller gets back its own vector.
+# The dispatcher keeps batch-size and queue-wait stats so the window can be tuned.
+
+import queue
+import threading
+import time
+from collections import Counter, deque
+
+import numpy as np
+
+
+class _Job:
+    __slots__ = ("text", "t0", "wait", "vector", "error", "done")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.t0 = time.perf_counter()
+        self.wait = 0.0
+        self.vector = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class BatchEmbedder:
+    def __init__(self, model, window_ms=5.0, max_batch=32, normalize=True):
+        self.model = model
+        self.window = max(0.0, float(window_ms)) / 1000.0
+        self.max_batch = max(1, int(max_batch))
+        self.normalize = normalize
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._sizes = Counter()
+        self._waits = deque(maxlen=2048)
+        self._batches = 0
+        self._queries = 0
+        self._encode_s = 0.0
+        self._thread = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+        self._thread.start()
+
+    # ---------- callers ----------
+    def embed(self, text: str, timeout=None) -> np.ndarray:
+        job = _Job(text)
+        self._queue.put(job)
+        if not job.done.wait(timeout):
+            raise TimeoutError("embedding request timed out")
+        if job.error is not None:
+            raise job.error
+        return job.vector
+
+    def embed_many(self, texts, timeout=None) -> np.ndarray:
+        jobs = [_Job(t) for t in texts]
+        for job in jobs:
+            self._queue.put(job)
+        out = []
+        for job in jobs:
+            if not job.done.wait(timeout):
+                raise TimeoutError("embedding request timed out")
+            if job.error is not None:
+                raise job.error
+            out.append(job.vector)
+        return np.stack(out) if out else np.zeros((0, 0), dtype="float32")
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    # ---------- dispatcher ----------
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = first.t0 + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                self._queue.put(None)  # stop after this batch
+                break
+            batch.append(job)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            start = time.perf_counter()
+            for job in batch:
+                job.wait = start - job.t0
+            try:
+                vecs = self.model.encode(
+                    [j.text for j in batch],
+                    batch_size=len(batch),
+                    normalize_embeddings=self.normalize,
+                    convert_to_numpy=True,
+                ).astype("float32")
+                for job, vec in zip(batch, vecs):
+                    job.vector = vec
+            except Exception as e:
+                for job in batch:
+                    job.error = e
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._batches += 1
+                self._queries += len(batch)
+                self._encode_s += elapsed
+                self._sizes[len(batch)] += 1
+                self._waits.extend(j.wait for j in batch)
+            for job in batch:
+                job.done.set()
+
+    # ---------- stats ----------
+    def stats(self) -> dict:
+        with self._lock:
+            waits = np.asarray(self._waits, dtype="float64") * 1000.0
+            sizes = dict(sorted(self._sizes.items()))
+            batches, queries, encode_s = self._batches, self._queries, self._encode_s
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_batch": self.max_batch,
+            "queue_depth": self._queue.qsize(),
+            "batches": batches,
+            "queries": queries,
+            "mean_batch_size": (queries / batches) if batches else 0.0,
+            "batch_size_hist": sizes,
+            "mean_encode_ms": (encode_s * 1000.0 / batches) if batches else 0.0,
+            "queue_wait_ms": {
+                "mean": float(waits.mean()) if waits.size else 0.0,
+                "p50": float(np.percentile(waits, 50)) if waits.size else 0.0,
+                "p99": float(np.percentile(waits, 99)) if waits.size else 0.0,
+                "max": float(waits.max()) if waits.size else 0.0,
+            },
+        }
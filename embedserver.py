@@ -0,0 +1,193 @@
+# embedserver.py
+# Out-of-process query encoder shared by several web workers.
+# One process owns the SentenceTransformer; workers connect over a local socket (a Unix
+# socket, or a named pipe on Windows) and send query texts. Every connection feeds the same
+# BatchEmbedder, so queries from all workers are batched together.
+#
+#   python embedserver.py --model AraGemma-Embedding-300m            # then:
+#   python app.py --embed-server /tmp/urdu-embed.sock ...
+#
+# serve.py starts this process and the web workers together.
+#
+# multiprocessing.connection unpickles whatever arrives, so the authkey is all that stops
+# another local process from running code in here. It is a random secret per run, passed in
+# the URDU_EMBED_AUTHKEY environment variable (serve.py sets it for the server and workers);
+# standalone, export the same value to both:
+#   export URDU_EMBED_AUTHKEY=$(python -c "import secrets; print(secrets.token_hex(32))")
+
+import argparse
+import os
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+from embedder import BatchEmbedder
+
+if sys.platform == "win32":
+    DEFAULT_ADDRESS = r"\\.\pipe\urdu-embed"
+else:
+    DEFAULT_ADDRESS = os.path.join(tempfile.gettempdir(), "urdu-embed.sock")
+AUTHKEY_ENV = "URDU_EMBED_AUTHKEY"
+
+
+def new_authkey() -> str:
+    return secrets.token_hex(32)
+
+
+def authkey_from_env() -> bytes:
+    key = os.environ.get(AUTHKEY_ENV)
+    if not key:
+        raise RuntimeError(f"{AUTHKEY_ENV} is not set: serve.py sets a random key per run; when starting "
+                           f"embedserver.py and app.py --embed-server by hand, export the same secret to both")
+    return key.encode("utf-8")
+
+
+class EmbedServer:
+    def __init__(self, model, address=DEFAULT_ADDRESS, authkey=None, window_ms=5.0, max_batch=64):
+        self.address = address
+        authkey = authkey or authkey_from_env()
+        self.embedder = BatchEmbedder(model, window_ms=window_ms, max_batch=max_batch)
+        self.dim = int(self.embedder.embed("ا").shape[0])
+        if not address.startswith("\\\\") and os.path.exists(address):
+            os.remove(address)  # stale socket from a previous run
+        self.listener = Listener(address, authkey=authkey)
+        if not address.startswith("\\\\"):
+            os.chmod(address, 0o600)  # only this user's processes may even try the handshake
+        self.clients = 0
+        self._lock = threading.Lock()
+
+    def serve_forever(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                return  # listener closed
+            except Exception:
+                continue  # failed handshake (wrong authkey, client went away)
+            threading.Thread(target=self._handle, args=(conn,), name="embed-conn", daemon=True).start()
+
+    def _handle(self, conn):
+        with self._lock:
+            self.clients += 1
+        try:
+            while True:
+                try:
+                    op, payload = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if op == "embed":
+                        vecs = (self.embedder.embed(payload[0])[None, :] if len(payload) == 1
+                                else self.embedder.embed_many(payload))
+                        conn.send(("ok", np.ascontiguousarray(vecs, dtype=np.float32)))
+                    elif op == "stats":
+                        conn.send(("ok", self.stats()))
+                    else:
+                        conn.send(("error", f"unknown op {op!r}"))
+                except Exception as e:
+                    conn.send(("error", f"{type(e).__name__}: {e}"))
+        finally:
+            conn.close()
+            with self._lock:
+                self.clients -= 1
+
+    def stats(self) -> dict:
+        out = self.embedder.stats()
+        out.update(dim=self.dim, clients=self.clients, pid=os.getpid())
+        return out
+
+    def close(self):
+        self.listener.close()
+        self.embedder.close()
+
+
+class EmbedClient:
+    # drop-in for BatchEmbedder in the web workers; one connection per request thread
+    def __init__(self, address=DEFAULT_ADDRESS, authkey=None, connect_timeout=120.0):
+        self.address = address
+        self.authkey = authkey or authkey_from_env()
+        self.connect_timeout = connect_timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conns = []
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            deadline = time.monotonic() + self.connect_timeout
+            while True:
+                try:
+                    conn = Client(self.address, authkey=self.authkey)
+                    break
+                except (FileNotFoundError, ConnectionRefusedError):
+                    # the embedding server may still be loading its model
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.2)
+            self._local.conn = conn
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def _call(self, op, payload=None):
+        for attempt in (0, 1):
+            conn = self._conn()
+            try:
+                conn.send((op, payload))
+                status, result = conn.recv()
+                break
+            except (EOFError, OSError):
+                # server restarted: reconnect once
+                self._local.conn = None
+                conn.close()
+                if attempt:
+                    raise
+        if status != "ok":
+            raise RuntimeError(f"embedding server: {result}")
+        return result
+
+    def embed(self, text: str, timeout=None) -> np.ndarray:
+        return self._call("embed", [text])[0]
+
+    def embed_many(self, texts, timeout=None) -> np.ndarray:
+        return self._call("embed", list(texts))
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=True, convert_to_numpy=True, **kwargs):
+        return self.embed_many(texts)
+
+    def stats(self) -> dict:
+        return self._call("stats")
+
+    def close(self):
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+
+
+if __name__ == "__main__":
+    from app import DEFAULT_EMBED_WINDOW_MS, DEFAULT_MODEL, load_encoder
+
+    ap = argparse.ArgumentParser(description="Shared query-embedding process for multi-worker serving.")
+    ap.add_argument("--model", default=DEFAULT_MODEL)
+    ap.add_argument("--embed-backend", choices=["torch", "onnx"], default="torch")
+    ap.add_argument("--address", default=DEFAULT_ADDRESS, help="Unix socket path (named pipe on Windows)")
+    ap.add_argument("--embed-window-ms", type=float, default=DEFAULT_EMBED_WINDOW_MS)
+    ap.add_argument("--embed-max-batch", type=int, default=64)
+    args = ap.parse_args()
+    t0 = time.perf_counter()
+    server = EmbedServer(load_encoder(args.model, args.embed_backend), args.address,
+                         window_ms=args.embed_window_ms, max_batch=args.embed_max_batch)
+    print(f"embedding server on {args.address} (dim {server.dim}, loaded in {time.perf_counter() - t0:.1f}s)",
+          flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
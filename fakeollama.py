@@ -0,0 +1,152 @@
+# fakeollama.py
+# Local stand-in for the Ollama HTTP API so the full /chat path can be benchmarked offline.
+# Serves /api/generate and /api/chat (streaming NDJSON or one JSON object) and /api/tags,
+# waiting `ttft_ms` before the first token and `token_ms` between tokens.
+# Prefill is modelled like Ollama's prompt cache: the prompt prefix shared with the previous
+# request is free, every other token costs `prefill_ms` (reported as prompt_eval_count/duration).
+#
+#   python fakeollama.py --port 11435 --ttft-ms 150 --token-ms 25 --tokens 60 --prefill-ms 5
+#   python app.py --ollama-url http://127.0.0.1:11435 ...
+
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHARS_PER_TOKEN = 3.0
+ANSWER_WORDS = ("آپ", "ہائی", "کورٹ", "میں", "حبسِ", "جسم", "کی", "درخواست", "دائر", "کر", "سکتے", "ہیں۔")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, code: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # client gave up (request deadline)
+
+    def _chunk(self, payload: dict):
+        data = (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            return self._json(200, {"models": [{"name": self.server.model}]})
+        self._json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path not in ("/api/generate", "/api/chat"):
+            return self._json(404, {"error": "not found"})
+        req = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            n = server.tokens
+        chat = self.path == "/api/chat"
+        words = [ANSWER_WORDS[i % len(ANSWER_WORDS)] + " " for i in range(n)]
+        timings = {}
+
+        def piece(token, done):
+            out = {"model": req.get("model", server.model), "done": done}
+            if chat:
+                out["message"] = {"role": "assistant", "content": token}
+            else:
+                out["response"] = token
+            if done:
+                out.update(timings)
+            return out
+
+        if not req.get("messages") and not req.get("prompt"):
+            return self._json(200, piece("", True))  # model load request
+        if chat:
+            rendered = "".join(f"<{m.get('role')}>{m.get('content', '')}" for m in req["messages"])
+        else:
+            rendered = f"<system><user>{req.get('prompt', '')}"
+        with server.lock:
+            cached = len(os.path.commonprefix([server.last_prompt, rendered]))
+            server.last_prompt = rendered
+        evaluated = int(math.ceil((len(rendered) - cached) / CHARS_PER_TOKEN))
+        prefill = evaluated * server.prefill_ms / 1000.0
+        timings.update(prompt_eval_count=evaluated, prompt_eval_duration=int(prefill * 1e9), eval_count=n)
+        time.sleep(server.ttft_ms / 1000.0 + prefill)
+        if not req.get("stream", True):
+            time.sleep(server.token_ms * max(0, n - 1) / 1000.0)
+            return self._json(200, piece("".join(words).strip(), True))
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i, w in enumerate(words):
+                if i:
+                    time.sleep(server.token_ms / 1000.0)
+                self._chunk(piece(w, False))
+            self._chunk(piece("", True))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+
+class FakeOllama:
+    def __init__(self, host="127.0.0.1", port=0, ttft_ms=100.0, token_ms=20.0, tokens=40, model="fake",
+                 prefill_ms=0.0):
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.lock = threading.Lock()
+        self.httpd.requests = 0
+        self.httpd.model = model
+        self.httpd.ttft_ms = float(ttft_ms)
+        self.httpd.token_ms = float(token_ms)
+        self.httpd.tokens = int(tokens)
+        self.httpd.prefill_ms = float(prefill_ms)
+        self.httpd.last_prompt = ""
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self) -> int:
+        return self.httpd.requests
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Fake Ollama server with configurable token latency.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=11435)
+    ap.add_argument("--ttft-ms", type=float, default=100.0, help="Delay before the first token")
+    ap.add_argument("--token-ms", type=float, default=20.0, help="Delay between tokens")
+    ap.add_argument("--tokens", type=int, default=40, help="Tokens per answer")
+    ap.add_argument("--prefill-ms", type=float, default=0.0, help="Prefill cost per prompt token not in the cache")
+    args = ap.parse_args()
+    fake = FakeOllama(args.host, args.port, args.ttft_ms, args.token_ms, args.tokens, prefill_ms=args.prefill_ms)
+    print(f"fake ollama on {fake.url} (ttft {args.ttft_ms}ms, {args.token_ms}ms/token, {args.tokens} tokens)")
+    try:
+        fake.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
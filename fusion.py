@@ -0,0 +1,127 @@
+# fusion.py
+# Hybrid score fusion for hybrid_search.
+# Combines the BM25 scores of the FTS prefilter with the vector distances in NumPy:
+#   weighted - w_vec * cosine + w_bm25 * minmax(-bm25) + w_kw * keyword_hits
+#   rrf      - reciprocal rank fusion of the vector and BM25 rankings (+ w_kw * keyword_hits)
+# Keyword hits come from per-chunk bitmaps in `chunk_terms`, written at index time
+# (ingest.py, or `python fusion.py build` for an existing DB), not from scanning text.
+
+import argparse
+import json
+import sqlite3
+
+import numpy as np
+
+from urdutext import get_meta, normalize_urdu, set_meta
+
+KEYWORDS = [normalize_urdu(k) for k in ["حبسِ جسم", "ہیبیس کارپس", "گرفتاری", "حراست", "وارنٹ"]]
+FUSION_METHODS = ("weighted", "rrf")
+
+
+def keyword_bits(text: str, keywords=KEYWORDS) -> int:
+    text = normalize_urdu(text)
+    bits = 0
+    for i, k in enumerate(keywords):
+        if k in text:
+            bits |= 1 << i
+    return bits
+
+
+def popcount64(bits: np.ndarray) -> np.ndarray:
+    b = np.ascontiguousarray(bits, dtype=np.uint64)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(b).astype(np.float32)
+    return np.unpackbits(b.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1).astype(np.float32)
+
+
+# ---------- term bitmaps ----------
+def create_term_tables(con: sqlite3.Connection, keywords=KEYWORDS):
+    # a new table (or a changed keyword list) on a DB that already has chunks is backfilled, so
+    # the "keywords" meta key never claims bitmaps that only cover the newly ingested chunks
+    con.execute("CREATE TABLE IF NOT EXISTS chunk_terms (id INTEGER PRIMARY KEY, bits INTEGER NOT NULL);")
+    if term_index_ok(con, keywords):
+        return
+    if con.execute("SELECT 1 FROM sqlite_master WHERE name='chunks';").fetchone() and \
+            con.execute("SELECT 1 FROM chunks LIMIT 1;").fetchone():
+        build_term_index(con, keywords)
+    else:
+        set_meta(con, "keywords", json.dumps(keywords, ensure_ascii=False))
+
+
+def term_index_ok(con: sqlite3.Connection, keywords=KEYWORDS) -> bool:
+    # bitmaps are only usable if they were built for the same keyword list
+    value = get_meta(con, "keywords")
+    return value is not None and json.loads(value) == list(keywords)
+
+
+def load_term_bits(con: sqlite3.Connection, ids) -> np.ndarray:
+    ids = [int(i) for i in ids]
+    if not ids:
+        return np.zeros(0, dtype=np.uint64)
+    placeholders = ",".join("?" * len(ids))
+    found = dict(con.execute(f"SELECT id, bits FROM chunk_terms WHERE id IN ({placeholders});", ids).fetchall())
+    return np.array([found.get(i, 0) for i in ids], dtype=np.uint64)
+
+
+def build_term_index(con: sqlite3.Connection, keywords=KEYWORDS, batch=10000) -> int:
+    con.execute("CREATE TABLE IF NOT EXISTS chunk_terms (id INTEGER PRIMARY KEY, bits INTEGER NOT NULL);")
+    con.execute("DELETE FROM chunk_terms;")
+    n = 0
+    cur = con.execute("SELECT id, text FROM chunks;")
+    while True:
+        rows = cur.fetchmany(batch)
+        if not rows:
+            break
+        con.executemany("INSERT INTO chunk_terms (id, bits) VALUES (?, ?);",
+                        [(i, keyword_bits(t, keywords)) for i, t in rows])
+        n += len(rows)
+    set_meta(con, "keywords", json.dumps(keywords, ensure_ascii=False))  # only once every chunk has its row
+    con.commit()
+    return n
+
+
+# ---------- scoring ----------
+class Fusion:
+    def __init__(self, method="weighted", w_vec=1.0, w_bm25=0.3, w_kw=0.1, rrf_k=60, term_bits=False):
+        if method not in FUSION_METHODS:
+            raise ValueError(f"unknown fusion method: {method}")
+        self.method = method
+        self.w_vec = float(w_vec)
+        self.w_bm25 = float(w_bm25)
+        self.w_kw = float(w_kw)
+        self.rrf_k = float(rrf_k)
+        self.term_bits = term_bits
+
+    def score(self, dist: np.ndarray, bm25: np.ndarray, kw_hits: np.ndarray) -> np.ndarray:
+        # dist: L2 distances of unit vectors; bm25: sqlite bm25() (lower is better, NaN = not an FTS hit)
+        dist = np.asarray(dist, dtype=np.float32)
+        bm25 = np.asarray(bm25, dtype=np.float32)
+        has_bm25 = ~np.isnan(bm25)
+        if self.method == "rrf":
+            vec_rank = np.empty(dist.size, dtype=np.float32)
+            vec_rank[np.argsort(dist, kind="stable")] = np.arange(1, dist.size + 1)
+            s = self.w_vec / (self.rrf_k + vec_rank)
+            if has_bm25.any():
+                bm_rank = np.empty(dist.size, dtype=np.float32)
+                bm_rank[np.argsort(np.where(has_bm25, bm25, np.inf), kind="stable")] = np.arange(1, dist.size + 1)
+                s += np.where(has_bm25, self.w_bm25 / (self.rrf_k + bm_rank), 0.0)
+            return s + self.w_kw * kw_hits / (self.rrf_k + 1.0)
+
+        cosine = 1.0 - (dist * dist) / 2.0
+        s = self.w_vec * cosine
+        if has_bm25.any():
+            rel = np.where(has_bm25, -bm25, np.nan)
+            lo, hi = np.nanmin(rel), np.nanmax(rel)
+            norm = (rel - lo) / (hi - lo) if hi > lo else np.ones_like(rel)
+            s += self.w_bm25 * np.nan_to_num(norm, nan=0.0)
+        return s + self.w_kw * kw_hits
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Precompute keyword bitmaps (chunk_terms) for hybrid fusion scoring.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("build")
+    p.add_argument("--db", required=True)
+    args = ap.parse_args()
+    con = sqlite3.connect(args.db)
+    print(f"indexed keyword bitmaps for {build_term_index(con)} chunks")
@@ -0,0 +1,70 @@
+# hotreload.py
+# Watches the served index files and asks app.reload_index to pick up a rebuild.
+# The fingerprint (answercache.corpus_version of every shard DB, plus the mtime of its vector
+# store: <db>.vec, or whatever store_for maps it to, e.g. --vector-dir) is polled every
+# `interval` seconds. A change only triggers a reload once the fingerprint has stayed the
+# same for one more poll, so a database that is still being written is not opened half-built.
+# A reload that fails validation is not retried until the files change again.
+#
+#   python app.py --db embeddings.db --watch-index 10
+#   python ingest.py ... --db embeddings.new.db && mv embeddings.new.db embeddings.db   # picked up within ~20 s
+
+import os
+import threading
+
+from answercache import corpus_version
+from metrics import log
+from vecstore import META_FILE, default_store_path
+
+
+def index_fingerprint(paths, store_for=default_store_path) -> str:
+    # store_for(db_path) -> the vector store directory served with that DB
+    parts = []
+    for path in paths:
+        try:
+            store = str(os.stat(os.path.join(store_for(path), META_FILE)).st_mtime_ns)
+        except OSError:
+            store = "-"
+        parts.append(f"{corpus_version(path)}+{store}")
+    return "|".join(parts)
+
+
+class IndexWatcher:
+    def __init__(self, paths, on_change, interval=10.0, store_for=default_store_path):
+        # paths() -> DB paths currently served; on_change(reason) runs on the watcher thread
+        self.paths = paths
+        self.on_change = on_change
+        self.interval = float(interval)
+        self.store_for = store_for
+        self._seen = self.fingerprint()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="index-watcher", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def reset(self):
+        # the served files changed for another reason (admin reload): take them as the baseline
+        self._seen = self.fingerprint()
+
+    def fingerprint(self) -> str:
+        return index_fingerprint(self.paths(), self.store_for)
+
+    def _run(self):
+        pending = None
+        while not self._stop.wait(self.interval):
+            try:
+                now = self.fingerprint()
+                if now == self._seen:
+                    pending = None
+                elif now != pending:
+                    pending = now  # changed: wait one interval for the writer to finish
+                else:
+                    self._seen, pending = now, None
+                    self.on_change("watch")
+            except Exception:
+                log.exception("index watcher failed; will retry")
@@ -0,0 +1,282 @@
+# ingest.py
+# Builds (or incrementally updates) the `chunks`, `chunks_fts` and `vectors` tables that
+# app.hybrid_search reads.
+#   - streams .txt / .pdf / .docx files and splits them on Urdu sentence boundaries
+#   - skips chunks whose content hash is already indexed for that document, so a re-run
+#     after a crash resumes where it stopped and unchanged documents cost almost nothing
+#   - encodes in large batches, optionally on a process pool (--workers)
+#   - writes FTS rows, keyword bitmaps and vectors in one transaction per batch
+#
+#   python ingest.py corpus/ --db embeddings.db --dll vec0.dll --model AraGemma-Embedding-300m
+#
+# Without --dll, vectors are stored as float32 blobs in an ordinary `vectors` table;
+# export them with --export-numpy and serve with `app.py --vector-backend numpy`.
+
+import argparse
+import hashlib
+import multiprocessing as mp
+import os
+import sqlite3
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+from fusion import create_term_tables, keyword_bits
+from urdutext import fts_normalized, normalize_urdu, reindex_fts, split_sentences
+from vecstore import QUANT_MODES, default_store_path, export_vectors, quantize_store
+
+DOC_EXTS = (".txt", ".md", ".pdf", ".docx")
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL;",
+    "PRAGMA synchronous = NORMAL;",
+    "PRAGMA temp_store = MEMORY;",
+    "PRAGMA cache_size = -262144;",
+    "PRAGMA mmap_size = 1073741824;",
+)
+
+
+# ---------- documents ----------
+def iter_files(paths):
+    for p in paths:
+        if os.path.isdir(p):
+            for root, _, files in os.walk(p):
+                for name in sorted(files):
+                    if name.lower().endswith(DOC_EXTS):
+                        yield os.path.join(root, name)
+        elif p.lower().endswith(DOC_EXTS):
+            yield p
+
+
+def read_document(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".pdf":
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            raise SystemExit("PDF input needs `pypdf` (pip install pypdf)")
+        return "\n\n".join((page.extract_text() or "") for page in PdfReader(path).pages)
+    if ext == ".docx":
+        try:
+            import docx
+        except ImportError:
+            raise SystemExit("DOCX input needs `python-docx` (pip install python-docx)")
+        return "\n\n".join(p.text for p in docx.Document(path).paragraphs)
+    with open(path, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def split_long(sentence: str, max_chars: int):
+    # PDF text often has no ۔ and single-newline paragraphs, so one "sentence" can be a whole
+    # page; cut it at whitespace into pieces of at most max_chars (a longer word is cut as is)
+    while len(sentence) > max_chars:
+        cut = max(sentence.rfind(ws, 0, max_chars + 1) for ws in " \n\t")
+        if cut <= 0:
+            cut = max_chars
+        yield sentence[:cut].rstrip()
+        sentence = sentence[cut:].lstrip()
+    if sentence:
+        yield sentence
+
+
+def chunk_text(text: str, max_chars=800, overlap=1):
+    # pack whole sentences up to max_chars; carry the last `overlap` sentences forward
+    sentences = [part for sent in split_sentences(text) for part in split_long(sent, max_chars)]
+    chunk, size = [], 0
+    for sent in sentences:
+        if chunk and size + len(sent) + 1 > max_chars:
+            yield " ".join(chunk)
+            chunk = chunk[-overlap:] if overlap else []
+            while chunk and sum(len(s) + 1 for s in chunk) + len(sent) + 1 > max_chars:
+                chunk.pop(0)  # the carried overlap must not push the next chunk past max_chars
+            size = sum(len(s) + 1 for s in chunk)
+        chunk.append(sent)
+        size += len(sent) + 1
+    if chunk:
+        yield " ".join(chunk)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+# ---------- DB ----------
+def open_db(db_path: str, dll_path: str = None, dim: int = None) -> sqlite3.Connection:
+    con = sqlite3.connect(db_path)
+    if dll_path:
+        con.enable_load_extension(True)
+        con.load_extension(dll_path)
+    for pragma in PRAGMAS:
+        con.execute(pragma)
+    con.execute("CREATE TABLE IF NOT EXISTS chunks (id INTEGER PRIMARY KEY, text TEXT NOT NULL);")
+    cols = {r[1] for r in con.execute("PRAGMA table_info(chunks);")}
+    for col, decl in (("doc", "TEXT"), ("ord", "INTEGER"), ("hash", "TEXT")):
+        if col not in cols:
+            con.execute(f"ALTER TABLE chunks ADD COLUMN {col} {decl};")
+    con.execute("CREATE INDEX IF NOT EXISTS chunks_doc_hash ON chunks(doc, hash);")
+    con.execute("CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(text);")
+    if not fts_normalized(con):
+        # chunks_fts holds normalize_urdu(text) so it matches normalized queries
+        reindex_fts(con)
+    create_term_tables(con)
+    if dim and not con.execute("SELECT 1 FROM sqlite_master WHERE name='vectors';").fetchone():
+        if dll_path:
+            con.execute(f"CREATE VIRTUAL TABLE vectors USING vec0(embedding float[{dim}]);")
+        else:
+            con.execute("CREATE TABLE vectors (rowid INTEGER PRIMARY KEY, embedding BLOB NOT NULL);")
+    con.commit()
+    return con
+
+
+def delete_chunks(con, ids):
+    for i in range(0, len(ids), 500):
+        part = ids[i:i + 500]
+        ph = ",".join("?" * len(part))
+        con.execute(f"DELETE FROM chunks_fts WHERE rowid IN ({ph});", part)
+        con.execute(f"DELETE FROM vectors WHERE rowid IN ({ph});", part)
+        con.execute(f"DELETE FROM chunk_terms WHERE id IN ({ph});", part)
+        con.execute(f"DELETE FROM chunks WHERE id IN ({ph});", part)
+
+
+def write_batch(con, rows, vectors):
+    # rows: [(id, doc, ord, text, hash)], one transaction for chunks + FTS + vectors
+    with con:
+        con.executemany("INSERT INTO chunks (id, doc, ord, text, hash) VALUES (?, ?, ?, ?, ?);", rows)
+        con.executemany("INSERT INTO chunks_fts (rowid, text) VALUES (?, ?);",
+                        [(r[0], normalize_urdu(r[3])) for r in rows])
+        con.executemany("INSERT INTO chunk_terms (id, bits) VALUES (?, ?);", [(r[0], keyword_bits(r[3])) for r in rows])
+        con.executemany("INSERT INTO vectors (rowid, embedding) VALUES (?, ?);",
+                        [(r[0], v.astype(np.float32).tobytes()) for r, v in zip(rows, vectors)])
+
+
+# ---------- encoding ----------
+_MODEL = None
+
+
+def _init_worker(model_path):
+    global _MODEL
+    from sentence_transformers import SentenceTransformer
+    _MODEL = SentenceTransformer(model_path)
+
+
+def _encode(job):
+    rows, batch_size = job
+    vecs = _MODEL.encode([r[3] for r in rows], batch_size=batch_size,
+                         normalize_embeddings=True, convert_to_numpy=True)
+    return rows, vecs.astype(np.float32)
+
+
+def pending_batches(con, files, batch_chunks, max_chars, stats):
+    # yields lists of new chunk rows; deletes stale chunks of changed documents on the way
+    next_id = (con.execute("SELECT MAX(id) FROM chunks;").fetchone()[0] or 0) + 1
+    batch = []
+    for path in files:
+        doc = os.path.abspath(path)
+        try:
+            pieces = list(chunk_text(read_document(path), max_chars=max_chars))
+        except Exception as e:
+            print(f"skip {path}: {e}", file=sys.stderr)
+            continue
+        stats["docs"] += 1
+        hashes = [content_hash(t) for t in pieces]
+        known = dict(con.execute("SELECT hash, id FROM chunks WHERE doc = ?;", (doc,)).fetchall())
+        current = set(hashes)
+        stale = [i for h, i in known.items() if h not in current]
+        if stale:
+            with con:
+                delete_chunks(con, stale)
+            stats["deleted"] += len(stale)
+        queued = set()
+        for ord_, (txt, h) in enumerate(zip(pieces, hashes)):
+            if h in known or h in queued:
+                stats["skipped"] += 1
+                continue
+            queued.add(h)
+            batch.append((next_id, doc, ord_, txt, h))
+            next_id += 1
+            if len(batch) >= batch_chunks:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def ingest(paths, db_path, model_path, dll_path=None, workers=0, batch_chunks=512, encode_batch=64,
+           max_chars=800, export_dir=None, quantize=()):
+    stats = {"docs": 0, "written": 0, "skipped": 0, "deleted": 0}
+    t0 = time.perf_counter()
+    con = None
+    pool = None
+    try:
+        if workers > 0:
+            ctx = mp.get_context("spawn")
+            pool = ctx.Pool(workers, initializer=_init_worker, initargs=(model_path,))
+            probe = pool.apply(_encode, (([(0, "", 0, "ا", "")], 1),))[1]
+        else:
+            _init_worker(model_path)
+            probe = _encode(([(0, "", 0, "ا", "")], 1))[1]
+        con = open_db(db_path, dll_path, dim=probe.shape[1])
+
+        def write(result):
+            rows, vecs = result
+            write_batch(con, rows, vecs)
+            stats["written"] += len(rows)
+            elapsed = time.perf_counter() - t0
+            print(f"\r{stats['written']} chunks  {stats['written'] / elapsed:.1f} chunks/s", end="", flush=True)
+
+        # the connection stays on this thread: batches are produced and written here,
+        # only encoding runs in the pool, with up to 2 jobs queued per worker
+        inflight = deque()
+        for batch in pending_batches(con, iter_files(paths), batch_chunks, max_chars, stats):
+            if pool is None:
+                write(_encode((batch, encode_batch)))
+                continue
+            inflight.append(pool.apply_async(_encode, ((batch, encode_batch),)))
+            if len(inflight) >= 2 * workers:
+                write(inflight.popleft().get())
+        while inflight:
+            write(inflight.popleft().get())
+        print()
+        con.execute("INSERT INTO chunks_fts(chunks_fts) VALUES ('optimize');")
+        con.commit()
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    if export_dir is not None or quantize:
+        out = export_vectors(con, export_dir or default_store_path(db_path))
+        if quantize:
+            quantize_store(out, quantize)
+    con.close()
+
+    elapsed = time.perf_counter() - t0
+    stats["seconds"] = round(elapsed, 2)
+    stats["chunks_per_sec"] = round(stats["written"] / elapsed, 1) if elapsed else 0.0
+    return stats
+
+
+if __name__ == "__main__":
+    from app import DEFAULT_DB, DEFAULT_MODEL
+
+    ap = argparse.ArgumentParser(description="Index txt/pdf/docx documents into embeddings.db (chunks, chunks_fts, vectors).")
+    ap.add_argument("paths", nargs="+", help="Files or directories to ingest")
+    ap.add_argument("--model", default=DEFAULT_MODEL)
+    ap.add_argument("--db", default=DEFAULT_DB)
+    ap.add_argument("--dll", default=None, help="sqlite-vec extension; without it vectors go to a plain table")
+    ap.add_argument("--workers", type=int, default=0, help="Encoder processes (0 = encode in this process)")
+    ap.add_argument("--batch-chunks", type=int, default=512, help="Chunks per encode job / write transaction")
+    ap.add_argument("--encode-batch", type=int, default=64, help="SentenceTransformer batch_size")
+    ap.add_argument("--max-chars", type=int, default=800, help="Target chunk size in characters")
+    ap.add_argument("--export-numpy", nargs="?", const="", default=None, metavar="DIR",
+                    help="Refresh the NumPy vector store after ingesting (default dir: <db>.vec)")
+    ap.add_argument("--quantize", nargs="*", choices=QUANT_MODES, default=[],
+                    help="Also rebuild int8 / binary codes in the NumPy store")
+    args = ap.parse_args()
+
+    stats = ingest(args.paths, args.db, args.model, dll_path=args.dll, workers=args.workers,
+                   batch_chunks=args.batch_chunks, encode_batch=args.encode_batch, max_chars=args.max_chars,
+                   export_dir=args.export_numpy, quantize=args.quantize)
+    print(stats)
@@ -0,0 +1,247 @@
+# llmclient.py
+# Ollama client shared by every Flask worker thread.
+#   - one requests.Session with a keep-alive connection pool
+#   - at most `max_concurrency` generations hit Ollama at once; up to `max_queue` more wait
+#   - identical prompts already in flight share one generation (non-streaming calls)
+#   - every request sends `keep_alive` so the model is not unloaded between requests
+#   - /api/chat with a fixed system message and fixed options: requests share a prompt
+#     prefix, so Ollama reuses its KV cache instead of re-evaluating the instructions
+#   - generate()/stream() take a per-call timeout (the request's remaining deadline) that
+#     bounds both the queue wait and the HTTP call
+# load() gives the admission controller queue depth and smoothed generation / first-token time.
+# stats() reports queue depth, coalescing, generation latency and prompt-eval (prefill) cost.
+
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class LLMQueueFull(RuntimeError):
+    pass
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    pass
+
+
+def _pct(samples) -> dict:
+    a = np.asarray(samples, dtype=np.float64)
+    if not a.size:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    return {"p50": float(np.percentile(a, 50)), "p95": float(np.percentile(a, 95)), "p99": float(np.percentile(a, 99))}
+
+
+class OllamaClient:
+    def __init__(self, url, model, max_concurrency=2, max_queue=32, queue_timeout=60.0,
+                 keep_alive=-1, timeout=120.0, system=None, options=None):
+        self.url = url.rstrip("/")
+        self.model = model
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_queue = int(max_queue)
+        self.queue_timeout = queue_timeout
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.system = system
+        self.options = dict(options or {})
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency + 4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.waiting = 0
+        self.active = 0
+        self.requests = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.errors = 0
+        self._gen_ms = deque(maxlen=1024)
+        self._wait_ms = deque(maxlen=1024)
+        self._ttft_ms = deque(maxlen=1024)
+        self._eval_tokens = deque(maxlen=1024)
+        self._eval_ms = deque(maxlen=1024)
+        self.ewma_alpha = 0.2
+        self._gen_ewma = None
+        self._ttft_ewma = None
+
+    def _payload(self, prompt: str, stream: bool) -> dict:
+        # system message and options must be identical on every request (and on warm()),
+        # or Ollama re-evaluates the prefix / reloads the model
+        messages = [{"role": "user", "content": prompt}]
+        if self.system:
+            messages.insert(0, {"role": "system", "content": self.system})
+        payload = {"model": self.model, "messages": messages, "stream": stream, "keep_alive": self.keep_alive}
+        if self.options:
+            payload["options"] = self.options
+        return payload
+
+    def _record_eval(self, data: dict):
+        # prompt_eval_count only counts tokens Ollama did not find in its KV cache
+        if "prompt_eval_count" in data:
+            with self._lock:
+                self._eval_tokens.append(data["prompt_eval_count"])
+                self._eval_ms.append(data.get("prompt_eval_duration", 0) / 1e6)
+
+    def _ewma(self, old, value):
+        return value if old is None else old + self.ewma_alpha * (value - old)
+
+    @staticmethod
+    def _left(deadline, cap):
+        if deadline is None:
+            return cap
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise LLMDeadlineExceeded("request deadline passed")
+        return min(cap, left)
+
+    @contextmanager
+    def _slot(self, deadline=None):
+        with self._lock:
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise LLMQueueFull("LLM queue is full")
+            self.waiting += 1
+            self.requests += 1
+        t0 = time.perf_counter()
+        try:
+            wait = self._left(deadline, self.queue_timeout)
+            ok = self._slots.acquire(timeout=wait)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        if not ok:
+            with self._lock:
+                self.rejected += 1
+            if wait < self.queue_timeout:
+                raise LLMDeadlineExceeded("request deadline passed waiting for a generation slot")
+            raise LLMQueueFull("timed out waiting for a generation slot")
+        t1 = time.perf_counter()
+        with self._lock:
+            self.active += 1
+            self._wait_ms.append((t1 - t0) * 1000.0)
+        try:
+            yield
+        except BaseException:
+            with self._lock:
+                self.errors += 1
+            raise
+        else:
+            # only completed generations feed the estimate: fast failures would make a broken
+            # Ollama look idle, timeouts would only echo the deadline
+            with self._lock:
+                self._gen_ewma = self._ewma(self._gen_ewma, (time.perf_counter() - t1) * 1000.0)
+        finally:
+            self._slots.release()
+            with self._lock:
+                self.active -= 1
+                self._gen_ms.append((time.perf_counter() - t1) * 1000.0)
+
+    # ---------- calls ----------
+    def warm(self) -> bool:
+        # an empty chat makes Ollama load the model (and hold it for keep_alive) without generating
+        try:
+            payload = {"model": self.model, "messages": [], "keep_alive": self.keep_alive}
+            if self.options:
+                payload["options"] = self.options
+            r = self.session.post(f"{self.url}/api/chat", json=payload, timeout=self.timeout)
+            r.raise_for_status()
+            return True
+        except requests.RequestException:
+            return False
+
+    def generate(self, prompt: str, timeout=None) -> str:
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._lock:
+            fut = self._inflight.get(prompt)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._inflight[prompt] = fut
+            else:
+                self.coalesced += 1
+        if not leader:
+            try:
+                return fut.result(timeout)
+            except FutureTimeout:
+                raise LLMDeadlineExceeded("request deadline passed waiting for a coalesced generation")
+        try:
+            with self._slot(deadline):
+                r = self.session.post(f"{self.url}/api/chat", json=self._payload(prompt, False),
+                                      timeout=self._left(deadline, self.timeout))
+                r.raise_for_status()
+                data = r.json()
+                self._record_eval(data)
+                text = data.get("message", {}).get("content", "").strip()
+            fut.set_result(text)
+            return text
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(prompt, None)
+
+    def stream(self, prompt: str, timeout=None):
+        # Ollama streams NDJSON: one {"message": {"content": "<token>"}, "done": false} object per line.
+        # timeout bounds the wait for the first token; once tokens flow the answer is finished
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._slot(deadline):
+            t0 = time.perf_counter()
+            first = True
+            read_timeout = self._left(deadline, self.timeout)
+            with self.session.post(f"{self.url}/api/chat", json=self._payload(prompt, True),
+                                   stream=True, timeout=(min(10, read_timeout), read_timeout)) as r:
+                r.raise_for_status()
+                for line in r.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        raise RuntimeError(data["error"])
+                    token = data.get("message", {}).get("content", "")
+                    if token:
+                        if first:
+                            first = False
+                            ttft = (time.perf_counter() - t0) * 1000.0
+                            with self._lock:
+                                self._ttft_ms.append(ttft)
+                                self._ttft_ewma = self._ewma(self._ttft_ewma, ttft)
+                        yield token
+                    if data.get("done"):
+                        self._record_eval(data)
+                        return
+
+    # ---------- stats ----------
+    def load(self) -> dict:
+        # cheap snapshot for per-request admission decisions; *_ms are None until measured
+        with self._lock:
+            return {"waiting": self.waiting, "active": self.active, "max_concurrency": self.max_concurrency,
+                    "generation_ms": self._gen_ewma, "ttft_ms": self._ttft_ewma}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "model": self.model,
+                "keep_alive": self.keep_alive,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "queue_depth": self.waiting,
+                "active": self.active,
+                "requests": self.requests,
+                "coalesced": self.coalesced,
+                "rejected": self.rejected,
+                "errors": self.errors,
+                "generation_ms": _pct(self._gen_ms),
+                "queue_wait_ms": _pct(self._wait_ms),
+                "time_to_first_token_ms": _pct(self._ttft_ms),
+                "prompt_eval_tokens": _pct(self._eval_tokens),
+                "prompt_eval_ms": _pct(self._eval_ms),
+            }
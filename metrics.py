@@ -0,0 +1,165 @@
+# metrics.py
+# Per-stage latency instrumentation for the /chat pipeline.
+# A Trace is created per request; `with trace.span("knn"):` records the stage both in the
+# trace (returned by /chat?debug=timing) and in a process-wide histogram that /metrics
+# renders in the Prometheus text format. Requests slower than SLOW_MS are logged.
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+log = logging.getLogger("urdu_agent")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+SIZE_BUCKETS = (0, 1, 5, 10, 20, 50, 100, 200, 500, 1000)
+TOKEN_BUCKETS = (0, 32, 64, 128, 256, 512, 768, 1024, 1536, 2048, 4096, 8192)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets, label="stage"):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.label = label
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, label_value: str, value: float):
+        with self._lock:
+            s = self._series.get(label_value)
+            if s is None:
+                s = self._series[label_value] = [[0] * len(self.buckets), 0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    s[0][i] += 1
+            s[1] += value
+            s[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for lv, (counts, total, n) in sorted(self._series.items()):
+                for b, c in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{{{self.label}="{lv}",le="{b:g}"}} {c}')
+                lines.append(f'{self.name}_bucket{{{self.label}="{lv}",le="+Inf"}} {n}')
+                lines.append(f'{self.name}_sum{{{self.label}="{lv}"}} {total:.6f}')
+                lines.append(f'{self.name}_count{{{self.label}="{lv}"}} {n}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label=None):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, label_value=None, n=1):
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + n
+
+    def values(self) -> dict:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for lv, v in sorted(self._values.items(), key=lambda kv: str(kv[0])):
+                labels = f'{{{self.label}="{lv}"}}' if self.label else ""
+                lines.append(f"{self.name}{labels} {v}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("urdu_agent_stage_seconds", "Latency of each /chat pipeline stage.", LATENCY_BUCKETS)
+REQUEST_SECONDS = Histogram("urdu_agent_request_seconds", "End-to-end /chat latency.", LATENCY_BUCKETS, label="route")
+CANDIDATES = Histogram("urdu_agent_candidates", "Candidate-set sizes per retrieval step.", SIZE_BUCKETS, label="step")
+PROMPT_TOKENS = Histogram("urdu_agent_prompt_tokens", "Prompt tokens sent to the LLM and tokens saved by context packing.",
+                          TOKEN_BUCKETS, label="kind")
+ERRORS = Counter("urdu_agent_errors_total", "Exceptions caught in the /chat pipeline.", label="stage")
+SLOW_REQUESTS = Counter("urdu_agent_slow_requests_total", "Requests slower than the slow-request threshold.")
+DEGRADED = Counter("urdu_agent_degraded_answers_total", "Extractive answers served instead of an LLM answer.",
+                   label="reason")
+SHED = Counter("urdu_agent_shed_requests_total", "Requests refused with 503 because the LLM could not meet their deadline.",
+               label="reason")
+RELOADS = Counter("urdu_agent_index_reloads_total", "Index hot reloads, by outcome (ok / failed).", label="outcome")
+
+SLOW_MS = 5000.0
+_collectors = []
+
+
+def register_collector(fn):
+    # fn() -> iterable of (name, type, help, value) for gauges/counters owned elsewhere
+    if fn not in _collectors:
+        _collectors.append(fn)
+    return fn
+
+
+def render() -> str:
+    lines = []
+    for metric in (REQUEST_SECONDS, STAGE_SECONDS, CANDIDATES, PROMPT_TOKENS, ERRORS, SLOW_REQUESTS, DEGRADED, SHED,
+                   RELOADS):
+        lines.extend(metric.render())
+    for fn in _collectors:
+        try:
+            for name, kind, help_text, value in fn():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+        except Exception:
+            log.exception("metrics collector failed")
+    return "\n".join(lines) + "\n"
+
+
+class Trace:
+    def __init__(self, route="chat", query=""):
+        self.route = route
+        self.query = query
+        self.t0 = time.perf_counter()
+        self.stages = {}
+        self.sizes = {}
+        self.current = None
+        self.failed = None
+
+    @contextmanager
+    def span(self, stage: str):
+        prev, self.current = self.current, stage
+        t0 = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.failed = self.failed or stage
+            raise
+        finally:
+            dt = time.perf_counter() - t0
+            self.current = prev
+            self.stages[stage] = self.stages.get(stage, 0.0) + dt
+            STAGE_SECONDS.observe(stage, dt)
+
+    def size(self, step: str, n: int):
+        self.sizes[step] = n
+        CANDIDATES.observe(step, n)
+
+    def tokens(self, prompt: int, saved: int):
+        self.sizes["prompt_tokens"] = prompt
+        self.sizes["tokens_saved"] = saved
+        PROMPT_TOKENS.observe("prompt", prompt)
+        PROMPT_TOKENS.observe("saved", saved)
+
+    def error(self, stage=None):
+        ERRORS.inc(stage or self.failed or "unknown")
+
+    def finish(self) -> float:
+        total = time.perf_counter() - self.t0
+        REQUEST_SECONDS.observe(self.route, total)
+        if total * 1000.0 >= SLOW_MS:
+            SLOW_REQUESTS.inc()
+            log.warning("slow %s request %.0fms %s query=%r", self.route, total * 1000.0,
+                        " ".join(f"{k}={v * 1000.0:.1f}ms" for k, v in self.stages.items()), self.query[:80])
+        return total
+
+    def timing(self) -> dict:
+        out = {k: round(v * 1000.0, 3) for k, v in self.stages.items()}
+        out["total"] = round((time.perf_counter() - self.t0) * 1000.0, 3)
+        out["candidates"] = dict(self.sizes)
+        return out
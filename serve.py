@@ -0,0 +1,113 @@
+# serve.py
+# Multi-process serving. One embedserver.py process owns the embedding model; N app.py
+# workers share a listening socket bound here (inherited by fd, so the kernel spreads
+# connections across them) and send their queries to the embedding process.
+# Workers never import torch, so each one costs tens of MB instead of a model copy.
+#
+#   python serve.py --workers 4 --model AraGemma-Embedding-300m -- --db embeddings.db --dll vec0.dll
+#
+# Arguments after `--` are passed to every app.py worker. More than one worker needs fd
+# inheritance (Linux/macOS); on Windows run a single worker.
+# Each run generates a random authkey for the embedding socket and hands it to the embedding
+# process and the workers in their environment (see embedserver.py).
+# Each worker serves its own index snapshot. `kill -HUP <serve.py pid>` (or POST /admin/reload
+# to any worker, which signals this process) reloads every worker's index; switching to other
+# databases ({"db": ...}) needs a restart with the new --db.
+
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from embedserver import AUTHKEY_ENV, DEFAULT_ADDRESS, new_authkey
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def bind(host: str, port: int, backlog=256) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _env(authkey: str) -> dict:
+    return {**os.environ, AUTHKEY_ENV: authkey}
+
+
+def start_embed_server(address: str, authkey: str, embed_args=()) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, os.path.join(HERE, "embedserver.py"), "--address", address, *embed_args],
+                            env=_env(authkey))
+
+
+def start_worker(address: str, authkey: str, host: str, port: int, app_args=(), sock=None) -> subprocess.Popen:
+    cmd = [sys.executable, os.path.join(HERE, "app.py"), "--embed-server", address,
+           "--host", host, "--port", str(port), *app_args]
+    if sock is None:
+        return subprocess.Popen(cmd, env=_env(authkey))  # binds the port itself
+    fd = sock.fileno()
+    return subprocess.Popen(cmd + ["--listen-fd", str(fd)], pass_fds=(fd,), env=_env(authkey))
+
+
+def stop(procs, timeout=10.0):
+    for p in procs:
+        if p.poll() is None:
+            p.terminate()
+    deadline = time.monotonic() + timeout
+    for p in procs:
+        try:
+            p.wait(max(0.1, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            p.kill()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Run N app.py workers behind one shared embedding process.")
+    ap.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=5000)
+    ap.add_argument("--address", default=DEFAULT_ADDRESS, help="Socket of the embedding process")
+    ap.add_argument("--model", default=None, help="Embedding model (default: app.DEFAULT_MODEL)")
+    ap.add_argument("--embed-backend", choices=["torch", "onnx"], default="torch")
+    ap.add_argument("--embed-window-ms", type=float, default=5.0,
+                    help="Batching window of the embedding process (it batches across all workers)")
+    ap.add_argument("--embed-max-batch", type=int, default=64)
+    ap.add_argument("app_args", nargs=argparse.REMAINDER, help="-- followed by app.py arguments")
+    args = ap.parse_args()
+    app_args = args.app_args[1:] if args.app_args[:1] == ["--"] else args.app_args
+    if os.name == "nt" and args.workers > 1:
+        ap.error("--workers > 1 needs a shared listening socket, which is not available on Windows")
+
+    embed_args = ["--embed-backend", args.embed_backend, "--embed-window-ms", str(args.embed_window_ms),
+                  "--embed-max-batch", str(args.embed_max_batch)]
+    if args.model:
+        embed_args += ["--model", args.model]
+    sock = None if os.name == "nt" else bind(args.host, args.port)
+    authkey = new_authkey()
+    embed = start_embed_server(args.address, authkey, embed_args)
+    workers = [start_worker(args.address, authkey, args.host, args.port, app_args, sock) for _ in range(args.workers)]
+    print(f"serving on http://{args.host}:{args.port} with {len(workers)} worker(s), embeddings via {args.address}",
+          flush=True)
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda *_: [w.send_signal(signal.SIGHUP) for w in workers if w.poll() is None])
+    try:
+        while True:
+            time.sleep(1.0)
+            if embed.poll() is not None:
+                print(f"embedding server exited ({embed.returncode}); restarting", file=sys.stderr, flush=True)
+                embed = start_embed_server(args.address, authkey, embed_args)
+            for i, w in enumerate(workers):
+                if w.poll() is not None:
+                    print(f"worker {w.pid} exited ({w.returncode}); restarting", file=sys.stderr, flush=True)
+                    workers[i] = start_worker(args.address, authkey, args.host, args.port, app_args, sock)
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        stop(workers + [embed])
@@ -0,0 +1,159 @@
+# shards.py
+# Retrieval over several embeddings databases ("shards", e.g. federal vs provincial law,
+# statutes vs judgments). Every shard is a complete DB as ingest.py writes it, with its own
+# connection pool, vector index, chunk-text cache and FTS lexicon, so it can be rebuilt or
+# reindexed on its own. app.sharded_search fans the per-shard FTS + KNN step out on the
+# ShardSet's thread pool and fuses the union of candidates once (see there).
+#
+#   python app.py --db federal=federal.db provincial=provincial.db judgments.db
+#
+# A shard is named NAME=PATH, or after its file name. Rowids are only unique within a shard.
+#
+# A ShardSet is also the unit of hot reload (app.reload_index): requests lease the current
+# set for their whole run, a reload swaps in a new set, and the old one is closed only
+# after its last lease is released.
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from answercache import corpus_version
+
+
+def parse_shards(specs) -> list:
+    # ["federal=/data/federal.db", "/data/judgments.db"] -> [("federal", ...), ("judgments", ...)]
+    out, seen = [], set()
+    for spec in specs:
+        name, sep, path = spec.partition("=")
+        if not sep or os.path.exists(spec):
+            name, path = os.path.splitext(os.path.basename(spec))[0], spec
+        if name in seen:
+            raise ValueError(f"duplicate shard name {name!r}; name shards explicitly with NAME=PATH")
+        seen.add(name)
+        out.append((name, path))
+    if not out:
+        raise ValueError("no databases given")
+    return out
+
+
+class Shard:
+    def __init__(self, name, path, pool, vector_index, text_cache=None, lexicon=None, term_bits=False):
+        self.name = name
+        self.path = path
+        self.pool = pool
+        self.vector_index = vector_index
+        self.text_cache = text_cache
+        self.lexicon = lexicon
+        self.term_bits = term_bits
+
+    def stats(self) -> dict:
+        return {"name": self.name, "path": self.path, "vector_backend": getattr(self.vector_index, "name", None),
+                "term_bits": self.term_bits, "pool": self.pool.stats(),
+                "chunk_texts": self.text_cache.stats() if self.text_cache is not None else None}
+
+    def close(self):
+        self.pool.close()
+
+
+class ShardSet:
+    def __init__(self, shards, max_workers=None, fusion=None, generation=1):
+        self.shards = list(shards)
+        self.by_name = {s.name: s for s in self.shards}
+        self.fusion = fusion  # scoring for this set (term_bits follows the primary DB)
+        self.generation = generation
+        self.opened_version = self.version()
+        self.opened_at = time.time()
+        self._lock = threading.Lock()
+        self._leases = 0
+        self._retired = False
+        self._closed = False
+        # one thread per shard per concurrent request is plenty; each holds a pooled connection
+        self._executor = None
+        if len(self.shards) > 1:
+            self._executor = ThreadPoolExecutor(max_workers or 4 * len(self.shards), thread_name_prefix="shard")
+
+    def __len__(self):
+        return len(self.shards)
+
+    def __iter__(self):
+        return iter(self.shards)
+
+    @property
+    def primary(self) -> Shard:
+        return self.shards[0]
+
+    def select(self, names=None) -> list:
+        # request routing: None = every shard
+        if not names:
+            return self.shards
+        if isinstance(names, str):
+            names = [names]
+        unknown = [n for n in names if n not in self.by_name]
+        if unknown:
+            raise ValueError(f"unknown shard(s): {', '.join(map(str, unknown))}")
+        return [self.by_name[n] for n in names]
+
+    def map(self, fn, shards=None) -> list:
+        shards = self.shards if shards is None else shards
+        if len(shards) == 1 or self._executor is None:
+            return [fn(s) for s in shards]
+        return list(self._executor.map(fn, shards))
+
+    def version(self) -> str:
+        # changes when any shard is rewritten (answer-cache invalidation)
+        return "|".join(corpus_version(s.path) for s in self.shards)
+
+    def specs(self) -> list:
+        return [(s.name, s.path) for s in self.shards]
+
+    def info(self) -> dict:
+        # what is being served: the fingerprint the set was opened at, not the files' current one
+        return {"version": self.opened_version, "generation": self.generation,
+                "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.opened_at)),
+                "shards": dict(self.specs())}
+
+    def stats(self) -> list:
+        return [s.stats() for s in self.shards]
+
+    # ---------- leases (hot reload) ----------
+    def acquire(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("shard set already closed")
+            self._leases += 1
+        return self
+
+    def release(self):
+        with self._lock:
+            self._leases -= 1
+            close = self._retired and self._leases == 0 and not self._closed
+            self._closed = self._closed or close
+        if close:
+            self._close()
+
+    @property
+    def retired(self) -> bool:
+        return self._retired
+
+    def retire(self):
+        # replaced by a reload: close now if idle, else when the last in-flight request releases it
+        with self._lock:
+            self._retired = True
+            close = self._leases == 0 and not self._closed
+            self._closed = self._closed or close
+        if close:
+            self._close()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._close()
+
+    def _close(self):
+        for s in self.shards:
+            s.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,185 @@
+# urdutext.py
+# Urdu query processing for the FTS prefilter.
+#   normalize_urdu  - strips diacritics/tatweel/ZWNJ and folds Arabic letter variants
+#                     (ي/ى -> ی, ك -> ک, ه -> ہ, digits -> ASCII). ingest.py applies the same
+#                     function to chunks_fts, so queries and index agree.
+#   Lexicon         - synonym groups (urdu_lexicon.json) loaded once into a phrase index;
+#                     a query is expanded only with synonyms of terms it actually contains.
+#
+#   python urdutext.py reindex --db embeddings.db   # rebuild chunks_fts from normalized chunk text
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+
+NORMALIZATION_VERSION = "1"
+DEFAULT_LEXICON = os.path.join(os.path.dirname(os.path.abspath(__file__)), "urdu_lexicon.json")
+
+_DIACRITICS = re.compile("[\u064B-\u065F\u0670\u06D6-\u06ED\u0640\u200C-\u200F]")
+_FOLD = str.maketrans({
+    "\u064A": "\u06CC",  # ي -> ی
+    "\u0649": "\u06CC",  # ى -> ی
+    "\u0643": "\u06A9",  # ك -> ک
+    "\u0647": "\u06C1",  # ه -> ہ
+    "\u0629": "\u06C1",  # ة -> ہ
+    "\u06C0": "\u06C1",  # ۀ -> ہ
+    **{chr(0x0660 + i): str(i) for i in range(10)},
+    **{chr(0x06F0 + i): str(i) for i in range(10)},
+})
+_TOKEN = re.compile(r"[^\W_]+", re.UNICODE)
+SENTENCE_END = re.compile(r"(?<=[۔؟!?\.])\s+|\n{2,}")
+
+STOPWORDS = frozenset(
+    "کا کی کے کو سے میں پر اور یا ہے ہیں تھا تھی تھے ہو ہوں ہوتا ہوتی ہوتے کیا کیسے کب کون کونسا کونسی "
+    "کس کیوں کہاں یہ وہ اس ان ایک بھی تو نے جو جس جب تک لیے لئے کر کریں کرنا کروں کرے سکتا سکتی سکتے "
+    "گا گی گے رہا رہی رہے مجھے میرا میری میرے ہم آپ اگر کہ نہیں نہ ساتھ بغیر والا والی والے حاصل".split()
+)
+
+
+def normalize_urdu(text: str) -> str:
+    text = _DIACRITICS.sub("", text or "").translate(_FOLD)
+    return " ".join(text.split())
+
+
+def tokens(text: str):
+    return _TOKEN.findall(normalize_urdu(text))
+
+
+def split_sentences(text: str):
+    return [s.strip() for s in SENTENCE_END.split(text) if s and s.strip()]
+
+
+def fts_phrase(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+class Lexicon:
+    def __init__(self, groups, normalize=True):
+        self.normalize = normalize
+        self.groups = []
+        self._index = {}
+        self.max_len = 1
+        for group in groups:
+            terms = list(dict.fromkeys(normalize_urdu(t) for t in group if t.strip()))
+            gid = len(self.groups)
+            self.groups.append(terms)
+            for t in terms:
+                self._index.setdefault(t, set()).add(gid)
+                self.max_len = max(self.max_len, len(t.split()))
+
+    @classmethod
+    def load(cls, path=DEFAULT_LEXICON, normalize=True):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), normalize=normalize)
+
+    def matches(self, toks):
+        # longest-first phrase matches over the normalized query tokens
+        found, i = [], 0
+        while i < len(toks):
+            for n in range(min(self.max_len, len(toks) - i), 0, -1):
+                phrase = " ".join(toks[i:i + n])
+                if phrase in self._index:
+                    found.append(phrase)
+                    i += n
+                    break
+            else:
+                i += 1
+        return found
+
+    def expand(self, query: str):
+        toks = tokens(query) if self.normalize else query.split()
+        matched = self.matches(toks)
+        terms = [t for t in toks if t not in STOPWORDS and len(t) > 1]
+        terms += matched
+        for phrase in matched:
+            for gid in self._index[phrase]:
+                terms.extend(self.groups[gid])
+        return list(dict.fromkeys(terms))
+
+    def clauses(self, query: str):
+        # one OR-group per content unit of the query: a lexicon phrase with its synonyms, or a word
+        toks = tokens(query) if self.normalize else query.split()
+        groups, i = [], 0
+        while i < len(toks):
+            for n in range(min(self.max_len, len(toks) - i), 0, -1):
+                phrase = " ".join(toks[i:i + n])
+                if phrase in self._index:
+                    groups.append([phrase] + [t for gid in sorted(self._index[phrase]) for t in self.groups[gid]])
+                    i += n
+                    break
+            else:
+                if toks[i] not in STOPWORDS and len(toks[i]) > 1:
+                    groups.append([toks[i]])
+                i += 1
+        groups = [tuple(dict.fromkeys(g)) for g in groups]
+        return [list(g) for g in dict.fromkeys(groups)]
+
+    def fts_query(self, query: str):
+        # every content unit must match (as itself or a synonym): "(a OR a') AND b AND ..."
+        groups = self.clauses(query)
+        parts = [" OR ".join(fts_phrase(t) for t in g) for g in groups]
+        if len(parts) > 1:
+            parts = [f"({p})" if len(g) > 1 else p for p, g in zip(parts, groups)]
+        return " AND ".join(parts) if parts else None
+
+    def fts_fallback(self, query: str):
+        # any term matches: only used when fts_query finds nothing
+        terms = self.expand(query)
+        return " OR ".join(fts_phrase(t) for t in terms) if terms else None
+
+    def fts_queries(self, query: str):
+        # expressions to try in order until one returns rows
+        return [e for e in dict.fromkeys([self.fts_query(query), self.fts_fallback(query)]) if e]
+
+
+# ---------- index side ----------
+def set_meta(con: sqlite3.Connection, key: str, value: str):
+    con.execute("CREATE TABLE IF NOT EXISTS index_meta (key TEXT PRIMARY KEY, value TEXT);")
+    con.execute("INSERT OR REPLACE INTO index_meta (key, value) VALUES (?, ?);", (key, value))
+
+
+def get_meta(con: sqlite3.Connection, key: str):
+    try:
+        row = con.execute("SELECT value FROM index_meta WHERE key = ?;", (key,)).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return row[0] if row else None
+
+
+def fts_normalized(con: sqlite3.Connection) -> bool:
+    return get_meta(con, "fts_normalization") == NORMALIZATION_VERSION
+
+
+def reindex_fts(con: sqlite3.Connection, batch=10000) -> int:
+    con.execute("CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(text);")
+    con.execute("DELETE FROM chunks_fts;")
+    n = 0
+    cur = con.execute("SELECT id, text FROM chunks;")
+    while True:
+        rows = cur.fetchmany(batch)
+        if not rows:
+            break
+        con.executemany("INSERT INTO chunks_fts (rowid, text) VALUES (?, ?);",
+                        [(i, normalize_urdu(t)) for i, t in rows])
+        n += len(rows)
+    con.execute("INSERT INTO chunks_fts(chunks_fts) VALUES ('optimize');")
+    set_meta(con, "fts_normalization", NORMALIZATION_VERSION)
+    con.commit()
+    return n
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Urdu normalization utilities.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("reindex", help="Rebuild chunks_fts from normalized chunk text")
+    p.add_argument("--db", required=True)
+    p = sub.add_parser("expand", help="Show the FTS expression for a query")
+    p.add_argument("query")
+    p.add_argument("--lexicon", default=DEFAULT_LEXICON)
+    args = ap.parse_args()
+    if args.cmd == "reindex":
+        print(f"reindexed {reindex_fts(sqlite3.connect(args.db))} chunks")
+    else:
+        print("\n".join(Lexicon.load(args.lexicon).fts_queries(args.query)))
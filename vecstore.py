@@ -0,0 +1,472 @@
+# vecstore.py
+# Pluggable vector backends for hybrid_search.
+#   Vec0Index        - KNN through the sqlite-vec `vectors` virtual table (the original path)
+#   NumpyVectorIndex - exact search over a memory-mapped .npy export of that table
+#   QuantizedVectorIndex - int8 / 1-bit coarse scan over the same export, rescored exactly
+#   IVFVectorIndex   - inverted-file ANN (k-means lists, IVF-flat) over the same export: a search
+#                      scans the `nprobe` lists nearest the query instead of every row
+# All return [(rowid, l2_distance), ...] sorted by distance, so the scoring in
+# hybrid_search does not care which one is active.
+#
+# One-time export (needs vec0 only for this step):
+#   python vecstore.py export --db embeddings.db --dll vec0.dll --out embeddings.vec --dtype float16
+#   python vecstore.py quantize --store embeddings.vec --modes int8 binary
+#   python vecstore.py ivf --store embeddings.vec [--nlist 4096]
+
+import argparse
+import json
+import os
+import sqlite3
+
+import numpy as np
+
+VECTORS_FILE = "vectors.npy"
+ROWIDS_FILE = "rowids.npy"
+NORMS_FILE = "norms.npy"
+META_FILE = "meta.json"
+SQ8_FILE = "sq8.npy"
+SQ8_LO_FILE = "sq8_lo.npy"
+SQ8_SCALE_FILE = "sq8_scale.npy"
+BITS_FILE = "bits.npy"
+QUANT_MODES = ("int8", "binary")
+INDEX_BACKENDS = ("numpy", *QUANT_MODES, "ivf")   # open_index() backends over an exported store
+IVF_FILE = "ivf.json"
+IVF_CENTROIDS_FILE = "ivf_centroids.npy"
+IVF_OFFSETS_FILE = "ivf_offsets.npy"   # list l is rows offsets[l]:offsets[l+1] of the files below
+IVF_ORDER_FILE = "ivf_order.npy"       # store position of each row, grouped by list
+IVF_VECTORS_FILE = "ivf_vectors.npy"   # vectors in list order, so a probed list is one sequential read
+IVF_NORMS_FILE = "ivf_norms.npy"
+IVF_LISTS_FILE = "ivf_lists.npy"       # list of each store position (filtered search)
+
+
+class Vec0Index:
+    name = "vec0"
+
+    def search(self, con, q: np.ndarray, k: int, candidate_ids=None):
+        if candidate_ids:
+            placeholders = ",".join("?" * len(candidate_ids))
+            return con.execute(f"""
+                SELECT v.rowid, v.distance
+                FROM vectors v
+                WHERE v.rowid IN ({placeholders})
+                  AND v.embedding MATCH ?
+                ORDER BY v.distance
+                LIMIT ?;""", (*candidate_ids, q.tobytes(), k)).fetchall()
+        return con.execute("""
+            SELECT rowid, distance FROM vectors
+            WHERE embedding MATCH ? ORDER BY distance LIMIT ?;""",
+            (q.tobytes(), k)).fetchall()
+
+
+class NumpyVectorIndex:
+    name = "numpy"
+
+    def __init__(self, path: str, block_rows=65536):
+        # mmap_mode="r": nothing is read until a search touches it, so start-up is O(1)
+        self.path = path
+        self.vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+        self.rowids = np.load(os.path.join(path, ROWIDS_FILE), mmap_mode="r")
+        self.norms = np.load(os.path.join(path, NORMS_FILE), mmap_mode="r")
+        self.block_rows = int(block_rows)
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1]
+
+    def verify(self, con: sqlite3.Connection):
+        # the export is a snapshot: after an ingest without --export-numpy new chunks would never
+        # reach the vector step and reused rowids would map to the wrong text
+        try:
+            count, max_rowid = con.execute("SELECT COUNT(*), MAX(rowid) FROM vectors;").fetchone()
+        except sqlite3.OperationalError:
+            # a vec0 table without the extension loaded: its rowids are in the shadow table
+            count, max_rowid = con.execute("SELECT COUNT(*), MAX(rowid) FROM vectors_rowids;").fetchone()
+        stored = (len(self), int(self.rowids[-1]) if len(self) else None)
+        if (count, max_rowid) != stored:
+            raise ValueError(f"vector store {self.path} is stale ({stored[0]} rows up to rowid {stored[1]}, "
+                             f"the DB has {count} up to {max_rowid}); re-export it with `python vecstore.py export`")
+
+    def positions(self, candidate_ids) -> np.ndarray:
+        # sorted, de-duplicated ids: searchsorted then walks the rowid memmap forwards
+        ids = np.unique(np.asarray(candidate_ids, dtype=np.int64))
+        pos = np.searchsorted(self.rowids, ids)
+        pos = np.clip(pos, 0, len(self.rowids) - 1)
+        return pos[self.rowids[pos] == ids]
+
+    def search(self, con, q: np.ndarray, k: int, candidate_ids=None):
+        if candidate_ids:
+            return self.search_positions(q, k, self.positions(candidate_ids))
+        q = np.asarray(q, dtype=np.float32)
+        q_norm = float(q @ q)
+
+        best_pos = np.empty(0, dtype=np.int64)
+        best_d2 = np.empty(0, dtype=np.float32)
+        for start in range(0, len(self), self.block_rows):
+            stop = min(start + self.block_rows, len(self))
+            dots = self.vectors[start:stop].astype(np.float32, copy=False) @ q
+            pos = np.arange(start, stop, dtype=np.int64)
+            d2 = self._dist2(slice(start, stop), dots, q_norm)
+            if d2.size > k:
+                keep = np.argpartition(d2, k - 1)[:k]
+                pos, d2 = pos[keep], d2[keep]
+            best_pos = np.concatenate([best_pos, pos])
+            best_d2 = np.concatenate([best_d2, d2])
+            if best_d2.size > k:
+                keep = np.argpartition(best_d2, k - 1)[:k]
+                best_pos, best_d2 = best_pos[keep], best_d2[keep]
+        return self._topk(best_pos, best_d2, k)
+
+    def search_positions(self, q: np.ndarray, k: int, pos: np.ndarray):
+        if pos.size == 0:
+            return []
+        q = np.asarray(q, dtype=np.float32)
+        pos = np.sort(pos)  # ascending positions keep memmap reads sequential
+        dots = self.vectors[pos].astype(np.float32, copy=False) @ q
+        return self._topk(pos, self._dist2(pos, dots, float(q @ q)), k)
+
+    def _dist2(self, sel, dots, q_norm):
+        return np.maximum(self.norms[sel] + q_norm - 2.0 * dots, 0.0).astype(np.float32)
+
+    def _topk(self, pos, d2, k):
+        if d2.size > k:
+            keep = np.argpartition(d2, k - 1)[:k]
+            pos, d2 = pos[keep], d2[keep]
+        order = np.argsort(d2, kind="stable")
+        return [(int(self.rowids[p]), float(np.sqrt(d))) for p, d in zip(pos[order], d2[order])]
+
+
+class QuantizedVectorIndex(NumpyVectorIndex):
+    # Coarse pass over compact codes, then exact rescoring of the best `rescore` rows
+    # against the full-precision memmap (only those rows are paged in).
+    #   int8:   per-dimension scalar quantization, x ~ lo + scale * code   (4x smaller than float32)
+    #   binary: one sign bit per dimension, ranked by Hamming distance    (32x smaller)
+
+    def __init__(self, path: str, mode="int8", rescore=200, block_rows=4096):
+        # small blocks keep the decoded float32 scratch in cache; this dominates int8 scan time
+        if mode not in QUANT_MODES:
+            raise ValueError(f"unknown quantization mode: {mode}")
+        super().__init__(path, block_rows=block_rows)
+        self.name = mode
+        self.mode = mode
+        self.rescore = int(rescore)
+        if mode == "int8":
+            self.codes = np.load(os.path.join(path, SQ8_FILE), mmap_mode="r")
+            self.lo = np.load(os.path.join(path, SQ8_LO_FILE))
+            self.scale = np.load(os.path.join(path, SQ8_SCALE_FILE))
+        else:
+            self.bits = np.load(os.path.join(path, BITS_FILE), mmap_mode="r")
+
+    def search(self, con, q: np.ndarray, k: int, candidate_ids=None):
+        # FTS-restricted candidate sets are small enough to score exactly
+        if candidate_ids:
+            return super().search(con, q, k, candidate_ids)
+        q = np.asarray(q, dtype=np.float32)
+        return self.search_positions(q, k, self.coarse(q, max(k, self.rescore)))
+
+    def coarse(self, q: np.ndarray, n: int) -> np.ndarray:
+        if self.mode == "int8":
+            q_lo = float(self.lo @ q)
+            q_scaled = (self.scale * q).astype(np.float32)
+            q_norm = float(q @ q)
+            score = lambda a, b: self._dist2(slice(a, b), q_lo + self.codes[a:b].astype(np.float32) @ q_scaled, q_norm)
+        else:
+            q_bits = np.packbits(q > 0)
+            score = lambda a, b: _popcount(np.bitwise_xor(self.bits[a:b], q_bits)).sum(axis=1, dtype=np.int32)
+
+        best_pos = np.empty(0, dtype=np.int64)
+        best_s = np.empty(0, dtype=np.float32)
+        for start in range(0, len(self), self.block_rows):
+            stop = min(start + self.block_rows, len(self))
+            s = score(start, stop).astype(np.float32, copy=False)
+            pos = np.arange(start, stop, dtype=np.int64)
+            best_pos = np.concatenate([best_pos, pos])
+            best_s = np.concatenate([best_s, s])
+            if best_s.size > n:
+                keep = np.argpartition(best_s, n - 1)[:n]
+                best_pos, best_s = best_pos[keep], best_s[keep]
+        return best_pos
+
+
+class IVFVectorIndex(NumpyVectorIndex):
+    # k-means partitions the store into `nlist` lists; a query scans only the `nprobe` lists
+    # whose centroids are nearest. Recall and latency both grow with nprobe.
+    # Filtered search (FTS candidate rowids): small candidate sets are scored exactly; larger
+    # ones are cut to the candidates in the lists nearest the query.
+    name = "ivf"
+
+    def __init__(self, path: str, nprobe=16, exact_limit=4096):
+        super().__init__(path)
+        with open(os.path.join(path, IVF_FILE), encoding="utf-8") as f:
+            self.ivf = json.load(f)
+        if self.ivf["count"] != len(self):
+            raise ValueError(f"IVF index in {path} is stale ({self.ivf['count']} rows, store has {len(self)}); "
+                             "rebuild it with `python vecstore.py ivf`")
+        self.nprobe = int(nprobe)
+        self.exact_limit = int(exact_limit)
+        self.centroids = np.load(os.path.join(path, IVF_CENTROIDS_FILE))
+        self.c_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        self.offsets = np.load(os.path.join(path, IVF_OFFSETS_FILE))
+        self.order = np.load(os.path.join(path, IVF_ORDER_FILE), mmap_mode="r")
+        self.list_vectors = np.load(os.path.join(path, IVF_VECTORS_FILE), mmap_mode="r")
+        self.list_norms = np.load(os.path.join(path, IVF_NORMS_FILE), mmap_mode="r")
+        self.lists = np.load(os.path.join(path, IVF_LISTS_FILE), mmap_mode="r")
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    def probe(self, q: np.ndarray, nprobe: int, among=None) -> np.ndarray:
+        lists = np.arange(self.nlist) if among is None else among
+        d = self.c_norms[lists] - 2.0 * (self.centroids[lists] @ q)
+        if d.size > nprobe:
+            lists = lists[np.argpartition(d, nprobe - 1)[:nprobe]]
+        return np.sort(lists)  # ascending offsets: sequential reads
+
+    def search(self, con, q: np.ndarray, k: int, candidate_ids=None):
+        q = np.asarray(q, dtype=np.float32)
+        if candidate_ids:
+            return self.search_filtered(q, k, self.positions(candidate_ids))
+        q_norm = float(q @ q)
+        pos, d2 = [], []
+        for l in self.probe(q, self.nprobe):
+            a, b = int(self.offsets[l]), int(self.offsets[l + 1])
+            if a == b:
+                continue
+            dots = self.list_vectors[a:b].astype(np.float32, copy=False) @ q
+            d2.append(np.maximum(self.list_norms[a:b] + q_norm - 2.0 * dots, 0.0))
+            pos.append(self.order[a:b])
+        if not pos:
+            return []
+        return self._topk(np.concatenate(pos), np.concatenate(d2).astype(np.float32), k)
+
+    def search_filtered(self, q: np.ndarray, k: int, pos: np.ndarray):
+        if pos.size > self.exact_limit:
+            # a filter keeping a fraction f of the rows keeps about f of every list, so probe
+            # nprobe / f lists to score as many rows as an unfiltered search would
+            lists = self.lists[pos]
+            among = np.unique(lists)
+            nprobe = int(np.ceil(self.nprobe * len(self) / float(pos.size)))
+            if nprobe < among.size:
+                pos = pos[np.isin(lists, self.probe(q, nprobe, among=among))]
+        return self.search_positions(q, k, pos)
+
+
+def _assign(x: np.ndarray, centroids: np.ndarray, c_norms: np.ndarray, block=4096) -> np.ndarray:
+    # nearest centroid by L2: argmin |c|^2 - 2 x.c
+    out = np.empty(len(x), dtype=np.int32)
+    for start in range(0, len(x), block):
+        b = np.asarray(x[start:start + block], dtype=np.float32)
+        out[start:start + len(b)] = np.argmin(c_norms - 2.0 * (b @ centroids.T), axis=1)
+    return out
+
+
+def train_ivf(vectors, nlist: int, iters=10, sample=None, seed=0) -> np.ndarray:
+    # Lloyd's k-means on a random sample (64 rows per list by default). A list needs at least
+    # one training row, so nlist is capped at the sample size: len(result) may be < nlist.
+    if nlist < 1:
+        raise ValueError(f"nlist must be at least 1, got {nlist}")
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    if not n:
+        raise ValueError("cannot train an IVF index on an empty vector store")
+    m = min(n, sample or 64 * nlist)
+    nlist = min(nlist, m)
+    x = np.asarray(vectors[np.sort(rng.choice(n, m, replace=False))], dtype=np.float32)
+    centroids = x[rng.choice(m, nlist, replace=False)].copy()
+    for _ in range(iters):
+        assign = _assign(x, centroids, np.einsum("ij,ij->i", centroids, centroids))
+        counts = np.bincount(assign, minlength=nlist)
+        order = np.argsort(assign, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        nz = np.flatnonzero(counts)
+        centroids[nz] = np.add.reduceat(x[order], starts[nz], axis=0) / counts[nz, None]
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            centroids[empty] = x[rng.choice(m, empty.size, replace=False)]  # re-seed dead lists
+    return centroids
+
+
+def build_ivf(path: str, nlist=None, iters=10, sample=None, seed=0, block=65536) -> str:
+    vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+    norms = np.load(os.path.join(path, NORMS_FILE), mmap_mode="r")
+    n = len(vectors)
+    nlist = int(nlist or max(1, round(4 * np.sqrt(n))))
+    centroids = train_ivf(vectors, nlist, iters=iters, sample=sample, seed=seed)
+    nlist = len(centroids)  # capped at the training sample size
+    lists = _assign(vectors, centroids, np.einsum("ij,ij->i", centroids, centroids))
+    order = np.argsort(lists, kind="stable")
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(lists, minlength=nlist))]).astype(np.int64)
+    out = np.lib.format.open_memmap(os.path.join(path, IVF_VECTORS_FILE), mode="w+", dtype=vectors.dtype,
+                                    shape=vectors.shape)
+    for start in range(0, n, block):
+        sel = order[start:start + block]
+        srt = np.argsort(sel)  # read the source in ascending position order
+        rows = np.empty((len(sel), vectors.shape[1]), dtype=vectors.dtype)
+        rows[srt] = vectors[sel[srt]]
+        out[start:start + len(sel)] = rows
+    out.flush()
+    del out
+    np.save(os.path.join(path, IVF_NORMS_FILE), np.asarray(norms)[order])
+    np.save(os.path.join(path, IVF_ORDER_FILE), order.astype(np.int64))
+    np.save(os.path.join(path, IVF_LISTS_FILE), lists)
+    np.save(os.path.join(path, IVF_OFFSETS_FILE), offsets)
+    np.save(os.path.join(path, IVF_CENTROIDS_FILE), centroids.astype(np.float32))
+    with open(os.path.join(path, IVF_FILE), "w", encoding="utf-8") as f:
+        json.dump({"count": int(n), "nlist": nlist, "iters": iters, "sample": sample, "seed": seed}, f)
+    return path
+
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(x: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x)
+    return _POPCOUNT[x]
+
+
+def quantize_store(path: str, modes=QUANT_MODES, block=65536) -> str:
+    vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+    n, dim = vectors.shape
+    if "int8" in modes:
+        lo = np.full(dim, np.inf, dtype=np.float32)
+        hi = np.full(dim, -np.inf, dtype=np.float32)
+        for start in range(0, n, block):
+            b = np.asarray(vectors[start:start + block], dtype=np.float32)
+            lo = np.minimum(lo, b.min(axis=0))
+            hi = np.maximum(hi, b.max(axis=0))
+        scale = np.where(hi > lo, (hi - lo) / 255.0, 1.0).astype(np.float32)
+        codes = np.lib.format.open_memmap(os.path.join(path, SQ8_FILE), mode="w+", dtype=np.uint8, shape=(n, dim))
+        for start in range(0, n, block):
+            b = np.asarray(vectors[start:start + block], dtype=np.float32)
+            codes[start:start + len(b)] = np.clip(np.rint((b - lo) / scale), 0, 255).astype(np.uint8)
+        codes.flush()
+        del codes
+        np.save(os.path.join(path, SQ8_LO_FILE), lo)
+        np.save(os.path.join(path, SQ8_SCALE_FILE), scale)
+    if "binary" in modes:
+        bits = np.lib.format.open_memmap(os.path.join(path, BITS_FILE), mode="w+", dtype=np.uint8,
+                                         shape=(n, (dim + 7) // 8))
+        for start in range(0, n, block):
+            b = np.asarray(vectors[start:start + block], dtype=np.float32)
+            bits[start:start + len(b)] = np.packbits(b > 0, axis=1)
+        bits.flush()
+        del bits
+    return path
+
+
+def recall_at_k(index, exact, queries, k: int) -> float:
+    hits = 0
+    for q in queries:
+        truth = {r for r, _ in exact.search(None, q, k)}
+        hits += len(truth.intersection(r for r, _ in index.search(None, q, k)))
+    return hits / float(k * len(queries)) if len(queries) else 1.0
+
+
+def open_index(path: str, backend="numpy", rescore=200, nprobe=16):
+    if backend in QUANT_MODES:
+        return QuantizedVectorIndex(path, mode=backend, rescore=rescore)
+    if backend == "ivf":
+        return IVFVectorIndex(path, nprobe=nprobe)
+    return NumpyVectorIndex(path)
+
+
+# ---------- export ----------
+def write_store(out_dir: str, rowids, vectors, dtype="float32") -> str:
+    os.makedirs(out_dir, exist_ok=True)
+    rowids = np.asarray(rowids, dtype=np.int64)
+    order = np.argsort(rowids, kind="stable")
+    vecs = np.lib.format.open_memmap(os.path.join(out_dir, VECTORS_FILE), mode="w+",
+                                     dtype=dtype, shape=(len(rowids), vectors.shape[1]))
+    norms = np.empty(len(rowids), dtype=np.float32)
+    for start in range(0, len(order), 65536):
+        sel = order[start:start + 65536]
+        block = np.asarray(vectors[sel], dtype=np.float32)
+        vecs[start:start + len(sel)] = block.astype(dtype)
+        stored = vecs[start:start + len(sel)].astype(np.float32)
+        norms[start:start + len(sel)] = np.einsum("ij,ij->i", stored, stored)
+    vecs.flush()
+    del vecs
+    np.save(os.path.join(out_dir, ROWIDS_FILE), rowids[order])
+    np.save(os.path.join(out_dir, NORMS_FILE), norms)
+    with open(os.path.join(out_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump({"count": int(len(rowids)), "dim": int(vectors.shape[1]), "dtype": str(np.dtype(dtype))}, f)
+    return out_dir
+
+
+def export_vectors(con: sqlite3.Connection, out_dir: str, dtype="float32", batch=50000) -> str:
+    n = con.execute("SELECT COUNT(*) FROM vectors;").fetchone()[0]
+    first = con.execute("SELECT embedding FROM vectors LIMIT 1;").fetchone()
+    if not n or first is None:
+        raise ValueError("vectors table is empty")
+    dim = len(first[0]) // 4
+    tmp = os.path.join(out_dir, "_export_f32.npy")
+    os.makedirs(out_dir, exist_ok=True)
+    staging = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(n, dim))
+    rowids = np.empty(n, dtype=np.int64)
+    i = 0
+    cur = con.execute("SELECT rowid, embedding FROM vectors ORDER BY rowid;")
+    while True:
+        rows = cur.fetchmany(batch)
+        if not rows:
+            break
+        for rowid, blob in rows:
+            rowids[i] = rowid
+            staging[i] = np.frombuffer(blob, dtype=np.float32)
+            i += 1
+    write_store(out_dir, rowids[:i], staging[:i], dtype=dtype)
+    del staging
+    os.remove(tmp)
+    return out_dir
+
+
+def default_store_path(db_path: str) -> str:
+    return os.path.splitext(db_path)[0] + ".vec"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Export the vec0 `vectors` table to a memory-mapped NumPy store.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("export")
+    p.add_argument("--db", required=True)
+    p.add_argument("--dll", required=True, help="sqlite-vec extension used to read the vectors table")
+    p.add_argument("--out", default=None, help="Output directory (default: <db>.vec)")
+    p.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    p.add_argument("--quantize", nargs="*", choices=QUANT_MODES, default=[],
+                   help="Also build int8 / binary codes for the quantized backends")
+    p = sub.add_parser("quantize")
+    p.add_argument("--store", required=True, help="Directory written by `export`")
+    p.add_argument("--modes", nargs="+", choices=QUANT_MODES, default=list(QUANT_MODES))
+    p = sub.add_parser("ivf", help="Build the IVF (approximate nearest-neighbour) index of a store")
+    p.add_argument("--store", required=True, help="Directory written by `export`")
+    p.add_argument("--nlist", type=int, default=None, help="Number of lists (default: 4*sqrt(rows))")
+    p.add_argument("--iters", type=int, default=10, help="k-means iterations")
+    p.add_argument("--sample", type=int, default=None, help="k-means training rows (default: 64 per list)")
+    args = ap.parse_args()
+
+    if args.cmd == "ivf":
+        build_ivf(args.store, args.nlist, iters=args.iters, sample=args.sample)
+        index = IVFVectorIndex(args.store)
+        print(f"built IVF index of {args.store}: {len(index)} rows in {index.nlist} lists")
+        return
+    if args.cmd == "quantize":
+        quantize_store(args.store, args.modes)
+        print(f"quantized {args.store}: {' '.join(args.modes)}")
+        return
+
+    con = sqlite3.connect(args.db)
+    con.enable_load_extension(True)
+    con.load_extension(args.dll)
+    out = export_vectors(con, args.out or default_store_path(args.db), dtype=args.dtype)
+    if args.quantize:
+        quantize_store(out, args.quantize)
+    print(f"exported {len(NumpyVectorIndex(out))} vectors -> {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 # Provides a modern UI with both text and voice input.
 # Voice uses Web Speech API (webkitSpeechRecognition) in Urdu (ur-PK).
 # Flow: user speaks → transcript fills the box → user clicks Send → your /chat does embeddings & answer.
+# Answers are streamed from /chat/stream (SSE) and rendered token by token; /chat is the fallback.
 # Includes "Clear Chat" button and a white question area with black text.
 
 UI_HTML = r"""<!doctype html>
@@ -228,6 +229,7 @@ UI_HTML = r"""<!doctype html>
 
     const state = {
       busy:false,
+      retryAt:0,       // Retry-After from a busy server: sending is held until then
       recognizing:false,
       history: JSON.parse(localStorage.getItem('urdu-law-chat') || '[]')
     };
@@ -242,7 +244,7 @@ UI_HTML = r"""<!doctype html>
 
       if(role==='bot'){
         const cp = document.createElement('div'); cp.className='copy'; cp.textContent='کاپی کریں';
-        cp.onclick = async ()=>{ try{ await navigator.clipboard.writeText(text); cp.textContent='کاپی ہوگئی ✓'; setTimeout(()=>cp.textContent='کاپی کریں',1200);}catch{} };
+        cp.onclick = async ()=>{ try{ await navigator.clipboard.writeText(body.textContent); cp.textContent='کاپی ہوگئی ✓'; setTimeout(()=>cp.textContent='کاپی کریں',1200);}catch{} };
         row.appendChild(cp);
       }
       chat.appendChild(row);
@@ -281,7 +283,7 @@ UI_HTML = r"""<!doctype html>
 
     async function send(){
       const text = input.value.trim();
-      if(!text || state.busy) return;
+      if(!text || state.busy || Date.now() < state.retryAt) return;
 
       state.busy = true; sendBtn.disabled = true; setStatus('بھیج رہے ہیں…');
       bubble('user', text); state.history.push({role:'user', text}); save();
@@ -291,23 +293,96 @@ UI_HTML = r"""<!doctype html>
       typing.innerHTML = '<div class="avatar">AI</div><div class="bubble">لکھا جا رہا ہے…</div>';
       chat.appendChild(typing); chat.scrollTop = chat.scrollHeight;
 
+      const live = typing.querySelector('.bubble');
+      let partial = '';
       try{
-        const res = await fetch('/chat', {method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({message:text})});
-        const data = await res.json();
+        let ans;
+        try{
+          ans = await streamAnswer(text, (t)=>{
+            if(!partial) setStatus('جواب آ رہا ہے…');
+            partial = t; live.textContent = t; chat.scrollTop = chat.scrollHeight;
+          });
+        }catch(err){
+          if(partial || err.refused) throw err;
+          // streaming endpoint missing or broken before the first token: plain request
+          const res = await fetch('/chat', {method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({message:text})});
+          const data = await res.json();
+          ans = data.answer;
+        }
         typing.remove();
-        const ans = data.answer || 'کوئی جواب دستیاب نہیں۔';
+        ans = (ans || '').trim() || 'کوئی جواب دستیاب نہیں۔';
         bubble('bot', ans); state.history.push({role:'bot', text:ans}); save();
         setStatus('تیار');
-      }catch{
+      }catch(err){
         typing.remove();
-        bubble('bot', 'سرور سے رابطہ نہیں ہو سکا۔ براہِ کرم دوبارہ کوشش کریں۔');
+        if(err && err.refused){
+          // the server answered with a refusal (busy, starting, bad request): show it, do not resend
+          bubble('bot', err.text);
+          if(err.retryAfter) holdSend(err.retryAfter);
+          else setStatus('خرابی');
+        }else if(partial){
+          bubble('bot', partial); state.history.push({role:'bot', text:partial}); save();
+        }else{
+          bubble('bot', 'سرور سے رابطہ نہیں ہو سکا۔ براہِ کرم دوبارہ کوشش کریں۔');
+        }
         setStatus('خرابی');
       }finally{
-        state.busy = false; sendBtn.disabled = false;
+        state.busy = false; sendBtn.disabled = Date.now() < state.retryAt;
       }
     }
     sendBtn.addEventListener('click', send);
 
+    // Keeps Send disabled for the server's Retry-After seconds, counting down in the status line.
+    function holdSend(seconds){
+      state.retryAt = Date.now() + seconds * 1000;
+      sendBtn.disabled = true;
+      const tick = ()=>{
+        const left = Math.ceil((state.retryAt - Date.now()) / 1000);
+        if(left <= 0){ state.retryAt = 0; sendBtn.disabled = state.busy; setStatus('تیار'); return; }
+        setStatus(`سرور مصروف ہے، ${left} سیکنڈ بعد دوبارہ کوشش کریں`);
+        setTimeout(tick, 1000);
+      };
+      tick();
+    }
+
+    // Reads the /chat/stream SSE body and reports the growing answer to onText.
+    async function streamAnswer(text, onText){
+      const res = await fetch('/chat/stream', {method:'POST', headers:{'Content-Type':'application/json'}, body: JSON.stringify({message:text})});
+      const type = res.headers.get('Content-Type') || '';
+      if(type.startsWith('application/json') && (res.status === 503 || (res.status >= 400 && res.status < 500 && res.status !== 404 && res.status !== 405))){
+        // shed / not ready / bad request: a real answer from the server, not a missing endpoint
+        const data = await res.json().catch(()=>({}));
+        const err = new Error('refused');
+        err.refused = true;
+        err.text = data.answer || data.error || 'سرور نے درخواست قبول نہیں کی۔';
+        err.retryAfter = parseInt(res.headers.get('Retry-After') || '0', 10) || 0;
+        throw err;
+      }
+      if(!res.ok || !res.body || !type.startsWith('text/event-stream')) throw new Error('no stream');
+
+      const reader = res.body.getReader();
+      const dec = new TextDecoder();
+      let buf = '', answer = '', failed = false;
+      while(true){
+        const {value, done} = await reader.read();
+        if(done) break;
+        buf += dec.decode(value, {stream:true});
+        let cut;
+        while((cut = buf.indexOf('\n\n')) >= 0){
+          const evt = buf.slice(0, cut); buf = buf.slice(cut + 2);
+          for(const line of evt.split('\n')){
+            if(!line.startsWith('data:')) continue;
+            const msg = JSON.parse(line.slice(5));
+            if(msg.token){ answer += msg.token; onText(answer); }
+            else if(msg.answer){ answer = msg.answer; onText(answer); }
+            else if(msg.error){ failed = true; }
+          }
+        }
+      }
+      if(failed && !answer) throw new Error('stream failed');
+      return answer;
+    }
+
     function setStatus(t){ status.textContent = t; }
 
     // -------- Voice (Urdu) with Web Speech API ----------